@@ -0,0 +1,85 @@
+import asyncio
+import io
+import os
+import time
+import tracemalloc
+
+import sys
+src_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(src_path)
+
+from crypto import fernet, encrypt_data, decrypt_data, encrypt_stream, decrypt_stream
+
+SIZES = (64 * 1024, 1024 * 1024, 16 * 1024 * 1024)
+CONCURRENCY = 8  # Simultaneous uploads for the streaming (thread pool) runs
+RUNS = 3
+
+
+def best_of(fn) -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def peak_memory(fn) -> int:
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+async def stream_roundtrip(data: bytes) -> int:
+    """Encrypts an in-memory 'upload' as a stream and pipes the ciphertext straight into decryption."""
+    upload = io.BytesIO(data)
+
+    async def _read(size: int) -> bytes:
+        return upload.read(size)
+
+    size = 0
+    async for plaintext in decrypt_stream(encrypt_stream(_read)):
+        size += len(plaintext)
+    return size
+
+
+def benchmark_crypto():
+    """
+    Compares whole-buffer Fernet with the chunked AES-GCM format: throughput, size overhead and
+    peak memory (of one round trip; the input buffer itself is not counted).
+    """
+    print(f"{'size':>8}  {'mode':<34}{'MiB/s':>9}{'overhead':>10}{'peak MiB':>10}")
+    for size in SIZES:
+        data = os.urandom(size)
+        mib = size / (1024 * 1024)
+        label = f"{size // 1024} KiB"
+
+        token = fernet.encrypt(data)
+        fernet_time = best_of(lambda: fernet.decrypt(fernet.encrypt(data)))
+        fernet_peak = peak_memory(lambda: fernet.decrypt(fernet.encrypt(data)))
+        print(f"{label:>8}  {'Fernet encrypt+decrypt':<34}{mib / fernet_time:>9.0f}"
+              f"{len(token) / size - 1:>10.2%}{fernet_peak / 2 ** 20:>10.1f}")
+
+        ciphertext = encrypt_data(data)
+        gcm_time = best_of(lambda: decrypt_data(encrypt_data(data)))
+        gcm_peak = peak_memory(lambda: decrypt_data(encrypt_data(data)))
+        print(f"{label:>8}  {'AES-GCM chunked, whole buffer':<34}{mib / gcm_time:>9.0f}"
+              f"{len(ciphertext) / size - 1:>10.2%}{gcm_peak / 2 ** 20:>10.1f}")
+
+        stream_peak = peak_memory(lambda: asyncio.run(stream_roundtrip(data)))
+
+        async def _concurrent():
+            await asyncio.gather(*(stream_roundtrip(data) for _ in range(CONCURRENCY)))
+
+        stream_time = best_of(lambda: asyncio.run(_concurrent()))
+        print(f"{label:>8}  {f'AES-GCM streaming, {CONCURRENCY} concurrent':<34}"
+              f"{mib * CONCURRENCY / stream_time:>9.0f}{len(ciphertext) / size - 1:>10.2%}"
+              f"{stream_peak / 2 ** 20:>10.1f}")
+        print()
+
+
+# Run the benchmark
+if __name__ == "__main__":
+    benchmark_crypto()
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import tempfile
+import time
+
+import sys
+src_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(src_path)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import event
+from db import engine, SessionLocal, User, ImageKey, run_db
+
+REQUESTS = 200
+QUERY_LATENCY = 0.002   # Simulated database round trip per statement
+UPLOAD_LATENCY = 0.02   # Simulated time spent talking to the storage cluster
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _round_trip(*_):
+    time.sleep(QUERY_LATENCY)
+
+
+def _get_user_id(db, username):
+    return db.query(User.id).filter(User.username == username).first()[0]
+
+
+def _add_image_key(db, username, image_key):
+    db.add(ImageKey(username=username, image_key=image_key))
+    db.commit()
+
+
+def _inline(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+async def request_inline(i: int):
+    """An upload handler querying on the event loop, as the routes used to."""
+    _inline(_get_user_id, "bench")
+    await asyncio.sleep(UPLOAD_LATENCY)
+    _inline(_add_image_key, "bench", f"inline-{i}")
+
+
+async def request_offloaded(i: int):
+    """The same handler with each query on the database thread pool."""
+    await run_db(_get_user_id, "bench")
+    await asyncio.sleep(UPLOAD_LATENCY)
+    await run_db(_add_image_key, "bench", f"offloaded-{i}")
+
+
+async def probe_loop_lag(stop: asyncio.Event) -> float:
+    """Worst delay of a 1 ms timer, i.e. how long other requests could not be served."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, time.perf_counter() - start - 0.001)
+    return worst
+
+
+async def run(handler) -> tuple:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(i) for i in range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return REQUESTS / elapsed, await probe
+
+
+def benchmark_db():
+    db = SessionLocal()
+    db.add(User(username="bench", password="-"))
+    db.commit()
+    db.close()
+
+    print(f"{REQUESTS} concurrent uploads, {QUERY_LATENCY * 1000:.0f} ms per statement, "
+          f"{UPLOAD_LATENCY * 1000:.0f} ms upload")
+    for label, handler in (("inline (blocks the event loop)", request_inline),
+                           ("run_db (thread pool)", request_offloaded)):
+        throughput, lag = asyncio.run(run(handler))
+        print(f"{label:<32}{throughput:>8.0f} req/s   worst loop stall {lag * 1000:>7.1f} ms")
+
+
+# Run the benchmark
+if __name__ == "__main__":
+    benchmark_db()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import time
+
+import sys
+src_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(src_path)
+
+from cryptography.fernet import Fernet
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ.setdefault("FERNET_KEY", Fernet.generate_key().decode())
+
+from db import engine, SessionLocal, ImageKey
+from routes.image import _list_image_keys
+
+MANY, FEW = 100_000, 10
+PAGE = 50
+RUNS = 200
+
+
+def populate():
+    """'many' owns MANY images; FEW images of 'few' are spread evenly among them."""
+    rows = []
+    for i in range(MANY + FEW):
+        owner = "few" if i % (MANY // FEW + 1) == 0 else "many"
+        rows.append({"username": owner, "image_key": f"{i:064x}"})
+    with engine.begin() as connection:
+        connection.execute(ImageKey.__table__.insert(), rows)
+
+
+def timed_ms(fn, runs: int = RUNS) -> float:
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        for _ in range(runs):
+            fn(db)
+        return (time.perf_counter() - start) / runs * 1000
+    finally:
+        db.close()
+
+
+def deepest_cursor(username: str):
+    """The cursor of the last page, found by walking every page."""
+    db = SessionLocal()
+    try:
+        cursor = last = None
+        while True:
+            _, next_id = _list_image_keys(db, username, cursor, PAGE)
+            if next_id is None:
+                return last
+            cursor = last = next_id
+    finally:
+        db.close()
+
+
+def benchmark_list():
+    populate()
+    with engine.connect() as connection:
+        plan = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT id, image_key FROM image_keys "
+            "WHERE username = 'many' AND id < 500 ORDER BY id DESC LIMIT 51").fetchall()
+    print("query plan:", "; ".join(row[-1] for row in plan))
+
+    print(f"{'user':<6}{'images':>8}{'first page ms':>15}{'last page ms':>14}{'unpaginated ms':>16}")
+    for username in ("few", "many"):
+        cursor = deepest_cursor(username)
+        first = timed_ms(lambda db: _list_image_keys(db, username, None, PAGE))
+        last = timed_ms(lambda db: _list_image_keys(db, username, cursor, PAGE))
+        everything = timed_ms(
+            lambda db: db.query(ImageKey.image_key).filter(ImageKey.username == username).all(), runs=5)
+        images = MANY if username == "many" else FEW
+        print(f"{username:<6}{images:>8}{first:>15.3f}{last:>14.3f}{everything:>16.2f}")
+
+
+# Run the benchmark
+if __name__ == "__main__":
+    benchmark_list()
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import time
+
+import sys
+src_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(src_path)
+
+from passlib.hash import bcrypt
+from passwords import PasswordHasher, PasswordHasherBusy
+
+LOGINS = 16
+IMAGE_REQUEST_INTERVAL = 0.01  # An image request arrives every 10 ms during the login storm
+
+
+async def image_requests(stop: asyncio.Event) -> list:
+    """
+    Latency of trivial image requests while logins are being checked: how late the loop gets
+    to each one after it arrives.
+    """
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(IMAGE_REQUEST_INTERVAL)
+        latencies.append(time.perf_counter() - start - IMAGE_REQUEST_INTERVAL)
+    return latencies
+
+
+async def storm(login) -> tuple:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(image_requests(stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(LOGINS)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    latencies = sorted(await probe)
+    rejected = sum(isinstance(result, PasswordHasherBusy) for result in results)
+    return elapsed, latencies[int(len(latencies) * 0.99) - 1], latencies[-1], rejected
+
+
+def benchmark_passwords():
+    hashed = bcrypt.hash("correct horse")
+    hasher = PasswordHasher()
+
+    async def inline_login():
+        return bcrypt.verify("correct horse", hashed)
+
+    async def pooled_login():
+        return await hasher.verify("correct horse", hashed)
+
+    print(f"{LOGINS} concurrent logins, {hasher.threads} bcrypt threads")
+    for label, login in (("inline", inline_login), ("PasswordHasher", pooled_login)):
+        elapsed, p99, worst, rejected = asyncio.run(storm(login))
+        print(f"{label:<16}{LOGINS / elapsed:>6.1f} logins/s   image request p99 {p99 * 1000:>7.1f} ms"
+              f"   max {worst * 1000:>7.1f} ms   rejected {rejected}")
+    print(hasher.stats())
+
+
+# Run the benchmark
+if __name__ == "__main__":
+    benchmark_passwords()
@@ -4,15 +4,25 @@ from fastapi.templating import Jinja2Templates
 from fastapi.requests import Request
 from fastapi.responses import HTMLResponse
 from pathlib import Path
+from contextlib import asynccontextmanager
 import uvicorn
 from routes.auth import auth_router
 from routes.image import image_router
+from http_client import close_image_service
+import thumbnails
 
 import dotenv
 dotenv.load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close the pooled connections to the image storage service on shutdown
+    await close_image_service()
+    thumbnails.shutdown()
+
 # Initialize the app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Include the auth router
 app.include_router(auth_router, prefix="/auth")
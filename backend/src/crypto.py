@@ -1,9 +1,26 @@
+import asyncio
+import base64
 import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Optional
 import dotenv
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+dotenv.load_dotenv()
 
 KEY_FILE = "key.key"
 
+# Chunked AES-GCM format: plaintext is sealed CRYPTO_CHUNK_SIZE bytes at a time, so images are
+# encrypted and decrypted as they stream instead of as one buffer. Chunks of at least
+# CRYPTO_OFFLOAD_BYTES are processed on a pool of CRYPTO_THREADS threads (OpenSSL releases the GIL).
+CRYPTO_CHUNK_SIZE = int(os.getenv("CRYPTO_CHUNK_SIZE", str(64 * 1024)))
+CRYPTO_OFFLOAD_BYTES = int(os.getenv("CRYPTO_OFFLOAD_BYTES", str(16 * 1024)))
+CRYPTO_THREADS = int(os.getenv("CRYPTO_THREADS", str(min(4, os.cpu_count() or 1))))
+
 def generate_and_store_key():
     if not os.path.exists(KEY_FILE):
         key = Fernet.generate_key()
@@ -13,10 +30,10 @@ def generate_and_store_key():
     else:
         print("Key already exists.")
 
-def load_key():
+def load_key() -> str:
     if os.path.exists(KEY_FILE):
         with open(KEY_FILE, "rb") as key_file:
-            return Fernet(key_file.read())
+            return key_file.read().decode()
     else:
         raise FileNotFoundError("Key file not found. Generate the key first.")
 
@@ -29,11 +46,225 @@ if not FERNET_KEY:
     # Save in environment variables
     os.environ["FERNET_KEY"] = FERNET_KEY
 
-fernet = Fernet(FERNET_KEY)
+fernet = Fernet(FERNET_KEY)  # Only decrypts images stored before the chunked format
+
+# The AES-256 keys are derived from the same secret, so existing deployments need no new key
+_master_key = base64.urlsafe_b64decode(FERNET_KEY)
+
+def _derive_key(salt: Optional[bytes], info: bytes) -> AESGCM:
+    return AESGCM(HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=info).derive(_master_key))
+
+# Header: magic, plaintext chunk size, random 32-byte salt. Every image is sealed with its own
+# AES-256 key, derived from the secret and its salt, so nonces only have to be unique within an
+# image: chunk i is sealed with the nonce 0 (7 bytes) || i || last-chunk flag and the header as
+# associated data, so chunks cannot be reordered, truncated or spliced from another image without
+# failing authentication.
+MAGIC = b"DYE\x02"
+SALT_SIZE = 32
+HEADER = struct.Struct(f">4sI{SALT_SIZE}s")
+NONCE_SUFFIX = struct.Struct(">I?")
+TAG_SIZE = 16
+_ZERO_PREFIX = bytes(7)
+_KEY_INFO = b"dynamo-image-encryption/aes-256-gcm/v2"
+
+# Version 1, still decrypted: one key for every image and a random 7-byte nonce prefix in the
+# header instead of the salt, which risks reusing nonces across images once there are many
+LEGACY_MAGIC = b"DYE\x01"
+LEGACY_HEADER = struct.Struct(">4sI7s")
+_legacy_aesgcm = _derive_key(None, b"dynamo-image-encryption/aes-256-gcm/v1")
+
+_HEADERS = {MAGIC: HEADER, LEGACY_MAGIC: LEGACY_HEADER}
+
+_executor = ThreadPoolExecutor(CRYPTO_THREADS, thread_name_prefix="crypto")
+
+def _nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+    return prefix + NONCE_SUFFIX.pack(counter, last)
+
+def _header_format(data) -> Optional[struct.Struct]:
+    """The header layout of the chunked format version `data` starts with, if any."""
+    return _HEADERS.get(bytes(data[:len(MAGIC)]))
+
+class _ChunkStream:
+    """
+    Cuts a byte stream into fixed-size chunks, numbering them. A full chunk is only processed once
+    more data follows it; the last chunk (possibly short or empty) is processed by `finalize`.
+    Full chunks are processed straight from the caller's buffer, without copying it.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._counter = 0
+
+    def _process(self, chunk, last: bool) -> bytes:
+        raise NotImplementedError
+
+    def _next(self, chunk, last: bool) -> bytes:
+        out = self._process(chunk, last)
+        self._counter += 1
+        return out
+
+    def _split(self, data, size: int) -> list:
+        out = []
+        view = memoryview(data)
+        if self._buffer:
+            fill = size - len(self._buffer)
+            self._buffer += view[:fill]
+            view = view[fill:]
+            if not view:
+                return out
+            out.append(self._next(bytes(self._buffer), last=False))
+            self._buffer.clear()
+        while len(view) > size:
+            out.append(self._next(view[:size], last=False))
+            view = view[size:]
+        self._buffer += view
+        return out
+
+    def _finish(self) -> bytes:
+        out = self._next(bytes(self._buffer), last=True)
+        self._buffer.clear()
+        return out
+
+class Encryptor(_ChunkStream):
+    """
+    Incremental encryption into the chunked format: feed plaintext with `update` (any sizes),
+    then call `finalize` once. The output of every call, concatenated, is the ciphertext.
+    """
+
+    def __init__(self, chunk_size: int = CRYPTO_CHUNK_SIZE):
+        super().__init__()
+        self.chunk_size = chunk_size
+        salt = os.urandom(SALT_SIZE)
+        self.header = HEADER.pack(MAGIC, chunk_size, salt)
+        self._aesgcm = _derive_key(salt, _KEY_INFO)
+        self._started = False
+
+    def _process(self, chunk, last: bool) -> bytes:
+        return self._aesgcm.encrypt(_nonce(_ZERO_PREFIX, self._counter, last), chunk, self.header)
+
+    def _begin(self) -> bytes:
+        if self._started:
+            return b""
+        self._started = True
+        return self.header
+
+    def update(self, data: bytes) -> bytes:
+        return b"".join([self._begin(), *self._split(data, self.chunk_size)])
+
+    def finalize(self) -> bytes:
+        return self._begin() + self._finish()
+
+class Decryptor(_ChunkStream):
+    """
+    Incremental decryption of the chunked format: feed ciphertext with `update` (any sizes),
+    then call `finalize` once, which authenticates the end of the stream.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.header = None
+        self._head = bytearray()
+
+    def _process(self, sealed, last: bool) -> bytes:
+        return self._aesgcm.decrypt(_nonce(self._prefix, self._counter, last), sealed, self.header)
+
+    def update(self, data: bytes) -> bytes:
+        if self.header is None:
+            self._head += data
+            if len(self._head) < len(MAGIC):
+                return b""
+            header = _header_format(self._head)
+            if header is None:
+                raise ValueError("Not an encrypted image")
+            if len(self._head) < header.size:
+                return b""
+            magic, self.chunk_size, secret = header.unpack_from(self._head)
+            if magic == MAGIC:
+                self._aesgcm, self._prefix = _derive_key(secret, _KEY_INFO), _ZERO_PREFIX
+            else:
+                self._aesgcm, self._prefix = _legacy_aesgcm, secret
+            self.header = bytes(self._head[:header.size])
+            data = bytes(self._head[header.size:])
+            self._head.clear()
+        return b"".join(self._split(data, self.chunk_size + TAG_SIZE))
+
+    def finalize(self) -> bytes:
+        if self.header is None:
+            raise ValueError("Truncated encrypted image")
+        return self._finish()
+
+# Every Fernet token starts with its version byte and a timestamp below 2**32, base64 encoded
+FERNET_PREFIX = b"gAAAAA"
+
+def is_chunked(data: bytes) -> bool:
+    return _header_format(data) is not None
+
+def has_header(data: bytes) -> bool:
+    """Whether `data` starts with a whole header of the chunked format (either version)."""
+    header = _header_format(data)
+    return header is not None and len(data) >= header.size
+
+def is_encrypted(data: bytes) -> bool:
+    """Whether `data` starts like an encrypted image, in either format."""
+    return is_chunked(data) or data[:len(FERNET_PREFIX)] == FERNET_PREFIX
+
+def encrypted_size(size: int, chunk_size: int = CRYPTO_CHUNK_SIZE) -> int:
+    """Size of the ciphertext of `size` bytes of plaintext."""
+    chunks = max(1, -(-size // chunk_size))
+    return HEADER.size + size + chunks * TAG_SIZE
+
+def plaintext_size(header: bytes, size: int) -> int:
+    """Size of the plaintext of a `size`-byte ciphertext in the chunked format, given its header."""
+    header_format = _header_format(header)
+    _, chunk_size, _ = header_format.unpack_from(header)
+    chunks = max(1, -(-(size - header_format.size) // (chunk_size + TAG_SIZE)))
+    return size - header_format.size - chunks * TAG_SIZE
 
 def encrypt_data(data: bytes) -> bytes:
-    return fernet.encrypt(data)
+    encryptor = Encryptor()
+    return encryptor.update(data) + encryptor.finalize()
 
 def decrypt_data(data: bytes) -> bytes:
-    return fernet.decrypt(data)
+    if not is_chunked(data):
+        return fernet.decrypt(data)  # Stored before the chunked format
+    decryptor = Decryptor()
+    return decryptor.update(data) + decryptor.finalize()
+
+async def _run(fn: Callable[..., bytes], *args) -> bytes:
+    """Runs a crypto step on the thread pool when its input is large enough to be worth it."""
+    if args and len(args[0]) >= CRYPTO_OFFLOAD_BYTES:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    return fn(*args)
 
+async def encrypt_stream(read: Callable[[int], Awaitable[bytes]]) -> AsyncIterator[bytes]:
+    """
+    Encrypts a plaintext stream (e.g. `UploadFile.read`) chunk by chunk, yielding ciphertext.
+    """
+    encryptor = Encryptor()
+    while data := await read(encryptor.chunk_size):
+        sealed = await _run(encryptor.update, data)
+        if sealed:
+            yield sealed
+    yield encryptor.finalize()
+
+async def decrypt_stream(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """
+    Decrypts a ciphertext stream (e.g. a download) chunk by chunk, yielding plaintext.
+    Images stored before the chunked format (Fernet) are buffered and decrypted at the end.
+    """
+    decryptor = None
+    buffered = bytearray()  # Received while the format is unknown, or a whole legacy token
+    async for data in chunks:
+        if decryptor is None:
+            buffered += data
+            if len(buffered) < len(MAGIC) or not is_chunked(buffered):
+                continue
+            decryptor, data = Decryptor(), bytes(buffered)
+            buffered.clear()
+        plaintext = await _run(decryptor.update, data)
+        if plaintext:
+            yield plaintext
+    if decryptor is not None:
+        yield decryptor.finalize()
+    else:
+        yield await _run(decrypt_data, bytes(buffered))
@@ -1,17 +1,61 @@
+import asyncio
+import logging
 import os
-from sqlalchemy import create_engine, Column, Integer, String, LargeBinary
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+from sqlalchemy import create_engine, inspect, Column, ForeignKey, Index, Integer, String, LargeBinary, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
 import dotenv
 dotenv.load_dotenv()
 
+logger = logging.getLogger("uvicorn.error")
+
 DATABASE_URL = os.getenv("DATABASE_URL","sqlite:///./test.db")
 print(DATABASE_URL)
 
-engine = create_engine(DATABASE_URL)
+# Queries run on DB_POOL_SIZE worker threads, each holding at most one pooled connection, so the
+# pool never makes a worker wait. DB_MAX_OVERFLOW extra connections cover code outside the workers.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_recycle=DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=True,
+    # SQLite connections are used from the worker threads, not the thread that opened them
+    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# One session per worker thread, reused across queries
+_sessions = scoped_session(SessionLocal)
+_executor = ThreadPoolExecutor(DB_POOL_SIZE, thread_name_prefix="db")
+
+T = TypeVar("T")
+
+def _run_in_session(fn: Callable[..., T], *args) -> T:
+    session = _sessions()
+    try:
+        return fn(session, *args)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()  # Returns the connection to the pool; the session object is kept for reuse
+
+async def run_db(fn: Callable[..., T], *args) -> T:
+    """
+    Runs `fn(session, *args)` on the database worker threads, so queries never block the event loop.
+    `fn` commits its own writes; it should return plain values rather than ORM objects, which are
+    detached once it returns.
+    """
+    return await asyncio.get_running_loop().run_in_executor(_executor, _run_in_session, fn, *args)
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -20,9 +64,42 @@ class User(Base):
 
 class ImageKey(Base):
     __tablename__ = "image_keys"
+    # A user's images are listed newest first by walking (username, id), a page per index range scan
+    __table_args__ = (Index("ix_image_keys_username_id", "username", "id"),)
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String)
     image_key = Column(String, unique=True)
     encrypted_key = Column(LargeBinary)
 
+class RevokedToken(Base):
+    """A session token logged out before its expiry; kept until then, so every worker refuses it."""
+    __tablename__ = "revoked_tokens"
+    token_id = Column(String, primary_key=True)
+    expires_at = Column(Integer, nullable=False, index=True)
+
+class ImageDerivative(Base):
+    """A downscaled variant of an image (see thumbnails.py), stored in the cluster under its own key."""
+    __tablename__ = "image_derivatives"
+    # Also the index for looking up an image's variants
+    __table_args__ = (UniqueConstraint("image_id", "variant", name="uq_image_derivatives_image_id_variant"),)
+    id = Column(Integer, primary_key=True)
+    image_id = Column(Integer, ForeignKey("image_keys.id", ondelete="CASCADE"), nullable=False)
+    variant = Column(String, nullable=False)
+    derivative_key = Column(String)  # Null when the original is small enough to serve as the variant
+
+def add_missing_indexes(table):
+    """
+    create_all skips tables that already exist, so indexes introduced since are added to older
+    databases here. An index whose columns the existing table lacks (a database from an older
+    schema) is skipped with a warning rather than failing startup.
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns(table.name)}
+    for index in table.indexes:
+        missing = {column.name for column in index.columns} - columns
+        if missing:
+            logger.warning(f"Not creating index {index.name}: table {table.name} has no column {', '.join(sorted(missing))}")
+            continue
+        index.create(bind=engine, checkfirst=True)
+
 Base.metadata.create_all(bind=engine)
+add_missing_indexes(ImageKey.__table__)
@@ -0,0 +1,46 @@
+import os
+from typing import Optional
+import aiohttp
+import dotenv
+
+dotenv.load_dotenv()
+
+IMAGE_SERVICE_IP = os.getenv("IMAGE_SERVICE_IP", "localhost")
+IMAGE_SERVICE_PORT = os.getenv("IMAGE_SERVICE_PORT", "8000")
+IMAGE_SERVICE_BASE_URL = f"http://{IMAGE_SERVICE_IP}:{IMAGE_SERVICE_PORT}"
+
+# Direct data path: image bytes go straight between the backend and the nodes through signed URLs
+# handed out by the image storage service, which then only handles routing.
+DIRECT_DATA_PATH = os.getenv("DIRECT_DATA_PATH", "false").lower() in ("1", "true", "yes")
+
+# Connection pool to the image storage service
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "64"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+HTTP_DNS_TTL_SECONDS = int(os.getenv("HTTP_DNS_TTL_SECONDS", "300"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+
+_session: Optional[aiohttp.ClientSession] = None
+
+def get_image_service() -> aiohttp.ClientSession:
+    """
+    Returns the session shared by all calls to the image storage service (and, on the direct data
+    path, to the nodes), creating it on first use. Its connections are kept alive between requests,
+    so requests do not pay for TCP setup.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+                ttl_dns_cache=HTTP_DNS_TTL_SECONDS,
+            ),
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT_SECONDS),
+        )
+    return _session
+
+async def close_image_service():
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
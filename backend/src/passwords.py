@@ -0,0 +1,95 @@
+import asyncio
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from passlib.hash import bcrypt
+import dotenv
+dotenv.load_dotenv()
+
+# bcrypt is deliberately slow (hundreds of ms per call) and releases the GIL while it works, so it
+# runs on PASSWORD_THREADS threads of its own instead of the event loop. At most
+# PASSWORD_MAX_PENDING calls may be running or queued; beyond that, requests are turned away
+# instead of piling up behind a login storm.
+PASSWORD_THREADS = int(os.getenv("PASSWORD_THREADS", str(min(2, os.cpu_count() or 1))))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", "32"))
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password pool already has PASSWORD_MAX_PENDING calls waiting or running."""
+
+class PasswordHasher:
+    """
+    Bounded pool for bcrypt hashing and verification, with queue-depth and latency counters.
+    """
+
+    def __init__(self, threads: int = PASSWORD_THREADS, max_pending: int = PASSWORD_MAX_PENDING):
+        self.threads = threads
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix="bcrypt")
+        # Hash of a random password, verified against for logins of users that do not exist
+        self._unknown_user_hash = self._executor.submit(bcrypt.hash, secrets.token_hex(16))
+        self.pending = 0
+        self.running = 0
+        self.peak_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+        self._lock = threading.Lock()  # Guards the counters updated from the worker threads
+
+    def _timed(self, submitted: float, fn: Callable[..., Any], *args) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            self._wait_seconds += started - submitted
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self._run_seconds += time.perf_counter() - started
+
+    async def _submit(self, fn: Callable[..., Any], *args) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        self.pending += 1
+        self.peak_queued = max(self.peak_queued, self.pending - self.running)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._timed, time.perf_counter(), fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(bcrypt.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit(bcrypt.verify, password, hashed_password)
+
+    def _verify_unknown_user(self, password: str) -> bool:
+        bcrypt.verify(password, self._unknown_user_hash.result())
+        return False
+
+    async def verify_unknown_user(self, password: str) -> bool:
+        """Spends as long as `verify` with a wrong password, then fails: for logins of unknown users."""
+        return await self._submit(self._verify_unknown_user, password)
+
+    def stats(self) -> Dict[str, Any]:
+        completed = max(self.completed, 1)
+        return {
+            "threads": self.threads,
+            "max_pending": self.max_pending,
+            "running": self.running,
+            "queued": self.pending - self.running,
+            "peak_queued": self.peak_queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": self._wait_seconds / completed * 1000,
+            "avg_run_ms": self._run_seconds / completed * 1000,
+        }
+
+password_hasher = PasswordHasher()
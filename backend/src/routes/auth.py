@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from db import SessionLocal, User
-from passlib.hash import bcrypt
+from db import User, run_db
+from passwords import PasswordHasherBusy, password_hasher
+from sessions import SESSION_COOKIE, SESSION_TTL_SECONDS, issue_token, revoke_token, verify_token
 
 auth_router = APIRouter()
 
@@ -16,45 +18,84 @@ class UserSignup(BaseModel):
     password: str
     confirm_password: str
 
-def get_db():
-    try:
-        db = SessionLocal()
-        print("Database session created successfully")
-        yield db
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        raise HTTPException(status_code=500, detail="Database connection error")
-    finally:
-        db.close()
+def _busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Too many sign-in attempts, try again shortly",
+                         headers={"Retry-After": "1"})
+
+def _session_token(request: Request) -> Optional[str]:
+    """The session token from the `Authorization: Bearer` header, or else the session cookie."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token
+    return request.cookies.get(SESSION_COOKIE)
+
+async def current_user(request: Request) -> str:
+    """Dependency resolving the logged-in user from the session token (and its revocation, if any)."""
+    token = _session_token(request)
+    username = await verify_token(token) if token else None
+    if username is None:
+        raise HTTPException(status_code=401, detail="Not logged in", headers={"WWW-Authenticate": "Bearer"})
+    return username
+
+def _start_session(response: Response, username: str) -> dict:
+    token, expires_at = issue_token(username)
+    response.set_cookie(SESSION_COOKIE, token, max_age=SESSION_TTL_SECONDS, httponly=True, samesite="strict")
+    return {"token": token, "expires_at": expires_at}
+
+def _create_user(db: Session, username: str, hashed_password: str) -> bool:
+    """Returns False if the username is taken."""
+    if db.query(User.id).filter(User.username == username).first():
+        return False
+    db.add(User(username=username, password=hashed_password))
+    db.commit()
+    return True
+
+def _get_password_hash(db: Session, username: str) -> Optional[str]:
+    row = db.query(User.password).filter(User.username == username).first()
+    return row[0] if row else None
 
 @auth_router.post("/signup")
-async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
+async def signup(user_data: UserSignup, response: Response):
     if user_data.password != user_data.confirm_password:
         raise HTTPException(status_code=400, detail="Passwords do not match")
     
-    # Check if username already exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username already exists")
-    
-    hashed_password = bcrypt.hash(user_data.password)
-    user = User(username=user_data.username, password=hashed_password)
+    try:
+        hashed_password = await password_hasher.hash(user_data.password)
+    except PasswordHasherBusy:
+        raise _busy()
     
     try:
-        db.add(user)
-        db.commit()
-        return {"message": "User created successfully"}
+        created = await run_db(_create_user, user_data.username, hashed_password)
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail="Error creating user")
+    if not created:
+        raise HTTPException(status_code=400, detail="Username already exists")
+    return {"message": "User created successfully", **_start_session(response, user_data.username)}
 
 @auth_router.post("/login")
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == user_data.username).first()
-    if not user or not bcrypt.verify(user_data.password, user.password):
+async def login(user_data: UserLogin, response: Response):
+    hashed_password = await run_db(_get_password_hash, user_data.username)
+    try:
+        if hashed_password:
+            valid = await password_hasher.verify(user_data.password, hashed_password)
+        else:
+            # Takes as long as a wrong password, so response times do not reveal which users exist
+            valid = await password_hasher.verify_unknown_user(user_data.password)
+    except PasswordHasherBusy:
+        raise _busy()
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    return {"message": "Login successful"}
+    return {"message": "Login successful", **_start_session(response, user_data.username)}
+
+@auth_router.get("/stats")
+async def password_stats():
+    """Queue depth and latency of the password hashing pool."""
+    return password_hasher.stats()
 
 @auth_router.post("/logout")
-async def logout():
+async def logout(request: Request, response: Response):
+    token = _session_token(request)
+    if token:
+        await revoke_token(token)
+    response.delete_cookie(SESSION_COOKIE)
     return {"message": "Logout successful"}
\ No newline at end of file
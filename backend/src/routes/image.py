@@ -1,12 +1,27 @@
 import aiohttp
+import base64
+import binascii
 from aiohttp import ClientSession, FormData
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Form
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from db import SessionLocal, ImageKey, User
-from crypto import encrypt_data, decrypt_data
+from pydantic import BaseModel
+from db import ImageDerivative, ImageKey, run_db
+from batch import BATCH_MEDIA_TYPE, FOUND, NOT_FOUND, frame_header, iter_body, read_frame_header
+from routes.auth import current_user
+from crypto import (
+    CRYPTO_CHUNK_SIZE, HEADER, decrypt_stream, encrypt_stream, encrypted_size, has_header, is_encrypted,
+    plaintext_size,
+)
+from http_client import IMAGE_SERVICE_BASE_URL, DIRECT_DATA_PATH, get_image_service
+from thumbnails import DERIVATIVE_CONTENT_TYPE, DERIVATIVE_SIZES, THUMBNAIL_PROCESSES, UnrenderableImage, render
+from starlette.datastructures import Headers
+import asyncio
 import hashlib
+import io
 import os
-from io import BytesIO
 import logging
 import dotenv
 
@@ -16,133 +31,643 @@ logger = logging.getLogger("uvicorn.error")
 
 image_router = APIRouter()
 
-def get_db():
+# Keys are content hashes, so an image never changes under its key and can be cached for good
+IMAGE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# ...except the original stands in for a variant not rendered yet, which must be fetched again
+PENDING_VARIANT_CACHE_CONTROL = "private, no-cache"
+
+# Derivatives are rendered in the background after upload, DERIVATIVE_CONCURRENCY images at a time.
+# Beyond DERIVATIVE_MAX_PENDING queued images, the rest are rendered the first time they are asked for.
+DERIVATIVE_CONCURRENCY = int(os.getenv("DERIVATIVE_CONCURRENCY", str(THUMBNAIL_PROCESSES)))
+DERIVATIVE_MAX_PENDING = int(os.getenv("DERIVATIVE_MAX_PENDING", "1000"))
+
+# Bulk uploads: files per request (the multipart parser's own limit is 1000), workers per stage
+# and how far a stage may run ahead of the next one
+BULK_UPLOAD_MAX_FILES = int(os.getenv("BULK_UPLOAD_MAX_FILES", "1000"))
+BULK_HASH_WORKERS = int(os.getenv("BULK_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+BULK_PUT_CONCURRENCY = int(os.getenv("BULK_PUT_CONCURRENCY", "16"))
+BULK_QUEUE_DEPTH = int(os.getenv("BULK_QUEUE_DEPTH", "32"))
+BULK_DB_BATCH = int(os.getenv("BULK_DB_BATCH", "500"))
+
+IMAGE_PAGE_SIZE = int(os.getenv("IMAGE_PAGE_SIZE", "50"))
+IMAGE_MAX_PAGE_SIZE = int(os.getenv("IMAGE_MAX_PAGE_SIZE", "200"))
+
+def _claim_image_key(db: Session, username: str, image_key: str) -> Optional[str]:
+    """
+    Reserves an image key for the user, before the image is sent to the cluster.
+    Returns None if it was free, else the user who already has it (possibly `username`).
+    """
+    db.add(ImageKey(username=username, image_key=image_key))
     try:
-        db = SessionLocal()
-        print("Database session created successfully")  # Debugging
-        yield db
-    except Exception as e:
-        print(f"Database connection error: {e}")  # Log any connection errors
-    finally:
-        db.close()
+        db.commit()
+        return None
+    except IntegrityError:
+        db.rollback()
+        return db.query(ImageKey.username).filter(ImageKey.image_key == image_key).scalar()
+
+def _claim_image_keys(db: Session, username: str, image_keys: List[str]) -> Dict[str, str]:
+    """
+    Reserves many image keys for the user in one transaction (see `_claim_image_key`). Returns the
+    owners of those already taken (possibly `username`); the others are now the user's.
+    """
+    taken = dict(db.query(ImageKey.image_key, ImageKey.username).filter(ImageKey.image_key.in_(image_keys)).all())
+    db.add_all([ImageKey(username=username, image_key=key) for key in image_keys if key not in taken])
+    try:
+        db.commit()
+    except IntegrityError:
+        # Some were claimed concurrently: claim the rest one at a time
+        db.rollback()
+        for key in image_keys:
+            if key not in taken and (owner := _claim_image_key(db, username, key)) is not None:
+                taken[key] = owner
+    return taken
+
+def _release_image_keys(db: Session, username: str, image_keys: List[str]):
+    db.query(ImageKey).filter(ImageKey.image_key.in_(image_keys), ImageKey.username == username).delete()
+    db.commit()
+
+def _image_key_owner(db: Session, image_key: str) -> Optional[str]:
+    row = db.query(ImageKey.username).filter(ImageKey.image_key == image_key).first()
+    return row[0] if row else None
+
+def _has_image_key(db: Session, username: str, image_key: str) -> bool:
+    query = db.query(ImageKey.id).filter(ImageKey.image_key == image_key, ImageKey.username == username)
+    return query.first() is not None
+
+def _owned_image_keys(db: Session, username: str, image_keys: List[str]) -> set:
+    query = db.query(ImageKey.image_key).filter(ImageKey.username == username, ImageKey.image_key.in_(image_keys))
+    return {key for key, in query.all()}
+
+def _owned_image_variants(db: Session, username: str, image_keys: List[str], variant: str) -> Dict[str, Tuple[bool, Optional[str]]]:
+    """
+    The user's images among `image_keys`, each with whether its `variant` has been rendered yet and
+    the key of the derivative (None until rendered, or if the original serves as the variant).
+    """
+    query = db.query(ImageKey.image_key, ImageDerivative.id, ImageDerivative.derivative_key).outerjoin(
+        ImageDerivative, (ImageDerivative.image_id == ImageKey.id) & (ImageDerivative.variant == variant),
+    ).filter(ImageKey.username == username, ImageKey.image_key.in_(image_keys))
+    return {key: (derivative_id is not None, derivative_key) for key, derivative_id, derivative_key in query.all()}
+
+def _add_image_derivatives(db: Session, image_key: str, derivative_keys: Dict[str, Optional[str]]):
+    image_id = db.query(ImageKey.id).filter(ImageKey.image_key == image_key).scalar()
+    if image_id is None:
+        return
+    rendered = {variant for variant, in db.query(ImageDerivative.variant).filter(ImageDerivative.image_id == image_id)}
+    db.add_all([
+        ImageDerivative(image_id=image_id, variant=variant, derivative_key=derivative_key)
+        for variant, derivative_key in derivative_keys.items() if variant not in rendered
+    ])
+    db.commit()
+
+def _list_image_keys(db: Session, username: str, before_id: Optional[int], limit: int) -> Tuple[List[str], Optional[int]]:
+    """
+    One page of a user's image keys, newest first, starting below `before_id` (keyset pagination on
+    the (username, id) index, so a page costs the same however deep it is or however many images the
+    user has). Returns the keys and the id to continue from, or None on the last page.
+    """
+    query = db.query(ImageKey.id, ImageKey.image_key).filter(ImageKey.username == username)
+    if before_id is not None:
+        query = query.filter(ImageKey.id < before_id)
+    rows = query.order_by(ImageKey.id.desc()).limit(limit + 1).all()
+    next_id = rows[limit - 1][0] if len(rows) > limit else None
+    return [key for _, key in rows[:limit]], next_id
+
+def _encode_cursor(image_id: int) -> str:
+    return base64.urlsafe_b64encode(str(image_id).encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-IMAGE_SERVICE_IP = os.getenv("IMAGE_SERVICE_IP", "localhost")
-IMAGE_SERVICE_PORT = os.getenv("IMAGE_SERVICE_PORT", "8000")
-IMAGE_SERVICE_BASE_URL = f"http://{IMAGE_SERVICE_IP}:{IMAGE_SERVICE_PORT}"
+HASH_CHUNK_SIZE = 1024 * 1024  # Uploads are hashed 1 MiB at a time
 
-def hash_key(key: str) -> int:
-    """Generate a consistent hash for a given key."""
-    return int(hashlib.sha256(key.encode()).hexdigest(), 16)
+def _hash_file(file) -> str:
+    digest = hashlib.sha256()
+    file.seek(0)
+    while chunk := file.read(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
 
-async def store_image(user_id: int, username: str, image_file: UploadFile, db: Session):
+async def hash_upload(image_file: UploadFile) -> str:
+    """
+    Computes the content key of an upload chunk by chunk from its spool file, then rewinds it.
+    The key is the SHA-256 hex digest, the 64-char form the nodes place on the ring as is.
+    Runs on a worker thread (hashlib releases the GIL), so several uploads hash in parallel.
+    """
+    return await asyncio.to_thread(_hash_file, image_file.file)
+
+def _upload_size(image_file: UploadFile) -> int:
+    return image_file.size if image_file.size is not None else image_file.file.seek(0, 2)
+
+async def store_image(username: str, image_file: UploadFile):
     """
     Handles image processing, storage, and metadata insertion into the database.
     """
-    # Read the raw image data
-    raw_image_data = await image_file.read()
+    # Hash the raw image (streamed from the spooled upload) to use as the key
+    image_key = await hash_upload(image_file)
+
+    # Save metadata (image key) to the database first: the unique key reserves the image, so the
+    # cluster copy (and its owner in the node index) is never overwritten for another user
+    owner = await run_db(_claim_image_key, username, image_key)
+    if owner == username:
+        return image_key
+    if owner is not None:
+        raise HTTPException(status_code=409, detail="Image already stored by another user")
+    try:
+        await put_image(username, image_key, image_file)
+    except BaseException:
+        await run_db(_release_image_keys, username, [image_key])
+        raise
+
+    schedule_derivatives(username, image_key)
+    return image_key
+
+async def store_images(username: str, image_files: List[UploadFile]) -> List[dict]:
+    """
+    Bulk upload pipeline. Images flow through three stages joined by bounded queues, so the stages
+    work on different images at the same time and none runs more than BULK_QUEUE_DEPTH images ahead:
+    - hash (BULK_HASH_WORKERS workers): content keys, computed on worker threads
+    - claim (one worker): image keys reserved for the user, up to BULK_DB_BATCH at a time (those
+      waiting), a batch per transaction; as in `store_image`, before the images reach the cluster
+    - put (BULK_PUT_CONCURRENCY workers): uploads to the image storage service, which routes each
+      image to its nodes, encrypted on the crypto threads as it is sent; a failed upload releases
+      its key
+    Returns one result per file, in order, with its key and status ("stored", "exists" or "failed").
+    """
+    results: List[dict] = [{"filename": image_file.filename} for image_file in image_files]
+    hashed: asyncio.Queue = asyncio.Queue(BULK_QUEUE_DEPTH)
+    claimed: asyncio.Queue = asyncio.Queue(BULK_QUEUE_DEPTH)
+    pending = iter(range(len(image_files)))
+    first: Dict[str, int] = {}  # Key -> first file of the batch with that content
+    reserved: Set[str] = set()  # Keys claimed and not yet stored or released
+
+    def _fail(index: int, detail: str):
+        results[index].update(status="failed", detail=detail)
 
-    # Compute the hash of the raw image to use as the key
-    image_key = hash_key(raw_image_data.decode('latin1'))
+    async def _hash():
+        for index in pending:
+            try:
+                results[index]["key"] = await hash_upload(image_files[index])
+            except Exception as e:
+                logger.error(f"Failed to hash {results[index]['filename']}: {e}")
+                _fail(index, "Failed to read image")
+                continue
+            await hashed.put(index)
 
-    image_file.file.seek(0)  # Reset the pointer to the beginning of the file
+    async def _claim_batch(batch: List[int]):
+        new = []
+        for index in batch:
+            key = results[index]["key"]
+            if key in first:
+                results[index]["status"] = "exists"
+            else:
+                first[key] = index
+                new.append(index)
+        if not new:
+            return
+        keys = [results[index]["key"] for index in new]
+        try:
+            owners = await run_db(_claim_image_keys, username, keys)
+        except Exception as e:
+            logger.error(f"Failed to save {len(keys)} image keys: {e}")
+            for index in new:
+                _fail(index, "Failed to save image metadata")
+            return
+        for index in new:
+            owner = owners.get(results[index]["key"])
+            if owner == username:
+                results[index]["status"] = "exists"
+            elif owner is not None:
+                _fail(index, "Image already stored by another user")
+            else:
+                reserved.add(results[index]["key"])
+                await claimed.put(index)
 
-    # Encrypt the image data
-    encrypted_image_data = encrypt_data(raw_image_data)
+    async def _claim():
+        done = False
+        while not done:
+            batch = [await hashed.get()]
+            while len(batch) < BULK_DB_BATCH and not hashed.empty():
+                batch.append(hashed.get_nowait())
+            done = None in batch
+            await _claim_batch([index for index in batch if index is not None])
+        for _ in range(BULK_PUT_CONCURRENCY):
+            await claimed.put(None)
 
-    # Prepare the encrypted data as a file for the upload
-    encrypted_file = BytesIO(encrypted_image_data)
-    encrypted_file.seek(0)  # Reset the pointer to the beginning of the file
+    async def _put():
+        while (index := await claimed.get()) is not None:
+            key = results[index]["key"]
+            try:
+                await put_image(username, key, image_files[index])
+            except Exception as e:
+                logger.error(f"Failed to upload image {key}: {e}")
+                _fail(index, "Failed to upload image")
+                try:
+                    await run_db(_release_image_keys, username, [key])
+                except Exception as e:
+                    logger.error(f"Failed to release image key {key}: {e}")
+                reserved.discard(key)
+                continue
+            reserved.discard(key)
+            results[index]["status"] = "stored"
+            schedule_derivatives(username, key)
 
-    connection = aiohttp.ClientSession(
-            base_url=IMAGE_SERVICE_BASE_URL,
-            timeout=aiohttp.ClientTimeout(total=10)
+    async def _hash_stage():
+        await asyncio.gather(*(_hash() for _ in range(BULK_HASH_WORKERS)))
+        await hashed.put(None)
+
+    try:
+        await asyncio.gather(_hash_stage(), _claim(), *(_put() for _ in range(BULK_PUT_CONCURRENCY)))
+    except BaseException:
+        # Cancelled (e.g. the client went away): the keys not stored yet are free again
+        if reserved:
+            await run_db(_release_image_keys, username, list(reserved))
+        raise
+    return results
+
+async def put_image(username: str, image_key: str, image_file: UploadFile):
+    """
+    Uploads an image to the image storage service, encrypted chunk by chunk (on the crypto worker
+    threads) as it is sent.
+    """
+    size = _upload_size(image_file)
+    await image_file.seek(0)
+
+    logger.info(f"Uploading image with key: {image_key}")
+
+    if not (DIRECT_DATA_PATH and await upload_direct(username, image_key, image_file, encrypted_size(size))):
+        form = FormData()
+        form.add_field("username", username)
+        form.add_field("key", image_key)
+        form.add_field(
+            "image",
+            filename=image_file.filename,
+            value=encrypt_stream(image_file.read),
+            content_type=image_file.content_type,
         )
-    # Upload the encrypted file to the image storage service
-    
-    form = FormData()
-    form.add_field("username", username)
-    form.add_field("key", str(image_key))
-    form.add_field(
-        "file",
-        filename=image_file.filename,
-        value=image_file.file,
-        content_type=image_file.content_type,
-    )
-    
-    print(f"Uploading image with key: {image_key}")
-    print(f"Form type: {type(form)}")
-    print(f"Form fields: {form._fields}")
-    print(f"form._fields[0]: {form._fields[0]}")
-    print(f"form._fields[1]: {form._fields[1]}")
-    print(f"form._fields[2]: {form._fields[2]}")
-
-    async with connection.post(
-        "/put_image",
-        data=form
-    ) as response:
+
+        async with get_image_service().post(
+            f"{IMAGE_SERVICE_BASE_URL}/put_image",
+            data=form
+        ) as response:
+            # The service answers 200 with {"success": false} when no node stored the image
+            result = await response.json(content_type=None) if response.status == 200 else None
+            if not isinstance(result, dict) or result.get("success") is not True:
+                logger.error(f"Failed to upload image: {response.status} - {result or await response.text()}")
+                raise HTTPException(status_code=500, detail="Failed to upload image")
+
+async def upload_direct(username: str, image_key: str, image_file: UploadFile, size: int) -> bool:
+    """
+    Direct data path: gets signed node URLs from the image storage service and uploads every replica
+    straight to the nodes. Returns False if the image has to be sent through `/put_image` instead.
+    The service only hands out URLs for images below its chunking threshold, so the ciphertext
+    (`size` bytes) is encrypted once and kept in memory for all the replicas.
+    """
+    session = get_image_service()
+    params = {"username": username, "key": image_key, "size": size}
+    async with session.get(f"{IMAGE_SERVICE_BASE_URL}/put_image_urls", params=params) as response:
         if response.status != 200:
-            logger.error(f"Failed to upload image: {response.status} - {response.text}")
-            raise HTTPException(status_code=500, detail="Failed to upload image")
+            return False
+        urls = (await response.json())["urls"]
+    if not urls:
+        return False
+    data = b"".join([sealed async for sealed in encrypt_stream(image_file.read)])
 
-    # Save metadata (image key) to the database
-    db_image_key = ImageKey(id=user_id, username=username, image_key=image_key)
-    db.add(db_image_key)
-    db.commit()
+    async def _upload(url: str) -> bool:
+        form = FormData()
+        form.add_field("username", username)
+        form.add_field("key", image_key)
+        form.add_field("file", data, filename=image_file.filename, content_type=image_file.content_type)
+        async with session.post(url, data=form) as response:
+            return response.status == 200
 
-    return image_key
+    results = await asyncio.gather(*(_upload(url) for url in urls), return_exceptions=True)
+    if not any(result is True for result in results):
+        logger.error(f"Failed to upload image {image_key} to any of its nodes: {results}")
+        raise HTTPException(status_code=500, detail="Failed to upload image")
+    return True
+
+async def _prepend(head: bytes, rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    yield head
+    async for piece in rest:
+        yield piece
 
-async def retrieve_image(username: str, image_key: str):
+async def open_image(username: str, image_key: str) -> Tuple[Optional[int], AsyncIterator[bytes]]:
     """
-    Retrieves the encrypted image using the image storage service's `/get_image` endpoint.
+    Opens an image through the image storage service's `/get_image` endpoint. Returns its size (None
+    for images stored before the chunked format, whose size is only known once decrypted) and an
+    iterator decrypting it chunk by chunk as it downloads, which releases the download when closed.
+    On the direct data path, the service redirects to a signed URL on a node holding the image.
     """
-    connection = aiohttp.ClientSession(
-        base_url=IMAGE_SERVICE_BASE_URL,
-        timeout=aiohttp.ClientTimeout(total=10)
-    )
-    async with connection.get(f"/get_image", params={"username": username, "key": image_key}) as response:
+    params = {"username": username, "key": image_key}
+    if DIRECT_DATA_PATH:
+        params["redirect"] = "true"
+    response = await get_image_service().get(f"{IMAGE_SERVICE_BASE_URL}/get_image", params=params)
+    try:
+        head = b""
         if response.status == 200:
-            return await response.read()
-        raise HTTPException(status_code=404, detail="Image not found")
-    
+            try:
+                head = await response.content.readexactly(HEADER.size)
+            except asyncio.IncompleteReadError as e:
+                head = e.partial
+        # The service answers a missing image with a JSON message
+        if not is_encrypted(head):
+            raise HTTPException(status_code=404, detail="Image not found")
+    except BaseException:
+        response.release()
+        raise
+
+    size = None
+    if has_header(head) and response.content_length is not None:
+        size = plaintext_size(head, response.content_length)
+
+    async def _plaintext():
+        try:
+            async for plaintext in decrypt_stream(_prepend(head, response.content.iter_chunked(CRYPTO_CHUNK_SIZE))):
+                yield plaintext
+        finally:
+            response.release()
+
+    return size, _plaintext()
+
+_derivative_jobs: Dict[str, asyncio.Task] = {}  # Image key -> its running or queued job
+_derivative_slots = asyncio.Semaphore(DERIVATIVE_CONCURRENCY)
+
+def schedule_derivatives(username: str, image_key: str):
+    """
+    Queues the rendering of an image's derivatives in the background, unless it is already queued
+    or the queue is full (the variants are then rendered when first requested).
+    """
+    if image_key in _derivative_jobs or len(_derivative_jobs) >= DERIVATIVE_MAX_PENDING:
+        return
+    job = asyncio.create_task(make_derivatives(username, image_key))
+    _derivative_jobs[image_key] = job
+    job.add_done_callback(lambda _: _derivative_jobs.pop(image_key, None))
+
+async def make_derivatives(username: str, image_key: str):
+    """
+    Reads an image back from the cluster, renders its derivatives on the thumbnail worker processes,
+    stores each in the cluster under its own content key and links them to the image. Images that do
+    not decode get no derivatives; the original then serves as every variant. On any other failure
+    nothing is recorded, so the image is tried again the next time one of its variants is requested.
+    """
+    async with _derivative_slots:
+        try:
+            _, chunks = await open_image(username, image_key)
+            data = b"".join([chunk async for chunk in chunks])
+            try:
+                derivatives = await render(data)
+            except UnrenderableImage as e:
+                logger.info(f"Serving image {image_key} as its own variants, it does not decode: {e}")
+                derivatives = dict.fromkeys(DERIVATIVE_SIZES)
+            del data
+
+            derivative_keys: Dict[str, Optional[str]] = {}
+            for variant, derivative in derivatives.items():
+                if derivative is None:
+                    derivative_keys[variant] = None
+                    continue
+                derivative_key = hashlib.sha256(derivative).hexdigest()
+                upload = UploadFile(
+                    io.BytesIO(derivative), size=len(derivative), filename=f"{derivative_key}.webp",
+                    headers=Headers({"content-type": DERIVATIVE_CONTENT_TYPE}),
+                )
+                await put_image(username, derivative_key, upload)
+                derivative_keys[variant] = derivative_key
+            await run_db(_add_image_derivatives, image_key, derivative_keys)
+        except Exception as e:
+            logger.error(f"Failed to render the derivatives of image {image_key}: {e}")
+
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"BM", "image/bmp"),
+)
+
+def _sniff_content_type(head: bytes) -> str:
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, content_type in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return "application/octet-stream"
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def _parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    The first and last byte of a single `bytes=` range, or None to send the whole image (no range,
+    several ranges or an invalid one, e.g. ending before it starts). Raises 416 if the range is
+    valid but past the end of the image (RFC 9110, section 14.1.2).
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    first, _, last = range_header[len("bytes="):].strip().partition("-")
+    if not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+    if first:
+        start, end = int(first), int(last) if last else size - 1
+        if last and end < start:
+            return None
+    else:
+        start, end = max(size - int(last), 0), size - 1  # The last N bytes
+    if start >= size or end < start:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+async def _body(head: bytes, chunks: AsyncIterator[bytes], first: int = 0, last: Optional[int] = None):
+    """Yields `head` then `chunks`, cut to bytes `first` to `last`, and closes `chunks` when done."""
+    async def _all():
+        yield head
+        async for chunk in chunks:
+            yield chunk
+
+    position = 0
+    try:
+        async for chunk in _all():
+            end = position + len(chunk)
+            if end > first:
+                yield chunk[max(first - position, 0):None if last is None else last + 1 - position]
+            position = end
+            if last is not None and position > last:
+                break
+    finally:
+        await chunks.aclose()
 
 @image_router.post("/upload")
-async def upload_image(username: str = Form(...), image: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_image(image: UploadFile = File(...), username: str = Depends(current_user)):
     """
     Handle image uploads and associate them with the logged-in user.
     """
-    # Lookup user_id based on the username
-    user = db.query(User).filter(User.username == username).first()
-    # if not user:
-    #     raise HTTPException(
-    #         status_code=status.HTTP_404_NOT_FOUND,
-    #         detail="User not found",
-    #     )
-    user_id = user.id
-
-    image_key = await store_image(user_id=user_id, username=username, image_file=image, db=db)
+    image_key = await store_image(username=username, image_file=image)
     return {"message": "Image uploaded successfully", "key": image_key}
 
+@image_router.post("/upload_batch")
+async def upload_images(images: List[UploadFile] = File(...), username: str = Depends(current_user)):
+    """
+    Bulk upload: stores many images in one request through a staged pipeline (see store_images).
+    Files that fail do not fail the request; check the status of each result.
+    """
+    if len(images) > BULK_UPLOAD_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_UPLOAD_MAX_FILES} images per request")
+    results = await store_images(username=username, image_files=images)
+    stored = sum(result["status"] == "stored" for result in results)
+    return {"message": f"Stored {stored} of {len(results)} images", "results": results}
+
+@image_router.get("/list")
+async def list_images(
+    cursor: Optional[str] = None,
+    limit: int = Query(IMAGE_PAGE_SIZE, ge=1, le=IMAGE_MAX_PAGE_SIZE),
+    username: str = Depends(current_user),
+):
+    """
+    Lists the user's image keys newest first, a page at a time. Pass the returned `next_cursor`
+    back as `cursor` for the next page; it is null on the last page.
+    """
+    before_id = _decode_cursor(cursor) if cursor else None
+    keys, next_id = await run_db(_list_image_keys, username, before_id, limit)
+    return {"images": keys, "next_cursor": _encode_cursor(next_id) if next_id is not None else None}
+
+class ImageKeys(BaseModel):
+    keys: List[str]
+    size: Optional[str] = None  # A variant (see thumbnails.py) to send instead of the originals
+
+def _check_variant(size: str):
+    if size not in DERIVATIVE_SIZES:
+        raise HTTPException(status_code=400, detail=f"Unknown image size, expected one of: {', '.join(DERIVATIVE_SIZES)}")
+
+def _variant_sources(username: str, variants: Dict[str, Tuple[bool, Optional[str]]]) -> Dict[str, str]:
+    """
+    Maps the key to fetch for each image (its derivative, or the original if the variant is not
+    rendered yet or is the original) to the image, and queues the rendering of missing variants.
+    """
+    names: Dict[str, str] = {}
+    for image_key, (rendered, derivative_key) in variants.items():
+        if not rendered:
+            schedule_derivatives(username, image_key)
+        # Keys are content hashes: two images can only share a source if the same bytes were uploaded
+        # both as an image and as another's derivative, then the second is sent at full size
+        for source in (derivative_key, image_key):
+            if source and source not in names:
+                names[source] = image_key
+                break
+    return names
+
+async def _decrypted_frames(response: aiohttp.ClientResponse, keys: List[str], names: Dict[str, str]) -> AsyncIterator[bytes]:
+    """
+    Re-frames the image storage service's batch response with every image decrypted as it streams
+    and each frame named after the image it was fetched for (`names`, by fetched key), then adds
+    NOT_FOUND frames for the `keys` it did not answer for. Releases the response at the end.
+    """
+    answered = set()
+    try:
+        while frame := await read_frame_header(response.content):
+            source, status, size = frame
+            key = names.get(source, source)
+            answered.add(key)
+            if status != FOUND:
+                yield frame_header(key, NOT_FOUND)
+                continue
+            head = await response.content.readexactly(min(size, HEADER.size))
+            ciphertext = _prepend(head, iter_body(response.content, size - len(head), CRYPTO_CHUNK_SIZE))
+            if has_header(head):
+                yield frame_header(key, FOUND, plaintext_size(head, size))
+                async for plaintext in decrypt_stream(ciphertext):
+                    yield plaintext
+            else:  # Stored before the chunked format: decrypted whole, as its size is only known then
+                image = b"".join([plaintext async for plaintext in decrypt_stream(ciphertext)])
+                yield frame_header(key, FOUND, len(image))
+                yield image
+        for key in keys:
+            if key not in answered:
+                yield frame_header(key, NOT_FOUND)
+    finally:
+        response.release()
+
+@image_router.post("/batch")
+async def get_images(image_keys: ImageKeys, username: str = Depends(current_user)):
+    """
+    Streams several of the user's images in one response (e.g. a gallery page): one frame per key,
+    found or not (see batch.py), each image decrypted as it arrives. The image storage service reads
+    the images from their nodes concurrently, one request per node. With a `size`, each frame holds
+    that variant of the image, or the original until the variant is rendered.
+    """
+    if len(image_keys.keys) > IMAGE_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {IMAGE_MAX_PAGE_SIZE} images per batch")
+    keys = list(dict.fromkeys(image_keys.keys))
+    if image_keys.size is None:
+        names = {key: key for key in await run_db(_owned_image_keys, username, keys)}
+    else:
+        _check_variant(image_keys.size)
+        names = _variant_sources(username, await run_db(_owned_image_variants, username, keys, image_keys.size))
+    response = await get_image_service().post(
+        f"{IMAGE_SERVICE_BASE_URL}/get_images",
+        json={"username": username, "keys": list(names)},
+    )
+    if response.status != 200:
+        response.release()
+        raise HTTPException(status_code=502, detail="Failed to fetch images")
+    return StreamingResponse(_decrypted_frames(response, keys, names), media_type=BATCH_MEDIA_TYPE)
+
+# Declared after /list, which it would otherwise shadow
 @image_router.get("/{key}")
-async def get_image(username: str, key: str, db: Session = Depends(get_db)):
-    # Verify the key exists in the database for the given user
-    image_entry = db.query(ImageKey).filter(ImageKey.image_key == key, ImageKey.username == username).first()
-    if not image_entry:
-        raise HTTPException(status_code=404, detail="Image metadata not found")
+async def get_image(key: str, request: Request, variant: Optional[str] = Query(None, alias="size"), username: str = Depends(current_user)):
+    """
+    Streams the decrypted image as it downloads. The key doubles as the ETag, so a cached copy is
+    revalidated without fetching the image, and a single byte `Range` is served when the size of
+    the image is known. With a `size`, that variant of the image is sent instead (see thumbnails.py),
+    or the original, not to be cached, until the variant is rendered.
+    """
+    source, cache_control = key, IMAGE_CACHE_CONTROL
+    if variant is None:
+        # Verify the key exists in the database for the given user
+        if not await run_db(_has_image_key, username, key):
+            raise HTTPException(status_code=404, detail="Image metadata not found")
+    else:
+        _check_variant(variant)
+        variants = await run_db(_owned_image_variants, username, [key], variant)
+        if key not in variants:
+            raise HTTPException(status_code=404, detail="Image metadata not found")
+        rendered, derivative_key = variants[key]
+        if not rendered:
+            schedule_derivatives(username, key)
+            cache_control = PENDING_VARIANT_CACHE_CONTROL
+        source = derivative_key or key
 
-    # Retrieve and decrypt the image from the storage service
-    encrypted_image = await retrieve_image(username=username, image_key=key)
-    decrypted_image = decrypt_data(encrypted_image)
+    headers = {"ETag": f'"{source}"', "Cache-Control": cache_control}
+    if _etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
 
-    # Return the decrypted image (for now, as bytes)
-    return {"image_data": decrypted_image.decode('latin1')}
+    size, chunks = await open_image(username=username, image_key=source)
+    try:
+        # The first chunk gives the content type and shows the image decrypts before a status is sent
+        head = await anext(chunks, b"")  # Nothing at all for an empty image
+        byte_range = _parse_range(request.headers.get("Range"), size) if size is not None else None
+    except BaseException:
+        await chunks.aclose()
+        raise
+    media_type = _sniff_content_type(head)
 
-@image_router.get("/list")
-async def list_images(username: str, db: Session = Depends(get_db)):
-    # Lookup user_id based on the username
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Retrieve all image keys associated with the user
-    image_keys = db.query(ImageKey.image_key).filter(ImageKey.username == username).all()
-    return {"images": [key for key, in image_keys]}
+    if size is None:
+        return StreamingResponse(_body(head, chunks), media_type=media_type, headers=headers)
+    headers["Accept-Ranges"] = "bytes"
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(_body(head, chunks), media_type=media_type, headers=headers)
+    first, last = byte_range
+    headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+    headers["Content-Length"] = str(last - first + 1)
+    return StreamingResponse(
+        _body(head, chunks, first, last), status_code=206, media_type=media_type, headers=headers,
+    )
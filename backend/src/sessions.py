@@ -0,0 +1,82 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from typing import Optional, Tuple
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import dotenv
+from crypto import FERNET_KEY
+from db import RevokedToken, run_db
+dotenv.load_dotenv()
+
+# A token carries the username and expiry, signed with HMAC-SHA256, so requests are authenticated
+# without bcrypt or a user lookup. Logged out tokens are recorded in the database until they
+# expire (one primary key lookup per request), so logging out holds on every worker.
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(12 * 3600)))
+SESSION_COOKIE = "session"
+
+# Derived from the same secret as the image key unless set, so every worker signs alike
+_secret = os.getenv("SESSION_SECRET")
+SESSION_KEY = _secret.encode() if _secret else HKDF(
+    algorithm=hashes.SHA256(), length=32, salt=None, info=b"dynamo-session-tokens/hmac-sha256/v1",
+).derive(base64.urlsafe_b64decode(FERNET_KEY))
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SESSION_KEY, payload.encode(), hashlib.sha256).digest())
+
+def _is_revoked(db: Session, token_id: str) -> bool:
+    return db.query(RevokedToken.token_id).filter(RevokedToken.token_id == token_id).first() is not None
+
+def _revoke(db: Session, token_id: str, expires_at: int):
+    """Records a revocation, dropping those of tokens that have expired since (no longer valid anyway)."""
+    db.query(RevokedToken).filter(RevokedToken.expires_at <= int(time.time())).delete()
+    db.add(RevokedToken(token_id=token_id, expires_at=expires_at))
+    try:
+        db.commit()
+    except IntegrityError:  # Already revoked
+        db.rollback()
+
+def issue_token(username: str) -> Tuple[str, int]:
+    """Returns a signed session token for `username` and its expiry (epoch seconds)."""
+    expires_at = int(time.time()) + SESSION_TTL_SECONDS
+    payload = _b64encode(json.dumps(
+        {"sub": username, "exp": expires_at, "jti": _b64encode(os.urandom(12))},
+        separators=(",", ":"),
+    ).encode())
+    return f"{payload}.{_sign(payload)}", expires_at
+
+def _claims(token: str) -> Optional[dict]:
+    """Claims of a correctly signed, unexpired token, else None."""
+    payload, _, signature = token.partition(".")
+    if not hmac.compare_digest(_sign(payload).encode(), signature.encode()):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims["exp"] <= time.time():
+        return None
+    return claims
+
+async def verify_token(token: str) -> Optional[str]:
+    """Returns the username of a valid, unrevoked session token, else None."""
+    claims = _claims(token)
+    if claims is None or await run_db(_is_revoked, claims["jti"]):
+        return None
+    return claims["sub"]
+
+async def revoke_token(token: str):
+    claims = _claims(token)
+    if claims is not None:
+        await run_db(_revoke, claims["jti"], claims["exp"])
@@ -0,0 +1,80 @@
+import asyncio
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+from PIL import Image, ImageOps
+import dotenv
+dotenv.load_dotenv()
+
+# Derivatives are downscaled WebP copies of an image, one per variant, fitted within its size in
+# pixels (the gallery shows "thumb" tiles, "preview" is for viewing an image on screen). Decoding
+# and resizing hold the GIL for tens to hundreds of ms per image, so they run on
+# THUMBNAIL_PROCESSES worker processes instead of the event loop or a thread.
+DERIVATIVE_SIZES = {
+    "thumb": int(os.getenv("THUMBNAIL_SIZE", "256")),
+    "preview": int(os.getenv("PREVIEW_SIZE", "1024")),
+}
+DERIVATIVE_CONTENT_TYPE = "image/webp"
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+THUMBNAIL_PROCESSES = int(os.getenv("THUMBNAIL_PROCESSES", str(min(2, os.cpu_count() or 1))))
+
+class UnrenderableImage(Exception):
+    """Raised for data Pillow cannot decode as an image; it has no derivatives."""
+
+def render_derivatives(data: bytes, sizes: Dict[str, int], quality: int) -> Dict[str, Optional[bytes]]:
+    """
+    Decodes an image once and encodes a derivative per variant, each downscaled from the next larger
+    one. A variant is None when the original is no larger (in pixels or bytes) than its derivative
+    would be, so the original serves as is. Runs in a worker process.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        longest = max(image.size)
+        # JPEGs are decoded straight at the smallest scale still covering the largest variant
+        image.draft(None, (max(sizes.values()),) * 2)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+        derivatives: Dict[str, Optional[bytes]] = {}
+        for name, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+            if longest <= size:
+                derivatives[name] = None
+                continue
+            image = image.copy()
+            image.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            encoded = io.BytesIO()
+            image.save(encoded, "WEBP", quality=quality)
+            derivatives[name] = encoded.getvalue() if encoded.tell() < len(data) else None
+        return derivatives
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError) as e:
+        raise UnrenderableImage(str(e))
+
+def _new_executor() -> ProcessPoolExecutor:
+    # Spawned rather than forked: the server process runs threads (database, crypto, bcrypt pools)
+    return ProcessPoolExecutor(THUMBNAIL_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+
+_executor = _new_executor()
+
+async def render(data: bytes) -> Dict[str, Optional[bytes]]:
+    """
+    Renders the derivatives of an image (see `render_derivatives`) on the worker processes.
+    A worker that dies (e.g. killed for memory) breaks the whole pool, so it is replaced for the
+    next image and this one fails with BrokenProcessPool.
+    """
+    global _executor
+    executor = _executor
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, render_derivatives, data, DERIVATIVE_SIZES, THUMBNAIL_QUALITY)
+    except BrokenProcessPool:
+        if _executor is executor:
+            _executor = _new_executor()
+        raise
+
+def shutdown():
+    """Stops the worker processes, dropping queued work (derivatives are rendered again on request)."""
+    _executor.shutdown(wait=False, cancel_futures=True)
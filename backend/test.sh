@@ -0,0 +1 @@
+pytest
\ No newline at end of file
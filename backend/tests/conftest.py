@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+from cryptography.fernet import Fernet
+
+# The backend's modules import each other from src/ and read their configuration from the
+# environment when first imported: point them at a throwaway database and key
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault("FERNET_KEY", Fernet.generate_key().decode())
@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from batch import FOUND, FRAME_HEADER, NOT_FOUND, frame_header, iter_body, read_frame_header
+
+
+async def read_frames(*parts: bytes, piece_size: int = 3):
+    """The (key, status, body) of the frames of a stream received as `parts`."""
+    content = asyncio.StreamReader()
+    for part in parts:
+        content.feed_data(part)
+    content.feed_eof()
+    frames = []
+    while (frame := await read_frame_header(content)) is not None:
+        key, status, size = frame
+        frames.append((key, status, b"".join([piece async for piece in iter_body(content, size, piece_size)])))
+    return frames
+
+
+def test_frames_are_demultiplexed():
+    frames = [("a" * 64, FOUND, b"first image"), ("clé", NOT_FOUND, b""), ("b", FOUND, bytes(range(256)) * 4)]
+    data = b"".join(frame_header(key, status, len(body)) + body for key, status, body in frames)
+
+    # Fed a byte at a time, so headers and bodies arrive split anywhere
+    assert asyncio.run(read_frames(*(data[i:i + 1] for i in range(len(data))))) == frames
+    assert asyncio.run(read_frames(data, piece_size=1000)) == frames
+
+
+def test_empty_stream():
+    assert asyncio.run(read_frames()) == []
+
+
+def test_torn_header_fails():
+    data = frame_header("key", FOUND, 5) + b"image"
+    with pytest.raises(asyncio.IncompleteReadError):
+        asyncio.run(read_frames(data + data[:FRAME_HEADER.size - 1]))
+
+
+def test_torn_body_fails():
+    data = frame_header("key", FOUND, 10) + b"short"
+    with pytest.raises(IOError):
+        asyncio.run(read_frames(data))
@@ -0,0 +1,129 @@
+import asyncio
+import io
+import os
+import pytest
+from cryptography.exceptions import InvalidTag
+import crypto
+from crypto import (
+    HEADER, LEGACY_HEADER, LEGACY_MAGIC, TAG_SIZE, Decryptor, Encryptor, decrypt_data, decrypt_stream,
+    encrypt_data, encrypt_stream, encrypted_size, fernet, has_header, is_encrypted, plaintext_size,
+)
+
+CHUNK_SIZE = 16
+
+
+def encrypt(data: bytes, chunk_size: int = CHUNK_SIZE) -> bytes:
+    encryptor = Encryptor(chunk_size)
+    return encryptor.update(data) + encryptor.finalize()
+
+
+def decrypt(data: bytes, piece_size: int = 7) -> bytes:
+    decryptor = Decryptor()
+    out = [decryptor.update(data[start:start + piece_size]) for start in range(0, len(data), piece_size)]
+    return b"".join(out) + decryptor.finalize()
+
+
+def pieces(data: bytes, size: int):
+    async def _pieces():
+        for start in range(0, len(data), size):
+            yield data[start:start + size]
+    return _pieces()
+
+
+async def collect(chunks) -> bytes:
+    return b"".join([chunk async for chunk in chunks])
+
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK_SIZE - 1, CHUNK_SIZE, CHUNK_SIZE + 1, 5 * CHUNK_SIZE, 5 * CHUNK_SIZE + 3])
+def test_round_trip(size):
+    data = os.urandom(size)
+    sealed = encrypt(data)
+
+    assert decrypt(sealed) == data
+    assert decrypt(sealed, piece_size=len(sealed) or 1) == data
+    assert len(sealed) == encrypted_size(size, CHUNK_SIZE)
+    assert plaintext_size(sealed[:HEADER.size], len(sealed)) == size
+    assert has_header(sealed) and is_encrypted(sealed)
+
+
+def test_every_image_has_its_own_key():
+    data = os.urandom(100)
+    first, second = encrypt(data), encrypt(data)
+    assert first[:4] == second[:4]
+    assert first[HEADER.size:] != second[HEADER.size:]
+
+
+def test_streams_round_trip():
+    data = os.urandom(3 * crypto.CRYPTO_CHUNK_SIZE + 100)
+    upload = io.BytesIO(data)
+
+    async def read(size):
+        return upload.read(size)
+
+    async def _round_trip():
+        sealed = await collect(encrypt_stream(read))
+        return sealed, await collect(decrypt_stream(pieces(sealed, 333)))
+
+    sealed, plaintext = asyncio.run(_round_trip())
+    assert plaintext == data
+    assert decrypt_data(sealed) == data
+    assert len(sealed) == encrypted_size(len(data))
+
+
+@pytest.mark.parametrize("cut", [
+    TAG_SIZE + CHUNK_SIZE,  # The whole last chunk
+    1,                      # Part of it
+])
+def test_truncated_image_fails(cut):
+    sealed = encrypt(os.urandom(3 * CHUNK_SIZE + 5))
+    with pytest.raises(InvalidTag):
+        decrypt(sealed[:-cut])
+
+
+def test_missing_header_fails():
+    sealed = encrypt(b"image")
+    with pytest.raises(ValueError):
+        decrypt(sealed[:HEADER.size - 1])
+
+
+@pytest.mark.parametrize("position", [
+    6,                                  # Chunk size in the header
+    HEADER.size - 1,                    # Salt
+    HEADER.size,                        # First chunk
+    HEADER.size + CHUNK_SIZE + TAG_SIZE,  # Second chunk
+    -1,                                 # Tag of the last chunk
+])
+def test_tampered_image_fails(position):
+    sealed = bytearray(encrypt(os.urandom(2 * CHUNK_SIZE + 5)))
+    sealed[position] ^= 1
+    with pytest.raises((InvalidTag, ValueError)):
+        decrypt(bytes(sealed))
+
+
+def test_chunks_cannot_be_reordered():
+    sealed = encrypt(os.urandom(3 * CHUNK_SIZE))
+    chunk = CHUNK_SIZE + TAG_SIZE
+    body = sealed[HEADER.size:]
+    swapped = sealed[:HEADER.size] + body[chunk:2 * chunk] + body[:chunk] + body[2 * chunk:]
+    with pytest.raises(InvalidTag):
+        decrypt(swapped)
+
+
+def test_legacy_formats_still_decrypt():
+    data = os.urandom(2 * CHUNK_SIZE + 3)
+    prefix = os.urandom(7)
+    header = LEGACY_HEADER.pack(LEGACY_MAGIC, CHUNK_SIZE, prefix)
+    chunks = [data[start:start + CHUNK_SIZE] for start in range(0, len(data), CHUNK_SIZE)]
+    sealed = header + b"".join(
+        crypto._legacy_aesgcm.encrypt(crypto._nonce(prefix, i, i == len(chunks) - 1), chunk, header)
+        for i, chunk in enumerate(chunks)
+    )
+
+    assert decrypt(sealed) == data
+    assert plaintext_size(sealed[:LEGACY_HEADER.size], len(sealed)) == len(data)
+
+    token = fernet.encrypt(data)
+    assert is_encrypted(token) and not has_header(token)
+    assert decrypt_data(token) == data
+    assert asyncio.run(collect(decrypt_stream(pieces(token, 10)))) == data
+    assert decrypt_data(encrypt_data(data)) == data
@@ -0,0 +1,21 @@
+import asyncio
+import threading
+import pytest
+from db import ImageKey, run_db
+from routes import image
+
+
+def test_queries_run_on_the_database_threads():
+    name = asyncio.run(run_db(lambda db: threading.current_thread().name))
+    assert name.startswith("db") and name != threading.current_thread().name
+
+
+def test_failed_query_is_rolled_back():
+    def _fail(db):
+        db.add(ImageKey(username="rollback", image_key="rollback-key"))
+        db.flush()
+        raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_db(_fail))
+    assert asyncio.run(run_db(image._image_key_owner, "rollback-key")) is None
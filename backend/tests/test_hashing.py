@@ -0,0 +1,20 @@
+import asyncio
+import hashlib
+import io
+import os
+from fastapi import UploadFile
+from routes import image
+
+
+def test_upload_hashed_in_chunks_to_its_hex_key(monkeypatch):
+    """Test that the content key is the SHA-256 hex digest, read chunk by chunk, and the upload is rewound."""
+    monkeypatch.setattr(image, "HASH_CHUNK_SIZE", 1000)
+    data = os.urandom(3500)
+    upload = UploadFile(io.BytesIO(data), filename="image.jpg")
+    upload.file.read(10)
+
+    key = asyncio.run(image.hash_upload(upload))
+
+    assert key == hashlib.sha256(data).hexdigest() and len(key) == 64
+    assert upload.file.tell() == 0
+    assert asyncio.run(image.hash_upload(UploadFile(io.BytesIO(b""), filename="empty.jpg"))) == hashlib.sha256().hexdigest()
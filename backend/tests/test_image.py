@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+from fastapi import HTTPException, Request
+from routes import image
+
+
+def get(headers=None) -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": "/image/key", "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+    })
+
+
+def serve(monkeypatch, data: bytes, headers=None):
+    """Status, headers and body of GET /image/{key} for an image of the user holding `data`."""
+    async def open_image(username, image_key):
+        async def chunks():
+            for start in range(0, len(data), 3):
+                yield data[start:start + 3]
+        return len(data), chunks()
+
+    monkeypatch.setattr(image, "_has_image_key", lambda db, username, key: True)
+    monkeypatch.setattr(image, "open_image", open_image)
+
+    async def _get():
+        response = await image.get_image("key", get(headers), variant=None, username="alice")
+        if response.status_code == 304:
+            return response.status_code, response.headers, response.body
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        return response.status_code, response.headers, body
+    return asyncio.run(_get())
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-0", (0, 0)),
+    ("bytes=2-5", (2, 5)),
+    ("bytes=5-", (5, 9)),          # Open-ended
+    ("bytes=-3", (7, 9)),          # The last 3 bytes
+    ("bytes=-30", (0, 9)),         # Suffix longer than the image
+    ("bytes=4-100", (4, 9)),       # Past the end: cut to the image
+    ("bytes=0-1,4-5", None),       # Several ranges: the whole image
+    ("items=0-5", None),
+    ("bytes=a-b", None),
+    ("bytes=5-3", None),           # Invalid (ends before it starts): ignored, not unsatisfiable
+    ("bytes=12-3", None),
+    ("bytes=-", None),
+])
+def test_parse_range(header, expected):
+    assert image._parse_range(header, 10) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=10-", "bytes=10-20", "bytes=-0"])
+def test_unsatisfiable_range(header):
+    with pytest.raises(HTTPException) as e:
+        image._parse_range(header, 10)
+    assert e.value.status_code == 416
+    assert e.value.headers["Content-Range"] == "bytes */10"
+
+
+def test_range_request(monkeypatch):
+    status, headers, body = serve(monkeypatch, b"0123456789", {"Range": "bytes=2-7"})
+    assert status == 206
+    assert body == b"234567"
+    assert headers["content-range"] == "bytes 2-7/10"
+    assert headers["content-length"] == "6"
+
+
+def test_invalid_range_serves_the_whole_image(monkeypatch):
+    status, headers, body = serve(monkeypatch, b"0123456789", {"Range": "bytes=5-3"})
+    assert status == 200
+    assert body == b"0123456789"
+    assert "content-range" not in headers
+
+    with pytest.raises(HTTPException) as e:
+        serve(monkeypatch, b"0123456789", {"Range": "bytes=10-12"})
+    assert e.value.status_code == 416
+
+
+def test_empty_image(monkeypatch):
+    status, headers, body = serve(monkeypatch, b"")
+    assert status == 200
+    assert body == b""
+    assert headers["content-length"] == "0"
+
+    with pytest.raises(HTTPException) as e:
+        serve(monkeypatch, b"", {"Range": "bytes=0-"})
+    assert e.value.status_code == 416
+
+
+def test_cached_image_is_revalidated_by_etag(monkeypatch):
+    status, headers, body = serve(monkeypatch, b"0123456789")
+    assert status == 200 and body == b"0123456789"
+    assert headers["etag"] == '"key"'
+    assert headers["cache-control"] == image.IMAGE_CACHE_CONTROL
+
+    for if_none_match in ['"key"', 'W/"key"', '"other", "key"', "*"]:
+        status, headers, body = serve(monkeypatch, b"0123456789", {"If-None-Match": if_none_match})
+        assert status == 304 and body == b""
+        assert headers["etag"] == '"key"'
+    status, _, body = serve(monkeypatch, b"0123456789", {"If-None-Match": '"other"'})
+    assert status == 200 and body == b"0123456789"
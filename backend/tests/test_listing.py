@@ -0,0 +1,34 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from db import run_db
+from routes import image
+
+
+def list_page(username: str, cursor=None, limit: int = 2) -> dict:
+    return asyncio.run(image.list_images(cursor=cursor, limit=limit, username=username))
+
+
+def test_keyset_pagination():
+    keys = [f"page-key-{i}" for i in range(5)]
+    asyncio.run(run_db(image._claim_image_keys, "pager", keys))
+    asyncio.run(run_db(image._claim_image_keys, "someone-else", ["page-key-other"]))
+
+    first = list_page("pager")
+    assert first["images"] == ["page-key-4", "page-key-3"]
+    # Images stored while paging do not shift the next pages
+    asyncio.run(run_db(image._claim_image_keys, "pager", ["page-key-new"]))
+    second = list_page("pager", first["next_cursor"])
+    assert second["images"] == ["page-key-2", "page-key-1"]
+    last = list_page("pager", second["next_cursor"])
+    assert last == {"images": ["page-key-0"], "next_cursor": None}
+
+    assert list_page("pager", limit=10)["images"] == ["page-key-new"] + keys[::-1]
+    assert list_page("nobody") == {"images": [], "next_cursor": None}
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor!", "YWJj"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as e:
+        list_page("pager", cursor)
+    assert e.value.status_code == 400
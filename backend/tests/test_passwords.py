@@ -0,0 +1,37 @@
+import asyncio
+import pytest
+from passwords import PasswordHasher, PasswordHasherBusy
+
+
+def test_hash_and_verify():
+    hasher = PasswordHasher(threads=2, max_pending=4)
+
+    async def _run():
+        hashed = await hasher.hash("secret")
+        return hashed, await hasher.verify("secret", hashed), await hasher.verify("wrong", hashed)
+
+    hashed, valid, invalid = asyncio.run(_run())
+    assert hashed != "secret"
+    assert valid is True and invalid is False
+    stats = hasher.stats()
+    assert stats["completed"] == 3 and stats["rejected"] == 0
+    assert stats["running"] == 0 and stats["queued"] == 0 and stats["avg_run_ms"] > 0
+
+
+def test_calls_beyond_max_pending_are_turned_away():
+    hasher = PasswordHasher(threads=1, max_pending=2)
+
+    async def _run():
+        return await asyncio.gather(*(hasher.hash(f"password{i}") for i in range(4)), return_exceptions=True)
+
+    results = asyncio.run(_run())
+    assert [isinstance(result, PasswordHasherBusy) for result in results] == [False, False, True, True]
+    stats = hasher.stats()
+    assert stats["completed"] == 2 and stats["rejected"] == 2
+    assert stats["peak_queued"] >= 1
+
+
+def test_unknown_user_never_verifies():
+    hasher = PasswordHasher(threads=1, max_pending=2)
+    assert asyncio.run(hasher.verify_unknown_user("anything")) is False
+    assert hasher.stats()["completed"] == 1
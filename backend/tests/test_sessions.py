@@ -0,0 +1,69 @@
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+import sessions
+from db import RevokedToken, SessionLocal
+from passwords import password_hasher
+from routes import auth
+
+
+def test_token_verifies_for_its_user():
+    token, expires_at = sessions.issue_token("alice")
+
+    assert asyncio.run(sessions.verify_token(token)) == "alice"
+    assert expires_at > time.time()
+
+
+def test_tampered_or_expired_tokens_are_refused(monkeypatch):
+    token, _ = sessions.issue_token("alice")
+    payload, _, signature = token.partition(".")
+    forged, _ = sessions.issue_token("mallory")
+
+    assert asyncio.run(sessions.verify_token(f"{forged.partition('.')[0]}.{signature}")) is None
+    assert asyncio.run(sessions.verify_token(f"{payload}.{signature[:-2]}AA")) is None
+    assert asyncio.run(sessions.verify_token("garbage")) is None
+
+    monkeypatch.setattr(sessions, "SESSION_TTL_SECONDS", -1)
+    expired, _ = sessions.issue_token("alice")
+    assert asyncio.run(sessions.verify_token(expired)) is None
+
+
+def test_revocation_is_shared_through_the_database():
+    """Test that a token logged out (on any worker) stays refused until it expires."""
+    token, _ = sessions.issue_token("alice")
+    others = [sessions.issue_token("alice")[0] for _ in range(20)]
+
+    async def main():
+        await sessions.revoke_token(token)
+        await sessions.revoke_token(token)  # Logging out twice is harmless
+        for other in others:
+            await sessions.revoke_token(other)
+        return await sessions.verify_token(token)
+
+    assert asyncio.run(main()) is None
+    with SessionLocal() as db:
+        jti = sessions._claims(token)["jti"]
+        assert db.query(RevokedToken).filter(RevokedToken.token_id == jti).count() == 1
+
+
+def test_expired_revocations_are_dropped():
+    with SessionLocal() as db:
+        db.add(RevokedToken(token_id="expired", expires_at=int(time.time()) - 1))
+        db.commit()
+    token, _ = sessions.issue_token("alice")
+
+    asyncio.run(sessions.revoke_token(token))
+
+    with SessionLocal() as db:
+        assert db.query(RevokedToken).filter(RevokedToken.token_id == "expired").count() == 0
+
+
+def test_login_of_an_unknown_user_still_runs_bcrypt():
+    completed = password_hasher.completed
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(auth.login(auth.UserLogin(username="nobody", password="secret"), None))
+
+    assert e.value.status_code == 401
+    assert password_hasher.completed == completed + 1
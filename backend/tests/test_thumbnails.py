@@ -0,0 +1,54 @@
+import io
+import os
+import pytest
+from PIL import Image
+from thumbnails import UnrenderableImage, render_derivatives
+
+SIZES = {"thumb": 32, "preview": 128}
+
+
+def encode(image: Image.Image, format: str, **params) -> bytes:
+    data = io.BytesIO()
+    image.save(data, format, **params)
+    return data.getvalue()
+
+
+def noise(width: int, height: int, mode: str = "RGB") -> Image.Image:
+    """An image that does not compress, so its derivatives are always smaller."""
+    return Image.frombytes(mode, (width, height), os.urandom(width * height * len(mode)))
+
+
+def test_derivatives_fit_their_size():
+    derivatives = render_derivatives(encode(noise(400, 200), "PNG"), SIZES, quality=80)
+
+    assert set(derivatives) == set(SIZES)
+    for name, size in SIZES.items():
+        image = Image.open(io.BytesIO(derivatives[name]))
+        assert image.format == "WEBP"
+        assert image.size == (size, size // 2)
+
+
+def test_small_image_serves_as_its_own_thumbnail():
+    derivatives = render_derivatives(encode(noise(64, 48), "PNG"), SIZES, quality=80)
+    assert derivatives["preview"] is None
+    assert Image.open(io.BytesIO(derivatives["thumb"])).size == (32, 24)
+
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees
+    derivatives = render_derivatives(encode(noise(400, 200), "JPEG", exif=exif), SIZES, quality=80)
+    assert Image.open(io.BytesIO(derivatives["preview"])).size == (64, 128)
+
+
+def test_palette_image_with_transparency():
+    image = noise(300, 300, "L").convert("P")
+    image.info["transparency"] = 0
+    derivatives = render_derivatives(encode(image, "PNG"), SIZES, quality=80)
+    assert Image.open(io.BytesIO(derivatives["thumb"])).mode == "RGBA"
+
+
+@pytest.mark.parametrize("data", [b"", b"not an image", encode(noise(300, 300), "PNG")[:200]])
+def test_unrenderable_image(data):
+    with pytest.raises(UnrenderableImage):
+        render_derivatives(data, SIZES, quality=80)
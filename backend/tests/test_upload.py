@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import io
+import os
+import pytest
+from fastapi import HTTPException, UploadFile
+from routes import image
+
+
+def upload(data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), size=len(data), filename="image.jpg")
+
+
+@pytest.fixture
+def puts(monkeypatch):
+    """Records the images sent to the cluster instead of sending them."""
+    sent = []
+
+    async def put_image(username, image_key, image_file):
+        sent.append((username, image_key))
+
+    monkeypatch.setattr(image, "put_image", put_image)
+    monkeypatch.setattr(image, "schedule_derivatives", lambda username, image_key: None)
+    return sent
+
+
+def test_upload_of_an_image_another_user_owns_is_refused_before_reaching_the_cluster(puts):
+    data = os.urandom(1024)
+    key = hashlib.sha256(data).hexdigest()
+
+    assert asyncio.run(image.store_image("alice", upload(data))) == key
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(image.store_image("mallory", upload(data)))
+
+    assert e.value.status_code == 409
+    assert puts == [("alice", key)]
+    assert asyncio.run(image.run_db(image._image_key_owner, key)) == "alice"
+
+
+def test_reupload_by_the_owner_is_not_sent_again(puts):
+    data = os.urandom(1024)
+
+    first = asyncio.run(image.store_image("alice", upload(data)))
+    again = asyncio.run(image.store_image("alice", upload(data)))
+
+    assert first == again
+    assert len(puts) == 1
+
+
+def test_failed_upload_releases_the_key(monkeypatch):
+    async def put_image(username, image_key, image_file):
+        raise HTTPException(status_code=500, detail="Failed to upload image")
+
+    monkeypatch.setattr(image, "put_image", put_image)
+    data = os.urandom(1024)
+    key = hashlib.sha256(data).hexdigest()
+
+    with pytest.raises(HTTPException):
+        asyncio.run(image.store_image("alice", upload(data)))
+
+    assert asyncio.run(image.run_db(image._image_key_owner, key)) is None
+
+
+def test_bulk_upload_reports_each_image(monkeypatch):
+    images = [os.urandom(1024) for _ in range(4)]
+    keys = [hashlib.sha256(data).hexdigest() for data in images]
+    asyncio.run(image.run_db(image._claim_image_keys, "mallory", [keys[3]]))
+    sent = []
+
+    async def put_image(username, image_key, image_file):
+        if image_key == keys[1]:
+            raise HTTPException(status_code=500, detail="Failed to upload image")
+        sent.append(image_key)
+
+    monkeypatch.setattr(image, "put_image", put_image)
+    monkeypatch.setattr(image, "schedule_derivatives", lambda username, image_key: None)
+    files = [upload(data) for data in images] + [upload(images[0])]
+    results = asyncio.run(image.store_images("alice", files))
+
+    assert [result["key"] for result in results] == keys + [keys[0]]
+    assert [result["status"] for result in results[1:4]] == ["failed", "stored", "failed"]
+    # The same content twice is stored once, whichever copy is hashed first
+    assert sorted([results[0]["status"], results[4]["status"]]) == ["exists", "stored"]
+    assert results[1]["detail"] == "Failed to upload image"
+    assert results[3]["detail"] == "Image already stored by another user"
+    assert sorted(sent) == sorted([keys[0], keys[2]])
+    owners = [asyncio.run(image.run_db(image._image_key_owner, key)) for key in keys]
+    assert owners == ["alice", None, "alice", "mallory"]
+
+
+class FakeImageService:
+    """Stands in for the image storage service session, answering /put_image with `result`."""
+
+    def __init__(self, status: int, result):
+        self.status = status
+        self.result = result
+        self.posts = []
+
+    def post(self, url, data):
+        self.posts.append(url)
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def json(self, content_type="application/json"):
+        return self.result
+
+    async def text(self):
+        return str(self.result)
+
+
+@pytest.mark.parametrize("status, result", [(200, {"success": False}), (200, {}), (500, None)])
+def test_cluster_write_failure_is_reported_and_releases_the_key(monkeypatch, status, result):
+    """Test that a /put_image the storage service could not complete fails the upload, single or bulk."""
+    service = FakeImageService(status, result)
+    monkeypatch.setattr(image, "get_image_service", lambda: service)
+    monkeypatch.setattr(image, "DIRECT_DATA_PATH", False)
+    monkeypatch.setattr(image, "schedule_derivatives", lambda username, image_key: None)
+    data = os.urandom(1024)
+    key = hashlib.sha256(data).hexdigest()
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(image.store_image("alice", upload(data)))
+    assert e.value.status_code == 500
+    assert asyncio.run(image.run_db(image._image_key_owner, key)) is None
+
+    results = asyncio.run(image.store_images("alice", [upload(data)]))
+    assert results[0]["status"] == "failed"
+    assert asyncio.run(image.run_db(image._image_key_owner, key)) is None
+    assert len(service.posts) == 2
+
+
+def test_cluster_write_success(monkeypatch):
+    service = FakeImageService(200, {"success": True})
+    monkeypatch.setattr(image, "get_image_service", lambda: service)
+    monkeypatch.setattr(image, "DIRECT_DATA_PATH", False)
+    monkeypatch.setattr(image, "schedule_derivatives", lambda username, image_key: None)
+    data = os.urandom(1024)
+
+    assert asyncio.run(image.store_image("alice", upload(data))) == hashlib.sha256(data).hexdigest()
+
+
+def test_concurrent_uploads_of_one_image_send_it_once(monkeypatch):
+    """Test that when two users bulk upload the same image at once, only the one holding its key sends it."""
+    data = os.urandom(1024)
+    key = hashlib.sha256(data).hexdigest()
+    sent = []
+
+    async def put_image(username, image_key, image_file):
+        sent.append(username)
+        await asyncio.sleep(0.01)
+
+    monkeypatch.setattr(image, "put_image", put_image)
+    monkeypatch.setattr(image, "schedule_derivatives", lambda username, image_key: None)
+
+    async def main():
+        return await asyncio.gather(image.store_images("alice", [upload(data)]), image.store_images("bob", [upload(data)]))
+
+    alice, bob = asyncio.run(main())
+    owner = asyncio.run(image.run_db(image._image_key_owner, key))
+    assert sent == [owner]
+    assert {"alice": alice[0]["status"], "bob": bob[0]["status"]} == {
+        user: "stored" if user == owner else "failed" for user in ("alice", "bob")
+    }
+
+
+def test_cancelled_bulk_upload_releases_its_keys(monkeypatch):
+    images = [os.urandom(1024) for _ in range(3)]
+    started = []
+
+    async def put_image(username, image_key, image_file):
+        started.append(image_key)
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(image, "put_image", put_image)
+
+    async def main():
+        task = asyncio.create_task(image.store_images("alice", [upload(data) for data in images]))
+        while len(started) < 3:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    for data in images:
+        assert asyncio.run(image.run_db(image._image_key_owner, hashlib.sha256(data).hexdigest())) is None
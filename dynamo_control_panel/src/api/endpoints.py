@@ -1,16 +1,22 @@
 import sys
+import time
 import asyncio
 import uvicorn
 import logging
 from pathlib import Path
+from typing import List
+from contextlib import asynccontextmanager
 
 from pydantic import BaseModel
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, Response
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, UploadFile, File, Form
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, UploadFile, File, Form, HTTPException
 
 from src.core.control_panel import DynamoControlPanel
+from src.core.events import RESYNC
+from src.core.batch import BATCH_MEDIA_TYPE
+from src.core.config import BATCH_MAX_KEYS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
@@ -34,8 +40,17 @@ STATIC_DIR.mkdir(exist_ok=True)
 CSS_DIR.mkdir(exist_ok=True)
 JS_DIR.mkdir(exist_ok=True)
 
+control_panel = DynamoControlPanel()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close the pooled node connections on shutdown
+    await control_panel.close()
+
 # Admin Web Interface
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Mount templates and static directories
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
@@ -47,8 +62,6 @@ class NodeConfig(BaseModel):
     host: str
     port: int
 
-control_panel = DynamoControlPanel()
-
 @app.post("/add_node")
 async def add_node(node_config: NodeConfig):
     """Admin endpoint to add a new node to the Dynamo ring."""
@@ -61,41 +74,160 @@ async def add_node(node_config: NodeConfig):
         return {"status":"success", "message": f"Added node with ID {node_config.node_id}, Host {node_config.host}, Port {node_config.port}"}
     return {"status": "error", "message": "Failed to add node, check logs for details"}
 
+class NodeBatch(BaseModel):
+    nodes: List[NodeConfig]
+
+@app.post("/add_nodes")
+async def add_nodes(node_batch: NodeBatch):
+    """Admin endpoint to add several nodes to the Dynamo ring at once, with a single rebalance."""
+    success = await control_panel.add_nodes(
+        [(node.node_id, node.host, node.port) for node in node_batch.nodes]
+    )
+    node_ids = ", ".join(node.node_id for node in node_batch.nodes)
+    if success:
+        return {"status": "success", "message": f"Added nodes {node_ids}"}
+    return {"status": "error", "message": "Failed to add some nodes, check logs for details"}
+
+class StoragePolicy(BaseModel):
+    bucket: str
+    policy: str
+
+@app.post("/admin/storage_policy")
+async def set_storage_policy(storage_policy: StoragePolicy):
+    """
+    Admin endpoint to set the storage policy of a bucket (username): "replicated" or "ec:<k>+<m>".
+    It applies to the images written from then on; reads follow what is stored under each key.
+    """
+    try:
+        control_panel.set_storage_policy(storage_policy.bucket, storage_policy.policy)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    return {"success": True, "bucket": storage_policy.bucket, "policy": storage_policy.policy}
+
 @app.post("/put_image")
 async def put_image(username: str = Form(...), key: str = Form(...), image: UploadFile = File(...)):
     """
     Backend endpoint for putting an image into the distributed storage.
     """
+    started = time.monotonic()
     success = await control_panel.put_image(username, key, image)
+    control_panel.meter.record("put", time.monotonic() - started, success)
     return {"success": success}
 
+@app.get("/put_image_urls")
+async def put_image_urls(username: str, key: str, size: int):
+    """
+    Backend endpoint for the direct data path: signed URLs to upload an image straight to its nodes.
+    Without URLs ("direct": false), the image must be sent to /put_image instead.
+    """
+    urls = await control_panel.put_image_urls(username, key, size)
+    return {"direct": urls is not None, "urls": urls or []}
+
 @app.get("/get_image")
-async def get_image(username:str, key: str):
+async def get_image(username:str, key: str, redirect: bool = False):
     """
     Backend endpoint for retrieving an image from distributed storage.
+    With redirect, the client is sent (307) to a signed URL on a node holding the image when possible.
     """
+    started = time.monotonic()
+    if redirect:
+        url = await control_panel.get_image_url(username, key)
+        if url:
+            control_panel.meter.record("get", time.monotonic() - started)
+            return RedirectResponse(url, status_code=307)
     image_data = await control_panel.get_image(username, key)
+    # Time to the first byte: large images are still streaming when the response is returned
+    control_panel.meter.record("get", time.monotonic() - started, bool(image_data))
     if image_data:
         return image_data
     return {"success": False, "message": "Image not found"}
 
+class ImageBatch(BaseModel):
+    username: str
+    keys: List[str]
+
+@app.post("/get_images")
+async def get_images(image_batch: ImageBatch):
+    """
+    Backend endpoint for retrieving several images at once (e.g. a gallery page).
+    Streams one frame per key, found or not (see src.core.batch), as the images arrive from the nodes.
+    """
+    if len(image_batch.keys) > BATCH_MAX_KEYS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_KEYS} keys per batch")
+
+    async def _metered():
+        started = time.monotonic()
+        success = False
+        try:
+            async for piece in control_panel.get_images(image_batch.username, image_batch.keys):
+                yield piece
+            success = True
+        finally:
+            control_panel.meter.record("get_batch", time.monotonic() - started, success)
+
+    return StreamingResponse(_metered(), media_type=BATCH_MEDIA_TYPE)
+
+@app.delete("/delete_image")
+async def delete_image(username: str, key: str):
+    """
+    Backend endpoint for deleting an image from distributed storage (and the edge cache).
+    """
+    started = time.monotonic()
+    success = await control_panel.delete_image(username, key)
+    control_panel.meter.record("delete", time.monotonic() - started, success)
+    return {"success": success}
+
+@app.get("/stats/cache")
+async def cache_stats():
+    """
+    Reports edge cache occupancy and hit rate.
+    """
+    return control_panel.cache.report()
+
+@app.get("/stats/health")
+async def health_stats():
+    """
+    Reports the circuit breaker of every node and the retry budget.
+    """
+    return {"nodes": control_panel.health.report(), "retry_budget": control_panel.retry_budget.report()}
+
+@app.get("/stats/coalescing")
+async def coalescing_stats():
+    """
+    Reports how many image and chunk reads were served by another request's in-flight fetch.
+    """
+    return control_panel.reads.report()
+
 @app.websocket("/admin_dashboard")
 async def admin_dashboard(websocket: WebSocket):
-    """WebSocket endpoint for real-time admin dashboard updates."""
+    """
+    WebSocket endpoint for real-time admin dashboard updates: a snapshot of the current state,
+    then events (membership, ring, health, metrics) as they happen.
+    """
     await websocket.accept()
+    subscription = control_panel.subscribe_dashboard()
+
+    async def _forward_events():
+        await websocket.send_json(control_panel.dashboard_snapshot())
+        while True:
+            message = await subscription.get()
+            if message == RESYNC:
+                # Fell behind and lost events: start over from a fresh snapshot
+                await websocket.send_json(control_panel.dashboard_snapshot())
+            else:
+                await websocket.send_text(message)
+
+    forwarder = asyncio.create_task(_forward_events())
     try:
         while True:
-            # Get current ring state
-            ring_state = {
-                "virtual_nodes": list(control_panel.virtual_nodes.keys()),
-                "physical_nodes": list(control_panel.connection_pool.keys())
-            }
-            await websocket.send_json(ring_state)
-            await asyncio.sleep(5)  # Update every 5 seconds
+            await websocket.receive_text()  # Only returns (raises) when the dashboard disconnects
     except WebSocketDisconnect:
         logger.info("Admin dashboard WebSocket disconnected")
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
+    finally:
+        forwarder.cancel()
+        control_panel.unsubscribe_dashboard(subscription)
 
 @app.get("/", response_class=HTMLResponse)
 async def get_admin_dashboard(request: Request):
@@ -0,0 +1,45 @@
+import asyncio
+import struct
+from typing import AsyncIterator, Optional, Tuple
+
+import aiohttp
+
+# Batch reads (node /fetch_batch, control panel /get_images) answer with a stream of frames, one per
+# requested key: a header (status, key length, body length), the key (UTF-8), then the body
+# (empty unless FOUND). Same format as the nodes' app.core.batch (see tests/test_wire_format.py).
+BATCH_MEDIA_TYPE = "application/x-dynamo-frames"
+FRAME_HEADER = struct.Struct(">BHQ")
+FOUND, NOT_FOUND = 0, 1
+
+
+def frame_header(key: str, status: int, size: int = 0) -> bytes:
+    """Header and key of a frame; `size` body bytes must follow it."""
+    encoded = key.encode()
+    return FRAME_HEADER.pack(status, len(encoded), size) + encoded
+
+
+async def read_frame_header(content: aiohttp.StreamReader) -> Optional[Tuple[str, int, int]]:
+    """
+    Reads the next frame's (key, status, body size), or None at the end of the stream.
+    The body must be read (e.g. with `iter_body`) before the next header.
+    """
+    try:
+        header = await content.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+    status, key_length, size = FRAME_HEADER.unpack(header)
+    key = (await content.readexactly(key_length)).decode()
+    return key, status, size
+
+
+async def iter_body(content: aiohttp.StreamReader, size: int, piece_size: int) -> AsyncIterator[bytes]:
+    """Yields the `size` bytes of a frame body as they arrive."""
+    remaining = size
+    while remaining:
+        piece = await content.read(min(piece_size, remaining))
+        if not piece:
+            raise IOError(f"Batch stream ended {remaining} bytes before the end of a frame")
+        remaining -= len(piece)
+        yield piece
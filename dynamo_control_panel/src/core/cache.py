@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+
+class EdgeCache:
+    """
+    Byte-bounded LRU cache of objects read through the control panel, with an optional disk spill.
+
+    - Keys are content hashes, so cached objects never go stale: entries are only dropped by
+      eviction or by an explicit invalidation (delete).
+    - Entries evicted from memory move to `spill_dir` (itself byte-bounded, LRU) when configured;
+      a disk hit moves the entry back to memory.
+    - Objects larger than `max_entry_bytes` are not cached.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int, spill_dir: Optional[str] = None,
+                 spill_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self.spill_max_bytes = spill_max_bytes
+        self._memory: "OrderedDict[Hashable, Tuple[bytes, str]]" = OrderedDict()
+        self._disk: "OrderedDict[Hashable, Tuple[str, int, str]]" = OrderedDict()  # key -> (path, size, content type)
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _spill_path(self, key: Hashable) -> str:
+        return os.path.join(self.spill_dir, hashlib.sha256(repr(key).encode()).hexdigest())
+
+    async def get(self, key: Hashable) -> Optional[Tuple[bytes, str]]:
+        """Returns (content, content_type), or None on a miss."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return entry
+
+        spilled = self._disk.pop(key, None)
+        if spilled is not None:
+            path, size, content_type = spilled
+            self.disk_bytes -= size
+            try:
+                content = await asyncio.to_thread(self._read, path)
+            except OSError:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+            await self.put(key, content, content_type)
+            return content, content_type
+
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, key: Hashable, content: bytes, content_type: str):
+        if len(content) > self.max_entry_bytes or len(content) > self.max_bytes:
+            return
+        await self.invalidate(key, count=False)
+        self._memory[key] = (content, content_type)
+        self.memory_bytes += len(content)
+        while self.memory_bytes > self.max_bytes:
+            evicted_key, (evicted, evicted_type) = self._memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+            self.stats["evictions"] += 1
+            await self._spill(evicted_key, evicted, evicted_type)
+
+    async def _spill(self, key: Hashable, content: bytes, content_type: str):
+        if not self.spill_dir or len(content) > self.spill_max_bytes:
+            return
+        path = self._spill_path(key)
+        await asyncio.to_thread(self._write, path, content)
+        self._disk[key] = (path, len(content), content_type)
+        self.disk_bytes += len(content)
+        while self.disk_bytes > self.spill_max_bytes:
+            _, (evicted_path, size, _) = self._disk.popitem(last=False)
+            self.disk_bytes -= size
+            await asyncio.to_thread(self._remove, evicted_path)
+
+    async def invalidate(self, key: Hashable, count: bool = True):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self.memory_bytes -= len(entry[0])
+        spilled = self._disk.pop(key, None)
+        if spilled is not None:
+            self.disk_bytes -= spilled[1]
+            await asyncio.to_thread(self._remove, spilled[0])
+        if count and (entry is not None or spilled is not None):
+            self.stats["invalidations"] += 1
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.remove(path)
+        return data
+
+    @staticmethod
+    def _write(path: str, content: bytes):
+        with open(path, "wb") as f:
+            f.write(content)
+
+    @staticmethod
+    def _remove(path: str):
+        if os.path.exists(path):
+            os.remove(path)
+
+    def report(self) -> dict:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            "entries": len(self._memory) + len(self._disk),
+            "memory_bytes": self.memory_bytes,
+            "disk_bytes": self.disk_bytes,
+            "max_bytes": self.max_bytes,
+            "spill_max_bytes": self.spill_max_bytes if self.spill_dir else 0,
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
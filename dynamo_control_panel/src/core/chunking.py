@@ -0,0 +1,34 @@
+import json
+import hashlib
+from typing import List
+
+# Manifests are stored as regular objects; the magic prefix tells them apart from image data
+MANIFEST_MAGIC = b"DYNAMO-MANIFEST/1\n"
+MANIFEST_CONTENT_TYPE = "application/x-dynamo-manifest"
+
+
+def chunk_key(key: str, index: int) -> str:
+    """
+    Derives the key of the index-th chunk of an object.
+    The key is a 64-char hex digest, so nodes place it on the ring independently of the object key.
+    """
+    return hashlib.sha256(f"{key}/chunk/{index}".encode()).hexdigest()
+
+
+def build_manifest(key: str, size: int, chunk_size: int, chunk_keys: List[str], content_type: str) -> bytes:
+    manifest = {
+        "key": key,
+        "size": size,
+        "chunk_size": chunk_size,
+        "chunks": chunk_keys,
+        "content_type": content_type,
+    }
+    return MANIFEST_MAGIC + json.dumps(manifest).encode()
+
+
+def is_manifest(data: bytes) -> bool:
+    return data.startswith(MANIFEST_MAGIC)
+
+
+def parse_manifest(data: bytes) -> dict:
+    return json.loads(data[len(MANIFEST_MAGIC):])
@@ -0,0 +1,78 @@
+import os
+
+# Access environment variables
+
+# Client-side routing: how often the cached ring is checked for a newer version (seconds)
+RING_REFRESH_SECONDS = float(os.getenv("RING_REFRESH_SECONDS", "5"))
+# How long each long-poll for ring changes waits on a node before polling again (seconds)
+RING_WATCH_SECONDS = float(os.getenv("RING_WATCH_SECONDS", "30"))
+
+# Shared HTTP connection pool for calls to the nodes
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))  # Connections in total
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "32"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))  # Idle connections kept open this long
+HTTP_DNS_TTL_SECONDS = int(os.getenv("HTTP_DNS_TTL_SECONDS", "300"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "1"))
+
+# Per-node circuit breakers: trip after BREAKER_FAILURE_THRESHOLD consecutive failures or when more
+# than BREAKER_ERROR_RATE of the last BREAKER_WINDOW requests failed (slower than SLOW_REQUEST_SECONDS
+# counts as failed), then skip the node for a cooldown that doubles while it stays down.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "5"))
+BREAKER_MAX_COOLDOWN_SECONDS = float(os.getenv("BREAKER_MAX_COOLDOWN_SECONDS", "60"))
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "2"))
+# Fail-overs to the next replica are capped to this fraction of requests, plus a few per second
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "5"))
+
+# Streaming proxy: bodies are relayed STREAM_PIECE_SIZE bytes at a time, with at most
+# STREAM_QUEUE_DEPTH pieces buffered per replica write
+STREAM_PIECE_SIZE = int(os.getenv("STREAM_PIECE_SIZE", str(64 * 1024)))
+STREAM_QUEUE_DEPTH = int(os.getenv("STREAM_QUEUE_DEPTH", "4"))
+
+# Direct data path: with a secret (shared with the nodes), clients can be handed short-lived
+# signed URLs to read from / write to nodes directly. Empty: everything goes through the control panel.
+URL_SIGNING_SECRET = os.getenv("URL_SIGNING_SECRET", "")
+SIGNED_URL_TTL_SECONDS = float(os.getenv("SIGNED_URL_TTL_SECONDS", "60"))
+
+# Shared secret sent (in the X-Cluster-Secret header) with every request to the nodes, which reject
+# unsigned requests without it. Must be the same as the nodes' CLUSTER_SECRET.
+CLUSTER_SECRET = os.getenv("CLUSTER_SECRET", "")
+
+# Request coalescing: concurrent reads of an object share one upstream fetch. Objects up to
+# COALESCE_MAX_BYTES are buffered once and served to every waiting request; larger ones are
+# streamed to each request separately (chunks of chunked objects are always coalesced).
+COALESCE_MAX_BYTES = int(os.getenv("COALESCE_MAX_BYTES", str(1024 * 1024)))
+
+# Batch reads (/get_images): most keys per request; keys are fetched from their nodes with one
+# /fetch_batch request per node
+BATCH_MAX_KEYS = int(os.getenv("BATCH_MAX_KEYS", "256"))
+
+# Edge cache of objects read through the control panel (keys are content hashes, so entries
+# never go stale and are only dropped on eviction or delete). Evicted entries spill to
+# CACHE_SPILL_DIR when set.
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_MAX_ENTRY_BYTES = int(os.getenv("CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024)))
+CACHE_SPILL_DIR = os.getenv("CACHE_SPILL_DIR", "")
+CACHE_SPILL_MAX_BYTES = int(os.getenv("CACHE_SPILL_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# Large object chunking: objects above CHUNK_THRESHOLD are split into CHUNK_SIZE chunks,
+# each stored under its own key, with a manifest stored under the object's key.
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", str(4 * 1024 * 1024)))
+CHUNK_THRESHOLD = int(os.getenv("CHUNK_THRESHOLD", str(8 * 1024 * 1024)))
+CHUNK_PARALLELISM = int(os.getenv("CHUNK_PARALLELISM", "8"))  # Chunks in flight per object
+
+# Storage policy of buckets (usernames) without an explicit one: "replicated" or "ec:<k>+<m>"
+DEFAULT_STORAGE_POLICY = os.getenv("DEFAULT_STORAGE_POLICY", "replicated")
+EC_MAX_FRAGMENTS = 255  # k + m limit of the nodes' Reed-Solomon codes
+
+# Admin dashboard: live events are pushed to every connected dashboard; throughput/latency
+# counters go out once per DASHBOARD_TICK_SECONDS (only while a dashboard is connected). A dashboard
+# falling DASHBOARD_QUEUE_DEPTH events behind is sent a fresh snapshot instead.
+DASHBOARD_TICK_SECONDS = float(os.getenv("DASHBOARD_TICK_SECONDS", "1"))
+DASHBOARD_QUEUE_DEPTH = int(os.getenv("DASHBOARD_QUEUE_DEPTH", "256"))
+
+# Add other configuration variables as needed
@@ -1,15 +1,41 @@
+import time
 import random
 import asyncio
 import hashlib
 import logging
 import argparse
-from typing import Dict, Any, Optional, List, Tuple
+from collections import defaultdict
+from typing import Dict, Any, Optional, List, Tuple, Callable, Awaitable, AsyncIterator, AsyncIterable
 
 import aiohttp
 from aiohttp import FormData
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from fastapi import UploadFile
 
+from src.core.config import (
+    CHUNK_SIZE, CHUNK_THRESHOLD, CHUNK_PARALLELISM, DEFAULT_STORAGE_POLICY, EC_MAX_FRAGMENTS, RING_REFRESH_SECONDS,
+    RING_WATCH_SECONDS,
+    HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_KEEPALIVE_SECONDS, HTTP_DNS_TTL_SECONDS, HTTP_TIMEOUT_SECONDS,
+    HTTP_CONNECT_TIMEOUT_SECONDS, BREAKER_FAILURE_THRESHOLD, BREAKER_ERROR_RATE, BREAKER_WINDOW,
+    BREAKER_COOLDOWN_SECONDS, BREAKER_MAX_COOLDOWN_SECONDS, SLOW_REQUEST_SECONDS,
+    RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN_PER_SECOND,
+    STREAM_PIECE_SIZE, STREAM_QUEUE_DEPTH, URL_SIGNING_SECRET, SIGNED_URL_TTL_SECONDS, COALESCE_MAX_BYTES, CLUSTER_SECRET,
+    CACHE_MAX_BYTES, CACHE_MAX_ENTRY_BYTES, CACHE_SPILL_DIR, CACHE_SPILL_MAX_BYTES,
+    DASHBOARD_TICK_SECONDS, DASHBOARD_QUEUE_DEPTH,
+)
+from src.core.http import HttpPool
+from src.core.ring import RingView
+from src.core.streaming import FanOut, read_at_least, relay
+from src.core.signing import cluster_headers, signed_url
+from src.core.singleflight import SingleFlight
+from src.core.cache import EdgeCache
+from src.core.health import NodeHealth, RetryBudget
+from src.core.events import EventBus, RequestMeter, Subscription
+from src.core.batch import FOUND, NOT_FOUND, frame_header, iter_body, read_frame_header
+from src.core.chunking import (
+    MANIFEST_MAGIC, MANIFEST_CONTENT_TYPE, chunk_key, build_manifest, is_manifest, parse_manifest,
+)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -19,9 +45,12 @@ logger = logging.getLogger(__name__)
 
 class DynamoControlPanel:
     def __init__(self):
-        #! Consistent Hashing Ring
-        #! Don't maintain hash ring, we shall request for a hash ring from a random node in the ring
-        # self.hash_ring = None
+        # Cached, versioned copy of the nodes' hash ring for client-side routing
+        self.ring = RingView()
+        self.ring_etag: Optional[str] = None
+        self._ring_fetched_at = 0.0
+        self._ring_refreshing = False
+        self._ring_watch: Optional[asyncio.Task] = None
         self.virtual_nodes = {} #! TBD if needed
         # self.physical_nodes = {}
         
@@ -33,6 +62,34 @@ class DynamoControlPanel:
         # Async connection pool for all nodes (control panel just knows where the nodes are, and nothing about the ring structure)
         self.connection_pool = {}
         self.topology = {}
+        # Every node session shares this pool's keep-alive connections
+        self.http = HttpPool(HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_KEEPALIVE_SECONDS,
+                             HTTP_DNS_TTL_SECONDS, HTTP_TIMEOUT_SECONDS, HTTP_CONNECT_TIMEOUT_SECONDS,
+                             cluster_headers(CLUSTER_SECRET))
+        # Nodes that keep failing are skipped (circuit breakers), and fail-overs to the next replica
+        # are rationed so an outage cannot turn into a retry storm
+        self.health = NodeHealth(
+            failure_threshold=BREAKER_FAILURE_THRESHOLD, error_rate=BREAKER_ERROR_RATE, window=BREAKER_WINDOW,
+            cooldown=BREAKER_COOLDOWN_SECONDS, max_cooldown=BREAKER_MAX_COOLDOWN_SECONDS,
+            slow_seconds=SLOW_REQUEST_SECONDS,
+        )
+        self.retry_budget = RetryBudget(RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN_PER_SECOND)
+
+        # Concurrent reads of the same object (or chunk) share one upstream fetch
+        self.reads = SingleFlight()
+        # Objects (and chunks) read recently, served without reaching the nodes
+        self.cache = EdgeCache(CACHE_MAX_BYTES, CACHE_MAX_ENTRY_BYTES, CACHE_SPILL_DIR or None, CACHE_SPILL_MAX_BYTES)
+
+        # Admin dashboards subscribe to membership/ring events and periodic request counters
+        self.events = EventBus(DASHBOARD_QUEUE_DEPTH)
+        self.meter = RequestMeter()
+        self._dashboard_ticker: Optional[asyncio.Task] = None
+
+        # Membership changes (single or batch node additions) run one at a time
+        self._membership_lock = asyncio.Lock()
+
+        # Storage policy per bucket (username): "replicated" or "ec:<k>+<m>" (Reed-Solomon)
+        self.storage_policies: Dict[str, str] = {}
         
         # # Nodes to notify when ring state changes
         # self.notification_nodes = []
@@ -45,7 +102,168 @@ class DynamoControlPanel:
         """Generate a consistent hash for a given key."""
         return int(hashlib.sha256(key.encode()).hexdigest(), 16)
 
+    @staticmethod
+    def parse_storage_policy(policy: str) -> Optional[Tuple[int, int]]:
+        """
+        Parse a storage policy. Returns (k, m) for an erasure coded policy, None for replication.
+        """
+        if policy == "replicated":
+            return None
+        try:
+            scheme, params = policy.split(":")
+            k, m = (int(p) for p in params.split("+"))
+        except ValueError:
+            raise ValueError(f"Invalid storage policy {policy!r}, expected 'replicated' or 'ec:<k>+<m>'")
+        if scheme != "ec":
+            raise ValueError(f"Invalid storage policy {policy!r}, expected 'replicated' or 'ec:<k>+<m>'")
+        if k < 1 or m < 1 or k + m > EC_MAX_FRAGMENTS:
+            raise ValueError(f"Invalid storage policy {policy!r}, erasure codes need k >= 1, m >= 1 "
+                             f"and k + m <= {EC_MAX_FRAGMENTS}")
+        return k, m
+
+    def set_storage_policy(self, bucket: str, policy: str):
+        self.parse_storage_policy(policy)  # Validate before storing
+        self.storage_policies[bucket] = policy
+
+    def _erasure_code(self, bucket: str) -> Optional[Tuple[int, int]]:
+        return self.parse_storage_policy(self.storage_policies.get(bucket, DEFAULT_STORAGE_POLICY))
+
     async def add_node(self, node_id: str, host: str, port: int):
+        """
+        Add a node to the ring (the existing nodes hand over its keys), reporting progress to the dashboards.
+        """
+        async with self._membership_lock:
+            self.events.publish("membership", node_id=node_id, phase="joining", host=host, port=port)
+            started = time.monotonic()
+            added = await self._add_node(node_id, host, port)
+            self.events.publish(
+                "membership", node_id=node_id, phase="joined" if added else "failed", seconds=time.monotonic() - started
+            )
+            return added
+
+    async def add_nodes(self, nodes: List[Tuple[str, str, int]]) -> bool:
+        """
+        Batch scale-out: add several nodes with a single rebalance instead of one per node.
+
+        1. Every node, old and new, installs the final ring (current ring plus all new nodes).
+        2. Every old node moves its keys to their new owners in parallel, each key sent once
+           (by the first node of its previous preference list), then drops what it no longer owns.
+
+        Args:
+            nodes: (node_id, host, port) of the nodes to add.
+        """
+        async with self._membership_lock:
+            nodes = [node for node in nodes if node[0] not in self.connection_pool]
+            if not nodes:
+                return True
+            for node_id, host, port in nodes:
+                self.events.publish("membership", node_id=node_id, phase="joining", host=host, port=port)
+            started = time.monotonic()
+            added = await self._add_nodes(nodes)
+            for node_id, _, _ in nodes:
+                self.events.publish(
+                    "membership", node_id=node_id, phase="joined" if node_id in added else "failed",
+                    seconds=time.monotonic() - started,
+                )
+            return len(added) == len(nodes)
+
+    async def _add_nodes(self, nodes: List[Tuple[str, str, int]]) -> List[str]:
+        """
+        Returns the ids of the nodes that joined the ring.
+        """
+        added = []
+        if not self.connection_pool:
+            # An empty ring has nothing to rebalance: the first node just joins
+            (node_id, host, port), *nodes = nodes
+            if not await self._add_node(node_id, host, port):
+                return added
+            added.append(node_id)
+            if not nodes:
+                return added
+
+        connections = {}
+        try:
+            for node_id, host, port in nodes:
+                connection = await self._create_node_connection(host, port)
+                try:
+                    async with connection.get("/", timeout=aiohttp.ClientTimeout(total=10)) as response:
+                        reachable = response.status == 200
+                except Exception as e:
+                    logger.error(f"Failed to connect to node {node_id} at {host}:{port}: {e}")
+                    reachable = False
+                if reachable:
+                    connections[node_id] = connection
+                else:
+                    await connection.close()
+            if not connections:
+                return added
+
+            await self.refresh_ring(force=True)
+            previous_ring = {"physical_nodes": self.ring.physical_nodes, "version": self.ring.version}
+            old_nodes = list(self.connection_pool)
+            topology = {**self.topology, **{node_id: {"host": host, "port": port} for node_id, host, port in nodes
+                                            if node_id in connections}}
+            payload = {
+                "node_data": {"nodes": {node_id: {"ip": info["host"], "port": info["port"]}
+                                        for node_id, info in topology.items()}},
+                "ring_metadata": previous_ring,
+                "new_nodes": list(connections),
+            }
+
+            # Phase 1: every node installs the final ring
+            sessions = {**self.connection_pool, **connections}
+
+            async def _install(node_id: str) -> Optional[Dict]:
+                try:
+                    async with sessions[node_id].post("/ring/install", json=payload) as response:
+                        if response.status == 200:
+                            return await response.json()
+                        logger.error(f"Node {node_id} failed to install the ring: {await response.text()}")
+                except Exception as e:
+                    logger.error(f"Node {node_id} failed to install the ring: {e}")
+                return None
+
+            rings = await asyncio.gather(*[_install(node_id) for node_id in sessions])
+            if None in rings or any(ring != rings[0] for ring in rings):
+                logger.error("Nodes did not install the same ring, aborting the scale-out")
+                return added
+            self.connection_pool.update(connections)
+            self.topology = topology
+            added.extend(connections)
+            connections = {}
+
+            # Phase 2: the old nodes move their keys concurrently
+            self.events.publish("rebalance", phase="started", sources=old_nodes, new_nodes=payload["new_nodes"],
+                                version=rings[0]["version"])
+
+            async def _rebalance(node_id: str) -> Tuple[str, Optional[Dict]]:
+                try:
+                    async with self.connection_pool[node_id].post(
+                        "/ring/rebalance", json={"previous_ring": previous_ring}, timeout=aiohttp.ClientTimeout(total=None)
+                    ) as response:
+                        if response.status == 200:
+                            return node_id, await response.json()
+                        logger.error(f"Node {node_id} failed to rebalance: {await response.text()}")
+                except Exception as e:
+                    logger.error(f"Node {node_id} failed to rebalance: {e}")
+                return node_id, None
+
+            totals = {"sent": 0, "failed": 0, "dropped": 0, "fragments_moved": 0, "fragments_failed": 0}
+            for done, rebalanced in enumerate(asyncio.as_completed([_rebalance(node_id) for node_id in old_nodes]), 1):
+                node_id, summary = await rebalanced
+                for name in totals:
+                    totals[name] += summary[name] if summary else 0
+                self.events.publish("rebalance", phase="progress", node_id=node_id, ok=summary is not None,
+                                    done=done, total=len(old_nodes), **totals)
+            self.events.publish("rebalance", phase="finished", **totals)
+            logger.info(f"Added nodes {payload['new_nodes']} with one rebalance: {totals}")
+            await self.refresh_ring(force=True)
+            return added
+        finally:
+            for connection in connections.values():
+                await connection.close()
+
+    async def _add_node(self, node_id: str, host: str, port: int):
         connection = None
         try:
             logger.info("Starting node addition...")
@@ -72,18 +290,19 @@ class DynamoControlPanel:
                     }
                 }
 
-                async with aiohttp.ClientSession() as session:
-                    try:
-                        async with session.post(url, headers=headers, json=payload) as response:
-                            if response.status == 200:
-                                logger.info(f"Successfully joined the ring: {await response.json()}")
-                            else:
-                                logger.error(f"Failed to join the ring. Status: {response.status}, Response: {await response.text()}")
-                    except Exception as e:
-                        logger.error(f"Error occurred while trying to join the ring: {e}")
-                    self.connection_pool[node_id] = connection
-                    self.topology[node_id] = {"host": host, "port": port}
+                try:
+                    async with self.http.client.post(url, headers=headers, json=payload) as response:
+                        if response.status == 200:
+                            logger.info(f"Successfully joined the ring: {await response.json()}")
+                        else:
+                            logger.error(f"Failed to join the ring. Status: {response.status}, Response: {await response.text()}")
+                except Exception as e:
+                    logger.error(f"Error occurred while trying to join the ring: {e}")
+                self.connection_pool[node_id] = connection
+                self.topology[node_id] = {"host": host, "port": port}
                 logger.info(f"First node {node_id} added successfully.")
+                await self.refresh_ring(force=True)
+                self._start_ring_watch()
                 return True
 
             # Notify an existing node about the new node
@@ -114,12 +333,14 @@ class DynamoControlPanel:
 
             # Add the new node to the connection pool
             self.connection_pool[node_id] = connection
+            self.topology[node_id] = {"host": host, "port": port}
             add_response = await self._notify_nodes_about_addition(random_node_url, node_id, host, port)
             if not add_response:
                 logger.warning(f"Failed to notify existing nodes about new node {node_id}.")
                 return False
 
             logger.info(f"Node {node_id} added successfully.")
+            await self.refresh_ring(force=True)
             return True
 
         except asyncio.TimeoutError:
@@ -142,14 +363,21 @@ class DynamoControlPanel:
 
     async def _create_node_connection(self, host: str, port: int):
         """
-        Create an aiohttp ClientSession for a node.
-        Ensure the session is properly managed.
+        Create an aiohttp ClientSession for a node, on the shared connection pool.
         """
-        return aiohttp.ClientSession(
-            base_url=f"http://{host}:{port}",
-            timeout=aiohttp.ClientTimeout(total=10)
-        )
+        return self.http.session(base_url=f"http://{host}:{port}")
+
 
+    async def close(self):
+        """
+        Stop the background tasks and close every node session and the shared HTTP pool (on shutdown).
+        """
+        for task in (self._ring_watch, self._dashboard_ticker):
+            if task:
+                task.cancel()
+        for connection in self.connection_pool.values():
+            await connection.close()
+        await self.http.close()
 
     async def _notify_nodes_about_addition(self, node_url: str, new_node_id: str, new_node_ip: str, new_node_port: int):
         """
@@ -163,9 +391,11 @@ class DynamoControlPanel:
 
         async def _send_update_to_node(node_url):
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(f"{node_url}/invite_node", json=ring_state) as response:
-                        return response.status == 200
+                # Joining includes the key transfers, so no overall deadline
+                async with self.http.client.post(
+                    f"{node_url}/invite_node", json=ring_state, timeout=aiohttp.ClientTimeout(total=None)
+                ) as response:
+                    return response.status == 200
             except Exception as e:
                 logger.error(f"Failed to notify node {node_url}: {e}")
                 return False
@@ -183,102 +413,325 @@ class DynamoControlPanel:
         
         # await asyncio.gather(*notification_tasks)
 
-    async def _get_ring_from_node(self, node_url: str) -> Dict:
+    async def _get_ring_from_node(self, node_id: str, wait: float = 0) -> Optional[Dict]:
         """
-        Get the current hash ring from a random node.
+        Get the current hash ring from a node, unless it still matches the cached ring's ETag.
+        With `wait`, the node holds the request until its ring changes or `wait` seconds elapse.
+
+        Returns:
+            Optional[Dict]: The ring metadata, or None if unchanged (or on error).
         """
+        headers = {"If-None-Match": self.ring_etag} if self.ring_etag else {}
+        params = {"wait": wait} if wait else None
+        timeout = aiohttp.ClientTimeout(total=wait + 10)
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{node_url}/get_ring") as response:
-                    if response.status == 200:
-                        return await response.json()
-                    return {"error": "Failed to get ring from node"}
+            async with self.connection_pool[node_id].get(
+                "/get_ring", headers=headers, params=params, timeout=timeout
+            ) as response:
+                if response.status == 304:
+                    return None
+                if response.status == 200:
+                    return {**await response.json(), "etag": response.headers.get("ETag")}
+                logger.error(f"Failed to get ring from node {node_id}. Status: {response.status}")
         except Exception as e:
-            logger.error(f"Failed to get ring from node {node_url}: {e}")
-            return {"error": str(e)}
-    
-    async def _get_target_nodes(self, key: str) -> List[Dict]:
+            logger.error(f"Failed to get ring from node {node_id}: {e}")
+        return None
+
+    def _apply_ring(self, metadata: Dict, node_id: str) -> bool:
+        """
+        Replace the cached ring, but only by a ring with a higher version.
+        """
+        if metadata.get("version", 0) <= self.ring.version:
+            return False
+        self.ring = RingView.from_metadata(metadata)
+        self.ring_etag = metadata.get("etag")
+        logger.info(f"Ring updated to version {self.ring.version} ({len(self.ring.physical_nodes)} nodes) from {node_id}")
+        self.events.publish("ring", **self.ring_state())
+        return True
+
+    def ring_state(self) -> Dict[str, Any]:
+        return {
+            "version": self.ring.version,
+            "physical_nodes": list(self.connection_pool.keys()),
+            "virtual_nodes": self.ring.physical_nodes,  # Virtual node count per node
+        }
+
+    def dashboard_snapshot(self) -> Dict[str, Any]:
+        """
+        Full state a dashboard starts from; everything after it arrives as events.
+        """
+        return {
+            "type": "snapshot",
+            "ring": self.ring_state(),
+            "health": self.health.report(),
+            "cache": self.cache.report(),
+            "coalescing": self.reads.report(),
+        }
+
+    def subscribe_dashboard(self) -> Subscription:
+        subscription = self.events.subscribe()
+        if self._dashboard_ticker is None or self._dashboard_ticker.done():
+            self.meter.take()  # Start counting from now
+            self._dashboard_ticker = asyncio.create_task(self.dashboard_ticker())
+        return subscription
+
+    def unsubscribe_dashboard(self, subscription: Subscription):
+        self.events.unsubscribe(subscription)
+
+    async def dashboard_ticker(self):
+        """
+        Background task publishing request counters (and node health when it changed) every
+        DASHBOARD_TICK_SECONDS, for as long as a dashboard is subscribed. Idle ticks publish nothing.
         """
-        Find target nodes for a given key using consistent hashing.
-        Returns a list of N nodes responsible for the key.
+        last_health = None
+        while self.events.subscribers:
+            await asyncio.sleep(DASHBOARD_TICK_SECONDS)
+            operations = self.meter.take()
+            if operations:
+                self.events.publish(
+                    "metrics", operations=operations, cache_hit_rate=self.cache.report()["hit_rate"],
+                    retry_budget=self.retry_budget.report(),
+                )
+            health = {node: breaker["state"] for node, breaker in self.health.report().items()}
+            if health != last_health:
+                self.events.publish("health", nodes=self.health.report())
+                last_health = health
+
+    async def refresh_ring(self, force: bool = False) -> bool:
+        """
+        Poll a random node for ring changes, at most every RING_REFRESH_SECONDS unless forced.
+        Polls are conditional (ETag), so an unchanged ring costs a 304.
+
+        Returns:
+            bool: True if the cached ring changed.
+        """
+        now = time.monotonic()
+        if not self.connection_pool or self._ring_refreshing:
+            return False
+        if not force and now - self._ring_fetched_at < RING_REFRESH_SECONDS:
+            return False
+
+        self._ring_refreshing = True
+        try:
+            self._ring_fetched_at = now
+            node_id = random.choice(list(self.connection_pool.keys()))
+            metadata = await self._get_ring_from_node(node_id)
+            return metadata is not None and self._apply_ring(metadata, node_id)
+        finally:
+            self._ring_refreshing = False
+
+    async def watch_ring(self):
+        """
+        Background task keeping the cached ring fresh: long-polls a random node, which answers
+        as soon as its ring changes (or with a 304 after RING_WATCH_SECONDS).
+        """
+        while True:
+            if not self.connection_pool:
+                await asyncio.sleep(1)
+                continue
+            node_id = random.choice(list(self.connection_pool.keys()))
+            started = time.monotonic()
+            metadata = await self._get_ring_from_node(node_id, wait=RING_WATCH_SECONDS)
+            self._ring_fetched_at = time.monotonic()
+            changed = metadata is not None and self._apply_ring(metadata, node_id)
+            if not changed and time.monotonic() - started < 1:
+                await asyncio.sleep(1)  # Answered fast without news (node down or behind): back off
+
+    def _start_ring_watch(self):
+        if self._ring_watch is None or self._ring_watch.done():
+            self._ring_watch = asyncio.create_task(self.watch_ring())
+
+    async def _get_target_nodes(self, key: str, count: Optional[int] = None) -> List[str]:
+        """
+        Find target nodes for a given key using the cached copy of the ring.
+        Returns the preference list (N nodes responsible for the key, primary first).
         """
-        target_nodes = []
         if len(self.connection_pool) == 0:
             logger.warning("No nodes in the ring")
-            return target_nodes
-        
-        # Directly use the get_target_nodes endpoint of the Dynamo Nodes
-        node_url = random.choice(list(self.connection_pool.values()))
+            return []
+
+        await self.refresh_ring()
+        target_nodes = [node for node in self.ring.preference_list(key, count) if node in self.connection_pool]
+        if not target_nodes:
+            # No ring fetched yet: any node will do
+            target_nodes = [random.choice(list(self.connection_pool.keys()))]
+        return target_nodes
+
+    async def _write_to_replicas(self, nodes: List[str], username: str, key: str, data: bytes,
+                                 filename: str, content_type: str) -> bool:
+        """
+        Write an object to every node of its preference list concurrently.
+        Succeeds if at least one replica acknowledged the write.
+        """
+        results = await asyncio.gather(
+            *[self._write_to_node(node, username, key, data, filename, content_type) for node in nodes]
+        )
+        if not all(results):
+            logger.warning(f"Key {key} written to {sum(results)}/{len(nodes)} replicas")
+        return any(results)
+
+    async def _stream_to_replicas(self, nodes: List[str], username: str, key: str, image_file: UploadFile) -> bool:
+        """
+        Stream an upload to every node of its preference list concurrently, reading it once.
+        Succeeds if at least one replica acknowledged the write.
+        """
+        fan_out = FanOut(image_file.read, len(nodes), STREAM_PIECE_SIZE, STREAM_QUEUE_DEPTH)
+
+        async def _write(index: int, node: str) -> bool:
+            try:
+                return await self._write_to_node(
+                    node, username, key, fan_out.stream(index), image_file.filename, image_file.content_type
+                )
+            finally:
+                fan_out.close(index)
+
+        _, *results = await asyncio.gather(fan_out.pump(), *[_write(i, node) for i, node in enumerate(nodes)])
+        if not all(results):
+            logger.warning(f"Key {key} written to {sum(results)}/{len(nodes)} replicas")
+        return any(results)
+
+    async def _fail_over(self, nodes: List[str], attempt: Callable[[str], Awaitable[Any]]) -> Any:
+        """
+        Run `attempt` on the nodes, healthy ones first, until one returns a result.
+        Every attempt after the first spends the retry budget; once it is exhausted the request fails.
+        """
+        self.retry_budget.record_request()
+        for index, node in enumerate(self.health.order(nodes)):
+            if index and not self.retry_budget.try_retry():
+                logger.warning(f"Retry budget exhausted, not failing over to {node}")
+                break
+            result = await attempt(node)
+            if result:
+                return result
+        return None
+
+    async def _open_from_replicas(self, nodes: List[str], key: str) -> Optional[aiohttp.ClientResponse]:
+        """
+        Open an object on the first node of its preference list that has it.
+        """
+        return await self._fail_over(nodes, lambda node: self._open_from_node(node, key))
+
+    async def _read_from_replicas(self, nodes: List[str], key: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Read an object from the first node of its preference list that has it.
+        """
+        return await self._fail_over(nodes, lambda node: self._read_from_node(node, key))
+
+    def _node_session(self, node: str) -> Optional[aiohttp.ClientSession]:
+        """
+        The node's session, or None while its circuit breaker refuses requests.
+        The outcome of a request made with it must be reported to self.health.
+        """
+        if not self.health.allow(node):
+            return None
+        return self.connection_pool[node]
+
+    async def _write_to_node(self, node: str, username: str, key: str, value, filename: str, content_type: str,
+                             path: str = "/upload", fields: Optional[Dict[str, str]] = None) -> bool:
+        """
+        Upload one object (file object, bytes or async iterable of bytes) to a node's /upload (or another upload) endpoint.
+        """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{node_url}/get_target_nodes", params={'key': key}) as response:
-                    if response.status == 200:
-                        target_nodes = await response.json()
-                    else:
-                        logger.warning(f"Failed to get target nodes for key {key}")
+            form = FormData()
+            form.add_field("username", username)
+            form.add_field("key", key)
+            for name, field_value in (fields or {}).items():
+                form.add_field(name, field_value)
+            form.add_field(
+                "file",
+                filename=filename,
+                value=value,
+                content_type=content_type,
+            )
+            session = self._node_session(node)
+            if session is None:
+                return False
+            reachable = False
+            try:
+                #! REPLACE NODE BY node['physical_node'] depending on what get_target_nodes returns
+                async with session.post(
+                    path,
+                    data=form
+                ) as response:
+                    reachable = response.status < 500
+                    return response.status == 200
+            finally:
+                self.health.record(node, reachable)
         except Exception as e:
-            logger.error(f"Failed to get target nodes for key {key}: {e}")
-        
-        return target_nodes
-    
-      # # Find random node to get the ring from
-        # random_node = random.choice(list(self.connection_pool.values()))
-        # ring_state = await self._get_ring_from_node(random_node)
-        # if 'error' in ring_state:
-        #     logger.error(f"Failed to get ring state: {ring_state['error']}")
-        #     return target_nodes
-        
-        # # Find nodes in the ring
-        # sorted_hashes = SortedDict(ring_state)
-        # start_index = next(i for i, h in enumerate(sorted_hashes) if h >= key_hash)
-        
-        # for i in range(self.N):
-        #     node_hash = sorted_hashes[(start_index + i) % len(sorted_hashes)]
-        #     virtual_node = ring_state[node_hash]
-        #     node_info = self.virtual_nodes[virtual_node]
-        #     target_nodes.append(node_info)
-        
-        # return target_nodes
+            logger.error(f"Write failed to {node}: {e}")
+            return False
+
+    async def _open_from_node(self, node: str, key: str) -> Optional[aiohttp.ClientResponse]:
+        """
+        Start fetching one object from a node. Returns the response with its body still unread
+        (the caller must release it), or None if unavailable.
+        """
+        session = self._node_session(node)
+        if session is None:
+            return None
+        start = time.monotonic()
+        try:
+            response = await session.get(f'/fetch/{key}')
+        except Exception as e:
+            self.health.record(node, False)
+            logger.error(f"Read failed from {node}: {e}")
+            return None
+        self.health.record(node, response.status < 500, time.monotonic() - start)
+        if response.status != 200:
+            response.release()
+            return None
+        return response
+
+    async def _read_from_node(self, node: str, key: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Fetch one object from a node. Returns (content, content_type), or None if unavailable.
+        """
+        response = await self._open_from_node(node, key)
+        if response is None:
+            return None
+        try:
+            return await response.read(), response.content_type
+        except Exception as e:
+            logger.error(f"Read failed from {node}: {e}")
+            return None
+        finally:
+            response.release()
 
     async def put_image(self, username: str, key: str, image_file: UploadFile):
         """
         PUT operation to store an image in the distributed storage (Write quorum handled by nodes)
+        The image is sent straight to the nodes of its preference list.
+        Objects larger than CHUNK_THRESHOLD are stored as independently placed chunks plus a manifest.
         """
-        #! REPLACE BELOW BY target_nodes = await self._get_target_nodes(key)
-        target_nodes = list(self.connection_pool.keys())
+        target_nodes = await self._get_target_nodes(key)
         if not target_nodes:
             logger.warning(f"No target nodes found for key {key}")
             return False
+        await self.cache.invalidate((username, key))
 
-        async def _write_to_node(node):
-            try:
-                # file_content = await image_file.read()
-                form = FormData()
-                form.add_field("username", username)
-                form.add_field("key", key)
-                form.add_field(
-                    "file", 
-                    filename=image_file.filename, 
-                    value=image_file.file,
-                    content_type=image_file.content_type,
+        erasure_code = self._erasure_code(username)
+        if erasure_code:
+            # The primary node coordinates encoding and fragment placement (the next replica if it is down)
+            k, m = erasure_code
+
+            async def _write_coordinator(node: str) -> bool:
+                image_file.file.seek(0)
+                return await self._write_to_node(
+                    node, username, key, image_file.file, image_file.filename, image_file.content_type,
+                    path="/ec/upload", fields={"k": str(k), "m": str(m)},
                 )
-                print(f"Uploading image with key: {key}")
-                print(f"Form type: {type(form)}")
-                print(f"Form fields: {form._fields}")
-                print(f"form._fields[0]: {form._fields[0]}")
-                print(f"form._fields[1]: {form._fields[1]}")
-                print(f"form._fields[2]: {form._fields[2]}")
-                #! REPLACE NODE BY node['physical_node'] depending on what get_target_nodes returns
-                async with self.connection_pool[node].post(
-                    "/upload", 
-                    data=form
-                ) as response:
-                    return response.status == 200
-            except Exception as e:
-                logger.error(f"Write failed to {node}: {e}")
-                return False
 
-        write_response = await _write_to_node(random.choice(target_nodes))
+            write_response = bool(await self._fail_over(target_nodes, _write_coordinator))
+            if not write_response:
+                logger.warning(f"Failed to write erasure coded image for key {key}")
+            return write_response
+
+        size = image_file.file.seek(0, 2)
+        image_file.file.seek(0)
+        if size > CHUNK_THRESHOLD:
+            return await self._put_chunked(username, key, image_file, size)
+
+        write_response = await self._stream_to_replicas(target_nodes, username, key, image_file)
         if not write_response:
             logger.warning(f"Failed to write image for key {key}")
             return False
@@ -297,47 +750,425 @@ class DynamoControlPanel:
         
         # return True
 
-    async def get_image(self,username: str, key: str):
+    async def _put_chunked(self, username: str, key: str, image_file: UploadFile, size: int) -> bool:
         """
-        GET operation to retrieve an image from the distributed storage (Read quorum handled by nodes)
+        Split an object into CHUNK_SIZE chunks, each placed on the ring under its own key.
+        Up to CHUNK_PARALLELISM chunks are in flight (and in memory) at a time; the manifest
+        is written under the object's key once every chunk is stored.
+        """
+        in_flight = asyncio.Semaphore(CHUNK_PARALLELISM)
+
+        async def _put_chunk(chunk_id: str, data: bytes) -> bool:
+            try:
+                nodes = await self._get_target_nodes(chunk_id)
+                return bool(nodes) and await self._write_to_replicas(
+                    nodes, username, chunk_id, data, chunk_id, "application/octet-stream"
+                )
+            finally:
+                in_flight.release()
+
+        chunk_keys = []
+        tasks = []
+        while True:
+            await in_flight.acquire()
+            data = await image_file.read(CHUNK_SIZE)
+            if not data:
+                in_flight.release()
+                break
+            chunk_id = chunk_key(key, len(chunk_keys))
+            chunk_keys.append(chunk_id)
+            tasks.append(asyncio.create_task(_put_chunk(chunk_id, data)))
+
+        results = await asyncio.gather(*tasks)
+        if not all(results):
+            logger.warning(f"Failed to write {results.count(False)}/{len(results)} chunks for key {key}")
+            return False
+
+        manifest = build_manifest(key, size, CHUNK_SIZE, chunk_keys, image_file.content_type)
+        nodes = await self._get_target_nodes(key)
+        if not nodes or not await self._write_to_replicas(nodes, username, key, manifest, key, MANIFEST_CONTENT_TYPE):
+            logger.warning(f"Failed to write manifest for key {key}")
+            return False
+
+        logger.info(f"Stored key {key} as {len(chunk_keys)} chunks")
+        return True
+
+    def _signed_node_url(self, node: str, method: str, path: str, **params: str) -> str:
+        node_info = self.topology[node]
+        return signed_url(
+            URL_SIGNING_SECRET, f"http://{node_info['host']}:{node_info['port']}", method, path,
+            SIGNED_URL_TTL_SECONDS, **params,
+        )
+
+    async def _probe_node(self, node: str, key: str) -> Optional[bytes]:
+        """
+        Check that a node has an object by fetching only its first bytes (enough to spot a manifest).
+        """
+        session = self._node_session(node)
+        if session is None:
+            return None
+        reachable = False
+        start = time.monotonic()
+        try:
+            async with session.get(
+                f"/fetch/{key}", headers={"Range": f"bytes=0-{len(MANIFEST_MAGIC) - 1}"}
+            ) as response:
+                reachable = response.status < 500
+                if response.status in (200, 206):
+                    return await read_at_least(response, len(MANIFEST_MAGIC))
+                return None
+        except Exception as e:
+            reachable = False
+            logger.error(f"Probe failed on {node}: {e}")
+            return None
+        finally:
+            self.health.record(node, reachable, time.monotonic() - start)
+
+    async def get_image_url(self, username: str, key: str) -> Optional[str]:
+        """
+        Direct data path for reads: a short-lived signed URL to fetch the image straight from a node
+        holding it (which rebuilds it first if it is erasure coded). None when the image has to go through
+        the control panel instead (signing disabled, chunked object) or was not found.
+        """
+        if not URL_SIGNING_SECRET:
+            return None
+        for node in self.health.order(await self._get_target_nodes(key)):
+            head = await self._probe_node(node, key)
+            if head is None:
+                continue
+            if is_manifest(head):
+                return None
+            return self._signed_node_url(node, "GET", f"/fetch/{key}")
+        return None
+
+    async def put_image_urls(self, username: str, key: str, size: int) -> Optional[List[str]]:
+        """
+        Direct data path for writes: short-lived signed URLs to upload the image to each node of its
+        preference list (the client writes every replica). None when the image has to go through the
+        control panel instead (signing disabled, erasure coded bucket, object large enough to be chunked).
+        """
+        if not URL_SIGNING_SECRET or self._erasure_code(username) or size > CHUNK_THRESHOLD:
+            return None
+        return [
+            self._signed_node_url(node, "POST", "/upload", key=key, username=username)
+            for node in await self._get_target_nodes(key)
+        ]
+
+    async def _stream_chunks(self, manifest: dict):
+        """
+        Yield the chunks of a chunked object in order, fetching up to CHUNK_PARALLELISM
+        chunks ahead in parallel.
+        """
+        async def _read_chunk(chunk_id: str) -> Optional[Tuple[bytes, str]]:
+            return await self._read_from_replicas(await self._get_target_nodes(chunk_id), chunk_id)
+
+        async def _get_chunk(chunk_id: str) -> bytes:
+            cached = await self.cache.get(("chunk", chunk_id))
+            if cached:
+                return cached[0]
+            result, joined = await self.reads.do(("chunk", chunk_id), lambda: _read_chunk(chunk_id))
+            if result is None:
+                raise IOError(f"Chunk {chunk_id} of key {manifest['key']} is unavailable")
+            if not joined:
+                await self.cache.put(("chunk", chunk_id), *result)
+            return result[0]
+
+        chunk_keys = manifest["chunks"]
+        pending = [asyncio.create_task(_get_chunk(chunk_id)) for chunk_id in chunk_keys[:CHUNK_PARALLELISM]]
+        next_index = len(pending)
+        try:
+            while pending:
+                data = await pending.pop(0)
+                if next_index < len(chunk_keys):
+                    pending.append(asyncio.create_task(_get_chunk(chunk_keys[next_index])))
+                    next_index += 1
+                yield data
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _open_image(self, username: str, key: str, target_nodes: List[str]) -> Optional[aiohttp.ClientResponse]:
+        # Erasure coded images are rebuilt by the node serving them (their key holds a marker naming
+        # the code), so reads do not depend on the bucket's current storage policy
+        return await self._open_from_replicas(target_nodes, key)
+
+    async def _fetch_image(self, username: str, key: str) -> Optional[tuple]:
+        """
+        Open an image on the nodes and classify it:
+        ("manifest", manifest, raw) for chunked objects, ("content", bytes, content_type) for objects
+        small enough to share, ("stream", response, head) otherwise. None if not found.
         """
-        #! REPLACE below as target_nodes = await self._get_target_nodes(key)
-        target_nodes = list(self.connection_pool.keys())
+        target_nodes = await self._get_target_nodes(key)
         if not target_nodes:
             logger.warning(f"No target nodes found for key {key}")
             return None
-        
-        async def _read_from_node(node):
-            try:
-                #! REPLACE NODE BY node['physical_node'] depending on what get_target_nodes returns
-                async with self.connection_pool[node].get(
-                    f'/fetch/{key}', 
-                ) as response:
-                    if response.status == 200:
-                        # response object would be FileResponse
-                        # Get the raw content and headers
-                        content = await response.read()
-                        content_type = response.content_type  # Preserve the Content-Type
-
-                        # Return the file as a Response
-                        return Response(
-                            content=content,
-                            media_type=content_type,
-                            headers={"Content-Disposition": f"inline; filename={key}"}
-                        )
-                    return None
-            except Exception as e:
-                logger.error(f"Read failed from {node}: {e}")
-                return None
-        
-        # Read from any one of the target nodes
-        read_response = await _read_from_node(random.choice(target_nodes))
-        if read_response:
-            return read_response
-        else:
+
+        response = await self._open_image(username, key, target_nodes)
+        if not response and await self.refresh_ring(force=True):
+            # The ring changed under us: retry with the new preference list
+            response = await self._open_image(username, key, await self._get_target_nodes(key))
+        if not response:
             logger.warning(f"Could not read image for key {key}")
             return None
 
+        try:
+            head = await read_at_least(response, len(MANIFEST_MAGIC))
+            if is_manifest(head):
+                raw = head + await response.read()
+                response.release()
+                return ("manifest", parse_manifest(raw), raw)
+            if response.content_length is not None and response.content_length <= COALESCE_MAX_BYTES:
+                content = head + await response.read()
+                response.release()
+                return ("content", content, response.content_type)
+        except Exception as e:
+            response.release()
+            logger.error(f"Read failed for key {key}: {e}")
+            return None
+        return ("stream", response, head)
+
+    def _chunked_response(self, key: str, manifest: dict) -> StreamingResponse:
+        return StreamingResponse(
+            self._stream_chunks(manifest),
+            media_type=manifest["content_type"] or "application/octet-stream",
+            headers={
+                "Content-Disposition": f"inline; filename={key}",
+                "Content-Length": str(manifest["size"]),
+            },
+        )
+
+    async def _relay_and_cache(self, cache_key: tuple, response: aiohttp.ClientResponse, head: bytes):
+        """
+        Relay a streamed object, keeping a copy for the cache if it is small enough to be cached.
+        """
+        size = response.content_length
+        pieces = [] if size is not None and size <= self.cache.max_entry_bytes else None
+        content_type = response.content_type
+        async for piece in relay(response, head, STREAM_PIECE_SIZE):
+            if pieces is not None:
+                pieces.append(piece)
+            yield piece
+        if pieces is not None:
+            await self.cache.put(cache_key, b"".join(pieces), content_type)
+
+    async def get_image(self,username: str, key: str):
+        """
+        GET operation to retrieve an image from the distributed storage (Read quorum handled by nodes)
+        Images are served from the edge cache when possible. Otherwise the image is read straight
+        from the nodes of its preference list, in order, and streamed to the client as it arrives.
+        Chunked objects are reassembled as a stream while their chunks are fetched in parallel.
+        Concurrent requests for the same image share one upstream fetch (single-flight).
+        """
+        cache_key = (username, key)
+        cached = await self.cache.get(cache_key)
+        if cached:
+            content, content_type = cached
+            if is_manifest(content):
+                return self._chunked_response(key, parse_manifest(content))
+            return Response(
+                content=content, media_type=content_type, headers={"Content-Disposition": f"inline; filename={key}"}
+            )
+
+        result, joined = await self.reads.do(cache_key, lambda: self._fetch_image(username, key))
+        if result and result[0] == "stream" and joined:
+            # An open stream can only be relayed once: fetch our own
+            result = await self._fetch_image(username, key)
+        if not result:
+            return None
+
+        if result[0] == "manifest":
+            _, manifest, raw = result
+            if not joined:
+                await self.cache.put(cache_key, raw, MANIFEST_CONTENT_TYPE)
+            return self._chunked_response(key, manifest)
+
+        headers = {"Content-Disposition": f"inline; filename={key}"}
+        if result[0] == "content":
+            _, content, content_type = result
+            if not joined:
+                await self.cache.put(cache_key, content, content_type)
+            return Response(content=content, media_type=content_type, headers=headers)
+
+        _, response, head = result
+        if response.content_length is not None:
+            headers["Content-Length"] = str(response.content_length)
+        return StreamingResponse(
+            self._relay_and_cache(cache_key, response, head),
+            media_type=response.content_type,  # Preserve the Content-Type
+            headers=headers,
+        )
+
+    async def _delete_from_node(self, node: str, key: str) -> bool:
+        session = self._node_session(node)
+        if session is None:
+            return False
+        reachable = False
+        try:
+            async with session.delete(f"/delete/{key}") as response:
+                reachable = response.status < 500
+                return response.status == 200
+        except Exception as e:
+            reachable = False
+            logger.error(f"Delete failed on {node}: {e}")
+            return False
+        finally:
+            self.health.record(node, reachable)
+
+    async def _delete_everywhere(self, key: str) -> bool:
+        """
+        Delete a key on every node, which covers replicas, erasure coded fragments and copies left
+        behind by ring changes. Returns True if any node had it.
+        """
+        results = await asyncio.gather(*[self._delete_from_node(node, key) for node in list(self.connection_pool)])
+        return any(results)
+
+    async def get_images(self, username: str, keys: List[str]) -> AsyncIterator[bytes]:
+        """
+        Batch GET: streams one frame per key (see src.core.batch), in the order they become available.
+        Keys are grouped by the node that owns them (the healthiest of their preference list) and each
+        group is read with a single /fetch_batch request, all groups concurrently over the pooled
+        connections. Keys in the edge cache skip the nodes; keys a group did not return go through the
+        single-key read path with its fail-over.
+        """
+        output: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_DEPTH)
+        frame_lock = asyncio.Lock()  # Frames are written whole, one at a time
+        delivered = set()
+        done, aborted = object(), object()
+
+        async def _once(data: bytes):
+            yield data
+
+        async def _emit(key: str, size: int, body: AsyncIterable[bytes]):
+            async with frame_lock:
+                await output.put(frame_header(key, FOUND, size))
+                try:
+                    async for piece in body:
+                        await output.put(piece)
+                except Exception as e:
+                    # The frame is cut short: the stream cannot continue
+                    logger.error(f"Batch read of key {key} failed mid-frame: {e}")
+                    await output.put(aborted)
+                    raise
+                delivered.add(key)
+
+        async def _emit_content(key: str, content: bytes):
+            if is_manifest(content):
+                manifest = parse_manifest(content)
+                await _emit(key, manifest["size"], self._stream_chunks(manifest))
+            else:
+                await _emit(key, len(content), _once(content))
+
+        async def _emit_single(key: str):
+            result, joined = await self.reads.do((username, key), lambda: self._fetch_image(username, key))
+            if result and result[0] == "stream" and joined:
+                result = await self._fetch_image(username, key)
+            if not result:
+                return
+            if result[0] == "manifest":
+                await _emit_content(key, result[2])
+            elif result[0] == "content":
+                await _emit_content(key, result[1])
+            else:
+                _, response, head = result
+                if response.content_length is None:
+                    await _emit_content(key, head + await response.read())
+                    response.release()
+                else:
+                    await _emit(key, response.content_length, relay(response, head, STREAM_PIECE_SIZE))
+
+        async def _fetch_group(node: str, group: List[str]):
+            session = self._node_session(node)
+            answered = False
+            start = time.monotonic()
+            try:
+                if session is not None:
+                    async with session.post("/fetch_batch", json={"keys": group}) as response:
+                        # Judged at the headers, as single reads are: draining the frames also
+                        # waits on the client, however slowly it consumes the batch
+                        answered = True
+                        self.health.record(node, response.status < 500, time.monotonic() - start)
+                        while response.status == 200 and (frame := await read_frame_header(response.content)):
+                            key, status, size = frame
+                            if status != FOUND:
+                                continue
+                            body = iter_body(response.content, size, STREAM_PIECE_SIZE)
+                            if size <= COALESCE_MAX_BYTES:  # Small enough to be a manifest
+                                await _emit_content(key, b"".join([piece async for piece in body]))
+                            else:
+                                await _emit(key, size, body)
+            except Exception as e:
+                if not answered:
+                    self.health.record(node, False)
+                logger.error(f"Batch read failed on {node}: {e}")
+            for key in group:
+                if key not in delivered:
+                    await _emit_single(key)
+
+        async def _read_all():
+            tasks = []
+            groups: Dict[str, List[str]] = defaultdict(list)
+            for key in dict.fromkeys(keys):
+                cached = await self.cache.get((username, key))
+                nodes = [] if cached else self.health.order(await self._get_target_nodes(key))
+                if cached:
+                    tasks.append(_emit_content(key, cached[0]))
+                elif nodes:
+                    groups[nodes[0]].append(key)
+                else:
+                    tasks.append(_emit_single(key))
+            tasks.extend(_fetch_group(node, group) for node, group in groups.items())
+            tasks = [asyncio.create_task(task) for task in tasks]
+            try:
+                await asyncio.gather(*tasks)
+                for key in dict.fromkeys(keys):
+                    if key not in delivered:
+                        await output.put(frame_header(key, NOT_FOUND))
+            finally:
+                for task in tasks:  # After an aborted frame, the others must not wait on the output
+                    task.cancel()
+                await output.put(done)
+
+        reader = asyncio.create_task(_read_all())
+        try:
+            while (piece := await output.get()) is not done:
+                if piece is aborted:
+                    raise IOError("Batch read aborted mid-frame")
+                yield piece
+            await reader
+        finally:
+            reader.cancel()
+
+    async def delete_image(self, username: str, key: str) -> bool:
+        """
+        DELETE operation to remove an image (and the chunks of a chunked image) from the distributed
+        storage and from the edge cache.
+        """
+        manifest = None
+        for node in self.health.order(await self._get_target_nodes(key)):
+            head = await self._probe_node(node, key)
+            if head is None:
+                continue
+            if is_manifest(head):
+                read_response = await self._read_from_node(node, key)
+                manifest = parse_manifest(read_response[0]) if read_response else None
+            break
+
+        deleted = await self._delete_everywhere(key)
+        await self.cache.invalidate((username, key))
+        if manifest:
+            in_flight = asyncio.Semaphore(CHUNK_PARALLELISM)
+
+            async def _delete_chunk(chunk_id: str):
+                async with in_flight:
+                    await self._delete_everywhere(chunk_id)
+                await self.cache.invalidate(("chunk", chunk_id))
+
+            await asyncio.gather(*[_delete_chunk(chunk_id) for chunk_id in manifest["chunks"]])
+
+        if not deleted:
+            logger.warning(f"Key {key} not found on any node")
+        return deleted
+
         # # Concurrent reads
         # read_results = await asyncio.gather(
         #     *[_read_from_node(node) for node in target_nodes[:self.R]]
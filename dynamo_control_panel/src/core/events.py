@@ -0,0 +1,108 @@
+import asyncio
+import json
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set
+
+RESYNC = json.dumps({"type": "resync"})
+
+
+class Subscription:
+    """
+    One subscriber's queue of encoded events. A subscriber that falls `depth` events behind
+    loses its backlog and receives a single resync marker instead, so a slow client never
+    holds memory (or the publisher) hostage and just reloads a snapshot.
+    """
+
+    def __init__(self, depth: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=depth)
+        self.dropped = 0
+
+    def offer(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self) -> str:
+        return await self.queue.get()
+
+
+class EventBus:
+    """
+    In-process publish/subscribe for dashboard events.
+
+    - Each event is JSON encoded once and queued for every subscriber, however many there are.
+    - Publishing never blocks and is free when nobody is subscribed.
+    """
+
+    def __init__(self, depth: int = 256):
+        self.depth = depth
+        self.subscribers: Set[Subscription] = set()
+        self.published = 0
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.depth)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    def publish(self, event_type: str, **data: Any):
+        if not self.subscribers:
+            return
+        message = json.dumps({"type": event_type, "at": time.time(), **data})
+        self.published += 1
+        for subscription in self.subscribers:
+            subscription.offer(message)
+
+
+class RequestMeter:
+    """
+    Throughput and latency counters per operation (get, put, ...), read and reset once per
+    dashboard tick.
+    """
+
+    def __init__(self):
+        self._started = time.monotonic()
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._errors: Dict[str, int] = defaultdict(int)
+        self._seconds: Dict[str, float] = defaultdict(float)
+        self._max_seconds: Dict[str, float] = defaultdict(float)
+
+    def record(self, operation: str, seconds: float, success: bool = True):
+        self._counts[operation] += 1
+        self._seconds[operation] += seconds
+        self._max_seconds[operation] = max(self._max_seconds[operation], seconds)
+        if not success:
+            self._errors[operation] += 1
+
+    def take(self) -> Optional[Dict[str, Any]]:
+        """
+        Returns the counters of the window since the previous call and starts a new window,
+        or None if there was no request in the window.
+        """
+        now = time.monotonic()
+        elapsed = max(now - self._started, 1e-9)
+        self._started = now
+        if not self._counts:
+            return None
+        window = {
+            operation: {
+                "count": count,
+                "errors": self._errors[operation],
+                "per_second": count / elapsed,
+                "avg_ms": self._seconds[operation] / count * 1000,
+                "max_ms": self._max_seconds[operation] * 1000,
+            }
+            for operation, count in self._counts.items()
+        }
+        self._counts.clear()
+        self._errors.clear()
+        self._seconds.clear()
+        self._max_seconds.clear()
+        return window
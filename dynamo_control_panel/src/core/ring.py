@@ -0,0 +1,63 @@
+import bisect
+import hashlib
+from typing import Dict, List, Optional
+
+
+class RingView:
+    """
+    Read-only copy of the nodes' consistent hash ring, used for client-side routing.
+
+    - Built from the metadata nodes serve at /get_ring: their token table when present, otherwise
+      the physical nodes and their virtual node counts.
+    - Places virtual nodes and keys exactly like the nodes' HashRing, so the preference list
+      computed here is the one the nodes use.
+    - `version` is the ring's membership version; -1 means no ring has been fetched yet.
+    """
+
+    def __init__(self, physical_nodes: Optional[Dict[str, int]] = None, replicas: int = 3, version: int = -1,
+                 tokens: Optional[List[int]] = None, owners: Optional[List[str]] = None):
+        self.physical_nodes = dict(physical_nodes or {})
+        self.replicas = replicas
+        self.version = version
+        if tokens is None:
+            ring = {}
+            for node, num_virtual_nodes in self.physical_nodes.items():
+                for i in range(num_virtual_nodes):
+                    ring.setdefault(self._hash(f"{node}-vn{i}"), node)
+            tokens = sorted(ring)
+            owners = [ring[token] for token in tokens]
+        self.tokens = tokens
+        self.owners = owners
+
+    @classmethod
+    def from_metadata(cls, metadata: dict) -> "RingView":
+        tokens = metadata.get("tokens")
+        return cls(
+            metadata["physical_nodes"], metadata.get("replicas", 3), metadata.get("version", 0),
+            tokens=[int(token, 16) for token in tokens] if tokens is not None else None,
+            owners=metadata.get("owners"),
+        )
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        """Same as the nodes' hash: 64-char hex keys are used as is, anything else is SHA-256 hashed."""
+        if len(key) == 64 and all(c in '0123456789abcdef' for c in key.lower()):
+            return int(key, 16)
+        return int(hashlib.sha256(key.encode()).hexdigest(), 16)
+
+    def preference_list(self, key: str, count: Optional[int] = None) -> List[str]:
+        """
+        Returns the distinct physical nodes responsible for a key, primary first.
+        """
+        if not self.tokens:
+            return []
+        count = count or self.replicas
+        idx = bisect.bisect_right(self.tokens, self._hash(key)) % len(self.tokens)
+        nodes = []
+        for offset in range(len(self.tokens)):
+            node = self.owners[(idx + offset) % len(self.tokens)]
+            if node not in nodes:
+                nodes.append(node)
+                if len(nodes) == count:
+                    break
+        return nodes
@@ -0,0 +1,33 @@
+import hashlib
+import hmac
+import time
+from typing import Dict
+from urllib.parse import urlencode
+
+
+def signature(secret: str, method: str, path: str, expires: int, **params: str) -> str:
+    """
+    HMAC-SHA256 of a request: method, path, expiry time and the parameters it is restricted to.
+    Must match the nodes' app.core.signing.signature (see tests/test_wire_format.py).
+    """
+    canonical = "\n".join([method.upper(), path, str(expires)] + [f"{k}={params[k]}" for k in sorted(params)])
+    return hmac.new(secret.encode(), canonical.encode(), hashlib.sha256).hexdigest()
+
+
+def signed_url(secret: str, base_url: str, method: str, path: str, ttl: float, **params: str) -> str:
+    """
+    Builds a URL for a node endpoint that the node accepts until `ttl` seconds from now.
+    `params` are covered by the signature but not added to the URL (e.g. form fields of an upload).
+    """
+    expires = int(time.time() + ttl)
+    sig = signature(secret, method, path, expires, **params)
+    return f"{base_url}{path}?{urlencode({'expires': expires, 'sig': sig})}"
+
+
+# Requests to the nodes carry the cluster's shared secret in this header (see the nodes' app.core.signing)
+CLUSTER_SECRET_HEADER = "X-Cluster-Secret"
+
+
+def cluster_headers(secret: str) -> Dict[str, str]:
+    """Headers proving a request comes from inside the cluster (none when no secret is configured)."""
+    return {CLUSTER_SECRET_HEADER: secret} if secret else {}
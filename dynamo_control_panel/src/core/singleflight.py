@@ -0,0 +1,42 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent calls for the same key share one execution.
+
+    - The first caller for a key runs the function; callers arriving while it is in flight
+      wait for the same result (or exception) instead of running it again.
+    - The shared execution is shielded, so one caller giving up does not cancel it for the others.
+    - Nothing is cached: once the execution finishes, the next call for the key runs it again.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Returns:
+            Tuple[Any, bool]: The result, and whether it came from another caller's execution.
+        """
+        self.calls += 1
+        flight = self._flights.get(key)
+        joined = flight is not None
+        if not joined:
+            self.executions += 1
+            flight = self._flights[key] = asyncio.ensure_future(fn())
+            flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        return await asyncio.shield(flight), joined
+
+    def report(self) -> dict:
+        coalesced = self.calls - self.executions
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": coalesced,
+            "coalescing_ratio": coalesced / self.calls if self.calls else 0.0,
+            "in_flight": len(self._flights),
+        }
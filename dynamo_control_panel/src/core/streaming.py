@@ -0,0 +1,66 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, List, Set
+
+import aiohttp
+
+
+class FanOut:
+    """
+    Streams one source to several consumers (e.g. the replicas of a write) while reading it once.
+
+    - Each consumer has a bounded queue, so the source is read no faster than the slowest live
+      consumer (backpressure) and at most `depth` pieces per consumer are buffered.
+    - A consumer that stops early (failed write) must be closed, so it no longer holds back the others.
+    """
+
+    def __init__(self, read: Callable[[int], Awaitable[bytes]], consumers: int, piece_size: int, depth: int = 4):
+        self._read = read
+        self._piece_size = piece_size
+        self._queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=depth) for _ in range(consumers)]
+        self._closed: Set[int] = set()
+
+    async def pump(self):
+        """Reads the source to the end, handing every piece to each consumer still open."""
+        while True:
+            piece = await self._read(self._piece_size)
+            for index, queue in enumerate(self._queues):
+                if index not in self._closed:
+                    await queue.put(piece)
+            if not piece:
+                break
+
+    async def stream(self, index: int) -> AsyncIterator[bytes]:
+        queue = self._queues[index]
+        while piece := await queue.get():
+            yield piece
+
+    def close(self, index: int):
+        self._closed.add(index)
+        queue = self._queues[index]
+        while not queue.empty():  # Unblocks a pump waiting on this queue
+            queue.get_nowait()
+
+
+async def read_at_least(response: aiohttp.ClientResponse, size: int) -> bytes:
+    """Reads the first `size` bytes of a response body (fewer if the body is shorter)."""
+    data = b""
+    while len(data) < size:
+        piece = await response.content.read(size - len(data))
+        if not piece:
+            break
+        data += piece
+    return data
+
+
+async def relay(response: aiohttp.ClientResponse, head: bytes, piece_size: int) -> AsyncIterator[bytes]:
+    """
+    Yields a response body (after its already read `head`) as it arrives, releasing the
+    connection at the end. The body is only read as fast as the client consumes it.
+    """
+    try:
+        if head:
+            yield head
+        async for piece in response.content.iter_chunked(piece_size):
+            yield piece
+    finally:
+        response.release()
@@ -16,8 +16,7 @@ function initializeWebSocket() {
 
     socket.onmessage = function (event) {
         try {
-            const data = JSON.parse(event.data);
-            updateRingStatus(data);
+            handleDashboardEvent(JSON.parse(event.data));
         } catch (error) {
             console.error("Error parsing WebSocket message:", error);
             showNotification('Error', 'Failed to parse WebSocket data', 'error');
@@ -37,14 +36,47 @@ function initializeWebSocket() {
 }
 
 
+// The server sends a snapshot on connect, then only events (deltas)
+function handleDashboardEvent(data) {
+    switch (data.type) {
+        case 'snapshot':
+            updateRingStatus(data.ring);
+            updateNodeHealth(data.health);
+            break;
+        case 'ring':
+            updateRingStatus(data);
+            break;
+        case 'membership':
+            updateMembership(data);
+            break;
+        case 'health':
+            updateNodeHealth(data.nodes);
+            break;
+        case 'metrics':
+            updateMetrics(data);
+            break;
+        case 'rebalance':
+            updateRebalance(data);
+            break;
+        default:
+            console.warn("Unknown dashboard event:", data.type);
+    }
+}
+
 function updateRingStatus(data) {
     try {
+        const ringVersionElement = document.getElementById('ring_version');
         const virtualNodesElement = document.getElementById('virtual_nodes');
         const physicalNodesElement = document.getElementById('physical_nodes');
 
+        if (ringVersionElement) {
+            ringVersionElement.innerText = data.version >= 0 ? data.version : 'No ring yet';
+        }
+
         if (virtualNodesElement) {
-            virtualNodesElement.innerText = Array.isArray(data.virtual_nodes) ? 
-                data.virtual_nodes.join(', ') : 'No virtual nodes';
+            const counts = Object.entries(data.virtual_nodes || {});
+            virtualNodesElement.innerText = counts.length ?
+                counts.map(([node, count]) => `${node}: ${count}`).join(', ') : 'No virtual nodes';
         }
 
         if (physicalNodesElement) {
@@ -57,6 +89,43 @@ function updateRingStatus(data) {
     }
 }
 
+function updateMembership(data) {
+    if (data.phase === 'joining') {
+        showNotification('Rebalancing', `Node ${data.node_id} is joining, transferring its keys...`, 'info');
+    } else if (data.phase === 'joined') {
+        showNotification('Rebalanced', `Node ${data.node_id} joined in ${data.seconds.toFixed(1)}s`, 'success');
+    } else if (data.phase === 'failed') {
+        showNotification('Error', `Node ${data.node_id} failed to join`, 'error');
+    }
+}
+
+function updateRebalance(data) {
+    if (data.phase === 'started') {
+        showNotification('Rebalancing', `Moving keys to ${data.new_nodes.join(', ')} from ${data.sources.length} nodes`, 'info');
+    } else if (data.phase === 'progress') {
+        showNotification('Rebalancing', `${data.done}/${data.total} nodes done, ${data.sent} keys moved`, data.ok ? 'info' : 'warning');
+    } else if (data.phase === 'finished') {
+        showNotification('Rebalanced', `${data.sent} keys moved, ${data.failed} failed`, data.failed ? 'warning' : 'success');
+    }
+}
+
+function updateNodeHealth(nodes) {
+    const healthElement = document.getElementById('node_health');
+    if (!healthElement) return;
+    const entries = Object.entries(nodes || {});
+    healthElement.innerText = entries.length ?
+        entries.map(([node, breaker]) => `${node}: ${breaker.state}`).join(', ') : 'No requests yet';
+}
+
+function updateMetrics(data) {
+    const metricsElement = document.getElementById('throughput');
+    if (!metricsElement) return;
+    const operations = Object.entries(data.operations || {});
+    metricsElement.innerText = operations.map(([operation, counters]) =>
+        `${operation}: ${counters.per_second.toFixed(1)}/s, avg ${counters.avg_ms.toFixed(1)} ms, max ${counters.max_ms.toFixed(1)} ms`
+    ).join(' | ') + ` | cache hit rate ${(data.cache_hit_rate * 100).toFixed(0)}%`;
+}
+
 async function addNode(event) {
     event.preventDefault();
 
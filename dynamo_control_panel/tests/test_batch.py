@@ -0,0 +1,139 @@
+import asyncio
+import os
+import pytest
+from src.core.batch import FOUND, FRAME_HEADER, NOT_FOUND, frame_header, iter_body, read_frame_header
+from src.core.config import COALESCE_MAX_BYTES
+from src.core.control_panel import DynamoControlPanel
+
+
+def frames(*frames) -> bytes:
+    return b"".join(frame_header(key, status, len(body)) + body for key, status, body in frames)
+
+
+def stream(*parts: bytes) -> asyncio.StreamReader:
+    """A stream that received `parts`; must be created on the running event loop."""
+    content = asyncio.StreamReader()
+    for part in parts:
+        content.feed_data(part)
+    content.feed_eof()
+    return content
+
+
+async def read_frames(content: asyncio.StreamReader, piece_size: int = 3) -> list:
+    """The (key, status, body) of every frame of a stream."""
+    received = []
+    while (frame := await read_frame_header(content)) is not None:
+        key, status, size = frame
+        received.append((key, status, b"".join([piece async for piece in iter_body(content, size, piece_size)])))
+    return received
+
+
+def test_frames_are_demultiplexed():
+    """Test that frames are split correctly wherever the stream is cut."""
+    sent = [("a" * 64, FOUND, b"first image"), ("clé", NOT_FOUND, b""), ("b", FOUND, bytes(range(256)) * 4)]
+    data = frames(*sent)
+
+    async def main():
+        return (await read_frames(stream(*(data[i:i + 1] for i in range(len(data))))),
+                await read_frames(stream(data), piece_size=1000),
+                await read_frames(stream()))
+
+    assert asyncio.run(main()) == (sent, sent, [])
+
+
+def test_torn_frames_fail():
+    """Test that a stream ending inside a header or a body raises instead of losing the frame."""
+    data = frames(("key", FOUND, b"image"))
+
+    async def parse(data: bytes):
+        return await read_frames(stream(data))
+
+    with pytest.raises(asyncio.IncompleteReadError):
+        asyncio.run(parse(data + data[:FRAME_HEADER.size - 1]))
+    with pytest.raises(IOError):
+        asyncio.run(parse(data[:-1]))
+
+
+class FakeBatchResponse:
+    def __init__(self, body: bytes):
+        self.status = 200
+        self.content = stream(body)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class FakeBatchNode:
+    """Stands in for a node's session, answering /fetch_batch from the images it holds."""
+
+    def __init__(self, images: dict):
+        self.images = images
+        self.requests = []
+
+    def post(self, path, json):
+        self.requests.append((path, json["keys"]))
+        return FakeBatchResponse(frames(*(
+            (key, FOUND, self.images[key]) if key in self.images else (key, NOT_FOUND, b"") for key in json["keys"]
+        )))
+
+
+def test_batch_read_is_grouped_by_node_and_demultiplexed(monkeypatch):
+    """
+    Test that a batch read asks each node for its keys in one request, and relays every frame whole:
+    small and large images, a cached image and a key no node has.
+    """
+    images = {"k1": os.urandom(100), "k2": os.urandom(COALESCE_MAX_BYTES + 1), "k3": os.urandom(10),
+              "cached": os.urandom(50)}
+    nodes = {"n1": FakeBatchNode({"k1": images["k1"], "k2": images["k2"]}), "n2": FakeBatchNode({"k3": images["k3"]})}
+    owners = {"k1": "n1", "k2": "n1", "k3": "n2", "missing": "n2"}
+
+    async def main():
+        panel = DynamoControlPanel()
+        panel.connection_pool = nodes
+
+        async def _get_target_nodes(key, count=None):
+            return [owners[key]]
+
+        async def _fetch_image(username, key):
+            return None
+
+        monkeypatch.setattr(panel, "_get_target_nodes", _get_target_nodes)
+        monkeypatch.setattr(panel, "_fetch_image", _fetch_image)
+        await panel.cache.put(("alice", "cached"), images["cached"], "image/jpeg")
+        keys = ["k1", "cached", "k2", "missing", "k3", "k1"]
+        body = b"".join([piece async for piece in panel.get_images("alice", keys)])
+        return await read_frames(stream(body), piece_size=len(body) or 1)
+
+    received = asyncio.run(main())
+    assert len(received) == 5
+    assert {key: (status, body) for key, status, body in received} == {
+        **{key: (FOUND, image) for key, image in images.items()}, "missing": (NOT_FOUND, b""),
+    }
+    assert nodes["n1"].requests == [("/fetch_batch", ["k1", "k2"])]
+    assert nodes["n2"].requests == [("/fetch_batch", ["missing", "k3"])]
+
+
+def test_batch_read_health_is_judged_at_the_headers(monkeypatch):
+    """Test that a client draining a batch slowly does not count against the node's latency."""
+    clock = [0.0]
+    images = {f"k{i}": os.urandom(COALESCE_MAX_BYTES + 1) for i in range(3)}
+    recorded = []
+    monkeypatch.setattr("src.core.control_panel.time.monotonic", lambda: clock[0])
+
+    async def main():
+        panel = DynamoControlPanel()
+        panel.connection_pool = {"n1": FakeBatchNode(images)}
+
+        async def _get_target_nodes(key, count=None):
+            return ["n1"]
+
+        monkeypatch.setattr(panel, "_get_target_nodes", _get_target_nodes)
+        monkeypatch.setattr(panel.health, "record", lambda *args: recorded.append(args))
+        async for _ in panel.get_images("alice", list(images)):
+            clock[0] += 10  # Far slower than the breaker tolerates, on the client's side
+
+    asyncio.run(main())
+    assert recorded == [("n1", True, 0.0)]
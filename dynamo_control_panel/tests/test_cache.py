@@ -0,0 +1,78 @@
+import asyncio
+import os
+from src.core.cache import EdgeCache
+
+
+def run(cache: EdgeCache, *steps):
+    """Runs cache calls in order on one event loop, returning their results."""
+    async def _run():
+        return [await step(cache) for step in steps]
+    return asyncio.run(_run())
+
+
+def put(key, content: bytes, content_type: str = "image/jpeg"):
+    return lambda cache: cache.put(key, content, content_type)
+
+
+def get(key):
+    return lambda cache: cache.get(key)
+
+
+def test_least_recently_used_entries_are_evicted_by_bytes():
+    """Test that the memory tier stays under its byte bound, evicting the least recently used first."""
+    cache = EdgeCache(max_bytes=10, max_entry_bytes=10)
+    results = run(cache, put("a", b"aaaa"), put("b", b"bbbb"), get("a"), put("c", b"cccc"), get("b"), get("a"), get("c"))
+
+    assert results[-3:] == [None, (b"aaaa", "image/jpeg"), (b"cccc", "image/jpeg")]
+    assert cache.memory_bytes == 8
+    report = cache.report()
+    assert report["evictions"] == 1 and report["entries"] == 2
+    assert report["memory_hits"] == 3 and report["misses"] == 1
+
+
+def test_large_objects_are_not_cached():
+    """Test that objects above the entry limit, or the whole cache, are skipped."""
+    cache = EdgeCache(max_bytes=10, max_entry_bytes=6)
+    assert run(cache, put("a", b"x" * 7), get("a")) == [None, None]
+    assert cache.memory_bytes == 0
+
+
+def test_replacing_an_entry_keeps_the_byte_count():
+    """Test that putting a key again replaces its entry instead of counting it twice."""
+    cache = EdgeCache(max_bytes=10, max_entry_bytes=10)
+    assert run(cache, put("a", b"old!"), put("a", b"new"), get("a"))[-1] == (b"new", "image/jpeg")
+    assert cache.memory_bytes == 3
+
+
+def test_evicted_entries_spill_to_disk(tmp_path):
+    """Test that entries evicted from memory are kept on disk, and a disk hit brings them back."""
+    cache = EdgeCache(max_bytes=8, max_entry_bytes=8, spill_dir=str(tmp_path), spill_max_bytes=8)
+    run(cache, put("a", b"aaaa"), put("b", b"bbbb"), put("c", b"cccc"))
+    assert cache.disk_bytes == 4 and os.listdir(tmp_path) == [os.path.basename(cache._spill_path("a"))]
+
+    assert run(cache, get("a")) == [(b"aaaa", "image/jpeg")]
+    assert cache.report()["disk_hits"] == 1
+    # Back in memory, so "b" (now least recently used) went to disk in its place
+    assert cache.memory_bytes == 8 and cache.disk_bytes == 4
+    assert os.listdir(tmp_path) == [os.path.basename(cache._spill_path("b"))]
+
+
+def test_disk_tier_is_byte_bounded(tmp_path):
+    """Test that the oldest spilled entries are deleted once the disk tier is full."""
+    cache = EdgeCache(max_bytes=4, max_entry_bytes=4, spill_dir=str(tmp_path), spill_max_bytes=8)
+    run(cache, *(put(key, key.encode() * 4) for key in "abcd"))
+
+    assert cache.disk_bytes == 8
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(cache._spill_path(key)) for key in "bc")
+    assert run(cache, get("a"), get("b"), get("d")) == [None, (b"bbbb", "image/jpeg"), (b"dddd", "image/jpeg")]
+
+
+def test_invalidate_drops_both_tiers(tmp_path):
+    """Test that invalidating a key removes it from memory and from disk."""
+    cache = EdgeCache(max_bytes=4, max_entry_bytes=4, spill_dir=str(tmp_path), spill_max_bytes=8)
+    run(cache, put("a", b"aaaa"), put("b", b"bbbb"))
+    run(cache, lambda cache: cache.invalidate("a"), lambda cache: cache.invalidate("b"))
+
+    assert run(cache, get("a"), get("b")) == [None, None]
+    assert cache.memory_bytes == 0 and cache.disk_bytes == 0 and os.listdir(tmp_path) == []
+    assert cache.report()["invalidations"] == 2
@@ -0,0 +1,55 @@
+import asyncio
+import io
+import os
+from fastapi import UploadFile
+from src.core import control_panel
+from src.core.chunking import build_manifest, chunk_key, is_manifest, parse_manifest
+from src.core.control_panel import DynamoControlPanel
+
+
+def test_manifest_round_trip():
+    chunks = [chunk_key("key", index) for index in range(3)]
+    manifest = build_manifest("key", 250, 100, chunks, "image/jpeg")
+    assert is_manifest(manifest) and not is_manifest(b"\xff\xd8 a jpeg")
+    assert parse_manifest(manifest) == {
+        "key": "key", "size": 250, "chunk_size": 100, "chunks": chunks, "content_type": "image/jpeg",
+    }
+    # Each chunk gets its own 64-char key, so the ring places it independently of the object
+    assert len(set(chunks)) == 3 and all(len(chunk) == 64 for chunk in chunks)
+
+
+def test_large_object_is_stored_as_chunks_and_reassembled(monkeypatch):
+    """Test that an object above the threshold is split into chunks plus a manifest, and streams back whole."""
+    monkeypatch.setattr(control_panel, "CHUNK_THRESHOLD", 1000)
+    monkeypatch.setattr(control_panel, "CHUNK_SIZE", 300)
+    monkeypatch.setattr(control_panel, "CHUNK_PARALLELISM", 2)
+    data = os.urandom(1000 + 250)
+    stored = {}
+
+    async def main():
+        panel = DynamoControlPanel()
+        panel.connection_pool = {"n1": None}
+
+        async def _get_target_nodes(key, count=None):
+            return ["n1"]
+
+        async def _write_to_replicas(nodes, username, key, value, filename, content_type):
+            stored[key] = (value, content_type)
+            return True
+
+        async def _read_from_replicas(nodes, key):
+            return stored.get(key)
+
+        monkeypatch.setattr(panel, "_get_target_nodes", _get_target_nodes)
+        monkeypatch.setattr(panel, "_write_to_replicas", _write_to_replicas)
+        monkeypatch.setattr(panel, "_read_from_replicas", _read_from_replicas)
+        upload = UploadFile(io.BytesIO(data), filename="big.jpg", headers={"content-type": "image/jpeg"})
+        assert await panel.put_image("alice", "key", upload)
+        manifest = parse_manifest(stored["key"][0])
+        return manifest, b"".join([chunk async for chunk in panel._stream_chunks(manifest)])
+
+    manifest, reassembled = asyncio.run(main())
+    assert manifest["size"] == len(data) and manifest["chunk_size"] == 300
+    assert manifest["chunks"] == [chunk_key("key", index) for index in range(5)]
+    assert [len(stored[chunk][0]) for chunk in manifest["chunks"]] == [300, 300, 300, 300, 50]
+    assert reassembled == data
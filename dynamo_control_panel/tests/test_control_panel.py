@@ -0,0 +1,60 @@
+import asyncio
+import aiohttp
+import pytest
+from src.core.control_panel import DynamoControlPanel
+
+
+class FakeResponse:
+    def __init__(self, node: str, status: int = 200):
+        self.node = node
+        self.status = status
+
+    def release(self):
+        pass
+
+
+class FakeNode:
+    """Stands in for a node's session: answers every GET, or fails to connect when down."""
+
+    def __init__(self, name: str, down: bool = False, status: int = 200):
+        self.name = name
+        self.down = down
+        self.status = status
+        self.requests = []
+
+    async def get(self, path, params=None):
+        self.requests.append((path, params))
+        if self.down:
+            raise aiohttp.ClientConnectionError(f"{self.name} is down")
+        return FakeResponse(self.name, self.status)
+
+
+@pytest.mark.parametrize("policy", ["ec:2+1", "replicated"])
+def test_reads_do_not_depend_on_the_storage_policy(policy):
+    """
+    Test that images are read by key, failing over past a node that is down, whatever the bucket's
+    policy is now: nodes rebuild erasure coded images themselves.
+    """
+    nodes = {"n1": FakeNode("n1", down=True), "n2": FakeNode("n2"), "n3": FakeNode("n3")}
+
+    async def main():
+        panel = DynamoControlPanel()
+        panel.set_storage_policy("alice", policy)
+        panel.connection_pool = nodes
+        return await panel._open_image("alice", "key", ["n1", "n2", "n3"])
+
+    response = asyncio.run(main())
+
+    assert response.node == "n2"
+    assert nodes["n2"].requests == [("/fetch/key", None)]
+    assert nodes["n3"].requests == []
+
+
+@pytest.mark.parametrize("policy", ["ec:4+0", "ec:0+2", "ec:256+0", "ec:200+56", "ec:4", "rs:4+2"])
+def test_unsupported_storage_policies_are_refused(policy):
+    """Test that erasure codes the nodes cannot build are refused when the policy is set."""
+    panel = DynamoControlPanel()
+    with pytest.raises(ValueError):
+        panel.set_storage_policy("alice", policy)
+    assert "alice" not in panel.storage_policies
+    assert panel.parse_storage_policy("ec:254+1") == (254, 1)
@@ -0,0 +1,117 @@
+import pytest
+from src.core import health
+from src.core.health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, NodeHealth, RetryBudget
+
+
+class Clock:
+    """Stands in for time.monotonic, advanced by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(health.time, "monotonic", clock)
+    return clock
+
+
+def test_breaker_trips_after_consecutive_failures(clock):
+    """Test that the breaker opens after the failure threshold and refuses requests while open."""
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=5)
+    for _ in range(2):
+        breaker.record(False)
+    breaker.record(True)  # A success resets the count
+    for _ in range(2):
+        breaker.record(False)
+    assert breaker.state == CLOSED and breaker.allow()
+
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.report()["trips"] == 1 and breaker.report()["rejected"] == 1
+
+
+def test_breaker_trips_on_error_rate(clock):
+    """Test that the breaker opens once too many of the last requests failed, even if not in a row."""
+    breaker = CircuitBreaker(failure_threshold=100, error_rate=0.5, window=4)
+    for success in (True, False, True, False):
+        breaker.record(success)
+    assert breaker.state == CLOSED  # Exactly 50%
+    breaker.record(False)
+    assert breaker.state == OPEN
+
+
+def test_slow_responses_count_as_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, slow_seconds=1.0)
+    breaker.record(True, latency=0.5)
+    breaker.record(True, latency=1.5)
+    breaker.record(True, latency=2.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_probe(clock):
+    """Test that after the cooldown a single probe is let through, and its outcome decides the state."""
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=5, max_cooldown=15)
+    breaker.record(False)
+    clock.now += 4.9
+    assert not breaker.allow()
+
+    clock.now += 0.1
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # Only one probe at a time
+    breaker.record(False)
+    assert breaker.state == OPEN and breaker.current_cooldown == 10
+
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.current_cooldown == 15  # Capped
+
+    clock.now += 15
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CLOSED and breaker.current_cooldown == 5
+    assert breaker.allow() and breaker.allow()
+
+
+def test_late_outcomes_do_not_reopen(clock):
+    """Test that outcomes of requests sent before the breaker tripped are ignored while it is open."""
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=5)
+    breaker.record(False)
+    opened_at = breaker.opened_at
+    clock.now += 1
+    breaker.record(False)
+    assert breaker.opened_at == opened_at and breaker.trips == 1
+
+
+def test_nodes_are_ordered_healthy_first(clock):
+    nodes = NodeHealth(failure_threshold=1)
+    nodes.record("n1", False)
+    assert nodes.order(["n1", "n2", "n3"]) == ["n2", "n3", "n1"]
+    assert not nodes.allow("n1") and nodes.allow("n2")
+    assert set(nodes.report()) == {"n1", "n2", "n3"}
+
+
+def test_retry_budget_is_exhausted(clock):
+    """Test that retries stop once the budget is spent, until traffic or time earns more."""
+    budget = RetryBudget(ratio=0.5, min_per_second=2, max_tokens=3)
+    assert [budget.try_retry() for _ in range(4)] == [True, True, True, False]
+    assert budget.report()["exhausted"] == 1
+
+    budget.record_request()
+    assert not budget.try_retry()  # Half a token
+    budget.record_request()
+    assert budget.try_retry()
+
+    clock.now += 1  # min_per_second tokens a second
+    assert [budget.try_retry() for _ in range(3)] == [True, True, False]
+    clock.now += 60
+    assert budget.tokens <= budget.max_tokens
+    assert [budget.try_retry() for _ in range(4)] == [True, True, True, False]
+    report = budget.report()
+    assert report["retries"] == 9 and report["exhausted"] == 4 and report["requests"] == 2
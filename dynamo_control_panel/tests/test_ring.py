@@ -0,0 +1,34 @@
+import asyncio
+from src.core.control_panel import DynamoControlPanel
+from src.core.ring import RingView
+
+
+def ring(version: int, *nodes: str) -> dict:
+    return {"physical_nodes": {node: 8 for node in nodes}, "replicas": 2, "version": version, "etag": f'"{version}"'}
+
+
+def test_preference_list_holds_distinct_nodes():
+    view = RingView.from_metadata(ring(1, "n1", "n2", "n3"))
+    for key in ("a", "b", "c" * 64):
+        nodes = view.preference_list(key)
+        assert len(nodes) == 2 == len(set(nodes))
+        assert nodes == view.preference_list(key, 3)[:2]
+    assert RingView().preference_list("a") == []
+
+
+def test_ring_version_only_moves_forward():
+    """Test that the cached ring is only replaced by a ring with a higher version."""
+    async def main():
+        panel = DynamoControlPanel()
+        applied = [
+            panel._apply_ring(ring(2, "n1", "n2"), "n1"),
+            panel._apply_ring(ring(1, "n1"), "n2"),            # Older: a node that missed a change
+            panel._apply_ring(ring(2, "n1", "n2", "n3"), "n3"),  # Same version
+            panel._apply_ring(ring(3, "n1", "n2", "n3"), "n3"),
+        ]
+        return panel, applied
+
+    panel, applied = asyncio.run(main())
+    assert applied == [True, False, False, True]
+    assert panel.ring.version == 3 and panel.ring_etag == '"3"'
+    assert set(panel.ring.physical_nodes) == {"n1", "n2", "n3"}
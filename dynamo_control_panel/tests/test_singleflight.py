@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from src.core.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "image"
+
+    async def main():
+        return await asyncio.gather(*(flights.do("key", fetch) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert [result for result, _ in results] == ["image"] * 5
+    assert [joined for _, joined in results] == [False, True, True, True, True]
+    assert len(calls) == 1
+    assert flights.report()["coalesced"] == 4 and flights.report()["in_flight"] == 0
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    """Test that a failed execution raises in every caller that joined it, and the next call retries."""
+    flights = SingleFlight()
+    attempts = []
+
+    async def fetch():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise IOError("node unavailable")
+        return "image"
+
+    async def main():
+        failed = await asyncio.gather(*(flights.do("key", fetch) for _ in range(3)), return_exceptions=True)
+        return failed, await flights.do("key", fetch)
+
+    failed, retried = asyncio.run(main())
+    assert all(isinstance(error, IOError) for error in failed)
+    assert retried == ("image", False)
+    assert len(attempts) == 2
+
+
+def test_caller_giving_up_does_not_cancel_the_others():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "image"
+
+    async def main():
+        impatient = asyncio.create_task(flights.do("key", fetch))
+        patient = asyncio.create_task(flights.do("key", fetch))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(main()) == ("image", True)
@@ -0,0 +1,59 @@
+import asyncio
+import importlib.util
+import os
+from urllib.parse import parse_qs, urlsplit
+from src.core import batch, signing
+from tests.test_batch import read_frames, stream
+
+
+def load_node_module(name: str):
+    """One of the nodes' app.core modules, loaded from their tree: both sides of the wire must agree."""
+    path = os.path.join(os.path.dirname(__file__), "..", "..", "dynamo_node", "app", "core", f"{name}.py")
+    spec = importlib.util.spec_from_file_location(f"node_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+node_batch = load_node_module("batch")
+node_signing = load_node_module("signing")
+
+
+def test_batch_frames_match_the_nodes():
+    """Test that frames encode byte for byte as on the nodes, and decode the same way on both sides."""
+    assert (batch.BATCH_MEDIA_TYPE, batch.FRAME_HEADER.format, batch.FOUND, batch.NOT_FOUND) == (
+        node_batch.BATCH_MEDIA_TYPE, node_batch.FRAME_HEADER.format, node_batch.FOUND, node_batch.NOT_FOUND,
+    )
+    sent = [("a" * 64, batch.FOUND, os.urandom(1000)), ("clé", batch.NOT_FOUND, b""), ("", batch.FOUND, b"x")]
+    for key, status, body in sent:
+        assert batch.frame_header(key, status, len(body)) == node_batch.frame_header(key, status, len(body))
+
+    from_node = b"".join(node_batch.frame_header(key, status, len(body)) + body for key, status, body in sent)
+    from_panel = b"".join(batch.frame_header(key, status, len(body)) + body for key, status, body in sent)
+
+    async def main():
+        return await read_frames(stream(from_node))
+
+    assert asyncio.run(main()) == sent
+    assert list(node_batch.parse_frames(from_panel)) == sent
+
+
+def test_signed_urls_verify_on_the_nodes():
+    """Test that URLs signed by the control panel pass the nodes' check, for their own request only."""
+    url = signing.signed_url("secret", "http://node:9090", "POST", "/upload", 60, key="k", username="alice")
+    parts = urlsplit(url)
+    query = {name: values[0] for name, values in parse_qs(parts.query).items()}
+    expires, sig = int(query["expires"]), query["sig"]
+
+    assert parts.path == "/upload"
+    assert node_signing.verify("secret", "POST", "/upload", expires, sig, key="k", username="alice")
+    assert not node_signing.verify("secret", "POST", "/upload", expires, sig, key="k", username="bob")
+    assert not node_signing.verify("other", "POST", "/upload", expires, sig, key="k", username="alice")
+    assert signing.signature("s", "get", "/fetch/k", 1, a="1") == node_signing.signature("s", "GET", "/fetch/k", 1, a="1")
+
+
+def test_cluster_headers_are_accepted_by_the_nodes():
+    """Test that the control panel presents the cluster secret where the nodes look for it."""
+    headers = signing.cluster_headers("secret")
+    assert node_signing.is_cluster_request("secret", headers.get(node_signing.CLUSTER_SECRET_HEADER))
+    assert signing.cluster_headers("") == node_signing.cluster_headers("") == {}
@@ -0,0 +1,61 @@
+import asyncio
+import itertools
+import os
+import time
+
+import sys
+app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../..")
+sys.path.append(app_path)
+
+from app.core.erasure import ReedSolomon
+
+OBJECT_SIZE = 16 * 1024 * 1024
+FRAGMENT_LATENCY = 0.005  # Simulated network round-trip per fragment fetch (seconds)
+RUNS = 3
+
+
+async def degraded_read(codec: ReedSolomon, fragments, lost):
+    """Fetches the surviving fragments in parallel (simulated latency) and decodes from the first k."""
+    async def _fetch(index):
+        await asyncio.sleep(FRAGMENT_LATENCY)
+        return index, fragments[index]
+
+    available = {}
+    tasks = [asyncio.create_task(_fetch(i)) for i in range(len(fragments)) if i not in lost]
+    for next_done in asyncio.as_completed(tasks):
+        index, fragment = await next_done
+        available[index] = fragment
+        if len(available) == codec.k:
+            break
+    for task in tasks:
+        task.cancel()
+    return await asyncio.to_thread(codec.decode, available)
+
+
+async def benchmark_erasure_coding():
+    """Benchmarks encode, healthy reads and degraded reads, and compares storage overhead."""
+    data = os.urandom(OBJECT_SIZE)
+    mib = OBJECT_SIZE / (1024 * 1024)
+    for k, m in ((4, 2), (6, 3), (10, 4)):
+        codec = ReedSolomon(k, m)
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            fragments = codec.encode(data)
+        encode = (time.perf_counter() - start) / RUNS
+        stored = sum(len(f) for f in fragments)
+        print(f"\nRS {k}+{m}: {stored / OBJECT_SIZE:.2f}x storage (3-way replication: 3.00x), "
+              f"encode {mib / encode:.0f} MiB/s")
+
+        for lost_count in range(m + 1):
+            # Worst case: lose data fragments, so every read needs reconstruction
+            lost = set(itertools.islice(range(k), lost_count))
+            start = time.perf_counter()
+            for _ in range(RUNS):
+                assert await degraded_read(codec, fragments, lost) == data
+            elapsed = (time.perf_counter() - start) / RUNS
+            print(f"  read with {lost_count} lost fragment(s): {elapsed * 1000:7.1f} ms ({mib / elapsed:.0f} MiB/s)")
+
+
+# Run the benchmark
+if __name__ == "__main__":
+    asyncio.run(benchmark_erasure_coding())
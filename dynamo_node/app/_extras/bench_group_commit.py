@@ -0,0 +1,73 @@
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import aiofiles
+
+import sys
+app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../..")
+sys.path.append(app_path)
+
+from app.core.durability import GroupCommitter
+
+NUM_WRITES = 2000
+CONCURRENCY = 64
+PAYLOAD = os.urandom(64 * 1024)
+
+
+class FsyncPerRequest(GroupCommitter):
+    """Baseline: every write pays for its own fsync."""
+
+    async def sync(self, *paths: str):
+        await asyncio.to_thread(self._fsync_all, set(paths))
+        self.stats["batches"] += 1
+        self.stats["writes"] += 1
+
+
+async def run_writes(committer: GroupCommitter, store_dir: str):
+    """Issues NUM_WRITES uploads, CONCURRENCY at a time, and returns (throughput, latencies)."""
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def _write(i):
+        async with semaphore:
+            start = time.perf_counter()
+            path = os.path.join(store_dir, f"blob{i}")
+            async with aiofiles.open(path, "wb") as f:
+                await f.write(PAYLOAD)
+            await committer.sync(path)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_write(i) for i in range(NUM_WRITES)))
+    elapsed = time.perf_counter() - start
+    return NUM_WRITES / elapsed, latencies
+
+
+def benchmark_group_commit():
+    """Compares no fsync, fsync per request, and group commit at several window sizes."""
+    configs = [
+        ("no fsync", GroupCommitter(enabled=False)),
+        ("fsync per request", FsyncPerRequest()),
+    ] + [
+        (f"group commit {window} ms", GroupCommitter(window_ms=window, max_batch=CONCURRENCY))
+        for window in (0.5, 1, 2, 5, 10)
+    ]
+
+    print(f"{NUM_WRITES} writes of {len(PAYLOAD) // 1024} KiB, concurrency {CONCURRENCY}\n")
+    print(f"{'mode':<24}{'writes/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'avg batch':>11}")
+    for name, committer in configs:
+        with tempfile.TemporaryDirectory() as store_dir:
+            throughput, latencies = asyncio.run(run_writes(committer, store_dir))
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+        avg_batch = committer.export_stats()["avg_batch_size"]
+        print(f"{name:<24}{throughput:>10.0f}{p50:>10.2f}{p99:>10.2f}{avg_batch:>11.1f}")
+
+
+# Run the benchmark
+if __name__ == "__main__":
+    benchmark_group_commit()
@@ -1,15 +1,27 @@
 import asyncio
+import hashlib
+import io
 import os
-from typing import Dict
+import time
+from typing import Dict, List, Optional, Tuple
 import aiofiles
-import httpx
 from pydantic import BaseModel
-from fastapi import APIRouter, Body, Form, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse, RedirectResponse
+from fastapi import APIRouter, Body, Depends, Form, File, UploadFile, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
+from app.core.config import (
+    EC_DATA_FRAGMENTS, EC_PARITY_FRAGMENTS, RING_WATCH_MAX_SECONDS, URL_SIGNING_SECRET, REBALANCE_PARALLELISM,
+    FETCH_BATCH_MAX_KEYS, FETCH_BATCH_PIECE_SIZE, CLUSTER_SECRET,
+)
+from app.core.batch import BATCH_MEDIA_TYPE, FOUND, NOT_FOUND, frame_header
+from app.core.erasure import (
+    MARKER_SIZE, MAX_FRAGMENTS, ReedSolomon, build_marker, fragment_key, is_fragment_key, parse_fragment_key,
+    read_marker,
+)
+from app.core.signing import CLUSTER_SECRET_HEADER, is_cluster_request, verify
 from app.core.state import ns
-from app.core.file_ops import save_file, get_valid_file_path
+from app.core.file_ops import save_file, release_file, get_valid_file_path
 from app.core.logger import logger
-from httpx import AsyncClient
+import aiohttp
 
 
 router = APIRouter()
@@ -20,19 +32,61 @@ async def redirect_to_docs():
     return RedirectResponse(url="/docs")
 
 
+def _from_cluster(request: Request) -> bool:
+    return is_cluster_request(CLUSTER_SECRET, request.headers.get(CLUSTER_SECRET_HEADER))
+
+
+def require_cluster(request: Request):
+    """
+    Dependency of the endpoints only the control panel and the other nodes may call: the request
+    must carry the cluster secret.
+    """
+    if not _from_cluster(request):
+        raise HTTPException(status_code=403, detail="Cluster credentials required")
+
+
+def _check_signature(
+    request: Request, method: str, path: str, expires: Optional[int], sig: Optional[str], **params: str,
+):
+    """
+    Requests must either come from inside the cluster (carrying the cluster secret) or be made with
+    a signed URL handed to a client by the control panel, whose signature must be valid and unexpired.
+    """
+    if not _from_cluster(request) and not verify(URL_SIGNING_SECRET, method, path, expires, sig, **params):
+        raise HTTPException(status_code=403, detail="Invalid or expired signature")
+
+
 @router.post("/upload")
 async def upload_image_with_hash(
+    request: Request,
     username: str = Form(...),
     key: str = Form(...),
     file: UploadFile = File(...),
+    expires: Optional[int] = Query(None),
+    sig: Optional[str] = Query(None),
 ):
     """
-    Endpoint to upload an image and store its hash-to-filename mapping.
+    Endpoint to upload an image and store its hash-to-blob mapping.
+    Identical bytes are stored once, whatever key or user they are uploaded under (the backend
+    encrypts every upload anew, so this covers the same ciphertext sent again, e.g. a retry).
+    A signed URL (`expires`, `sig`) only allows uploading its own key and username.
     """
+    _check_signature(request, "POST", "/upload", expires, sig, key=key, username=username)
+
+    previous = ns.manager.get_value(key)
+    digest = await save_file(file, key, username)
+    added, _ = ns.manager.add_key_value(key, (username, digest))
+    if not added:
+        # Not responsible for the key: drop the reference just taken, unless a copy of the key
+        # (e.g. a replica not yet handed over) already held it
+        if previous != (username, digest):
+            ns.blobs.release(digest, key, username)
+    else:
+        if previous and previous != (username, digest):
+            ns.blobs.release(previous[1], key, previous[0])
+        # In durable mode, only acknowledge once the blob and index entry are on disk
+        await ns.commit(ns.blobs.path_for(digest))
 
-    file_path = await save_file(file)
-    ns.manager.add_key_value(key, (username, file_path))
-    
     # log the current total keys
     logger.info(f"Total keys: {len(ns.manager.kv_storage.store)}")
 
@@ -44,27 +98,389 @@ async def upload_image_with_hash(
     }
 
 
+@router.delete("/delete/{key}", dependencies=[Depends(require_cluster)])
+async def delete_image(key: str):
+    """
+    Endpoint to delete a key, along with any erasure coded fragments of it stored on this node.
+    Blobs are garbage collected once no other key references them.
+    """
+    keys = [key] + [fragment_key(key, index) for index in range(MAX_FRAGMENTS)]
+    deleted = [k for k in keys if ns.manager.get_value(k)]
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Hash not found")
+    for k in deleted:
+        release_file(k)
+        ns.manager.remove_key(k)
+    await ns.commit()
+
+    return {"message": "Key deleted successfully", "key": key, "keys_deleted": len(deleted)}
+
+
+@router.get("/stats/durability")
+async def durability_stats():
+    """
+    Endpoint to report group commit statistics (batches, fsyncs, average batch size).
+    """
+    return ns.committer.export_stats()
+
+
+@router.get("/stats/dedup")
+async def dedup_stats():
+    """
+    Endpoint to report deduplication savings (logical vs physical bytes) from identical blobs: the
+    same ciphertext stored again, not the same picture encrypted anew (see app.core.blobstore).
+    """
+    return ns.blobs.report()
+
+
+@router.get("/stats/tiers")
+async def tier_stats():
+    """
+    Endpoint to report hot/cold tier occupancy, hot tier hit rate and migration throughput.
+    """
+    return ns.blobs.tier_report()
+
+
+def _ring_etag() -> str:
+    """Entity tag of the ring: its version plus a digest of its membership."""
+    ring = ns.manager.hash_ring
+    members = ",".join(f"{node}:{len(vnodes)}" for node, vnodes in sorted(ring.physical_to_virtual.items()))
+    return f'"{ring.version}-{hashlib.sha256(members.encode()).hexdigest()[:16]}"'
+
+
+@router.get("/stats/coalescing")
+async def coalescing_stats():
+    """
+    Endpoint to report how many erasure coded reads were served by another request's in-flight read.
+    """
+    return ns.ec_reads.report()
+
+
+@router.get("/stats/health")
+async def health_stats():
+    """
+    Endpoint to report the circuit breakers of the other nodes.
+    """
+    return {"nodes": ns.health.report()}
+
+
+@router.get("/get_ring")
+async def get_ring(request: Request, wait: float = Query(0, ge=0, le=RING_WATCH_MAX_SECONDS)):
+    """
+    Endpoint to get this node's view of the ring, used by the control panel for client-side routing.
+    Returns the version, the physical nodes with their weights (virtual node counts), the token table
+    and the node addresses.
+
+    The response carries an ETag: a request whose If-None-Match matches gets a 304 instead of the ring.
+    With `wait`, such a request is held (long-poll) until the ring changes or `wait` seconds elapse.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if wait and if_none_match == _ring_etag():
+        try:
+            await asyncio.wait_for(ns.ring_changed.wait(), timeout=wait)
+        except asyncio.TimeoutError:
+            pass
+
+    etag = _ring_etag()
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(
+        {
+            **ns.manager.export_ring(),
+            **ns.manager.hash_ring.export_tokens(),
+            "replicas": ns.manager.hash_ring.replicas,
+            "nodes": {
+                node_id: {"ip": ip, "port": port} for node_id, (ip, port) in (ns.ring_nodes or {}).items()
+            },
+        },
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
 @router.get("/fetch/{key}")
 async def fetch_image_by_hash(
+    request: Request,
     key: str,
     # key: str = Path(..., regex="^[a-fA-F0-9]{64}$")  # Ensures 64 hex characters
+    expires: Optional[int] = Query(None),
+    sig: Optional[str] = Query(None),
 ):
     """
-    Endpoint to fetch an image using its hash.
+    Endpoint to fetch an image using its hash. Erasure coded images are rebuilt from their fragments.
+    Also serves signed URLs (`expires`, `sig`) handed to clients by the control panel.
     """
+    _check_signature(request, "GET", f"/fetch/{key}", expires, sig)
     try:
-        file_path = get_valid_file_path(key)
+        file_path = await get_valid_file_path(key)
     except HTTPException as e:
         raise e
 
+    codec = await _erasure_code_of(file_path)
+    if codec:
+        return Response(content=await _fetch_erasure_coded(key, codec), media_type="image/jpeg")
+
     # Return the file directly as a response
     return FileResponse(
         file_path, media_type="image/jpeg", filename=os.path.basename(file_path)
     )
 
 
+class KeyBatch(BaseModel):
+    keys: List[str]
+
+
+@router.post("/fetch_batch", dependencies=[Depends(require_cluster)])
+async def fetch_batch(batch: KeyBatch):
+    """
+    Endpoint to fetch several images in one request (e.g. a gallery page).
+    Streams one frame per key, in request order (see app.core.batch); keys this node does not
+    hold (or whose erasure coded image cannot be rebuilt) get an empty NOT_FOUND frame, so the
+    caller can look for them elsewhere.
+    """
+    if len(batch.keys) > FETCH_BATCH_MAX_KEYS:
+        raise HTTPException(status_code=400, detail=f"At most {FETCH_BATCH_MAX_KEYS} keys per batch")
+
+    async def _frames():
+        for key in batch.keys:
+            try:
+                file_path = await get_valid_file_path(key)
+                size = os.path.getsize(file_path)
+                blob = await aiofiles.open(file_path, "rb")
+            except (HTTPException, FileNotFoundError):
+                yield frame_header(key, NOT_FOUND)
+                continue
+            if size == MARKER_SIZE and (codec := await _erasure_code_of(file_path)):
+                await blob.close()
+                try:
+                    data = await _fetch_erasure_coded(key, codec)
+                except HTTPException:
+                    yield frame_header(key, NOT_FOUND)
+                    continue
+                yield frame_header(key, FOUND, len(data))
+                yield data
+                continue
+            try:
+                yield frame_header(key, FOUND, size)
+                remaining = size
+                while remaining:
+                    piece = await blob.read(min(FETCH_BATCH_PIECE_SIZE, remaining))
+                    if not piece:  # Cannot happen to an immutable blob; never desynchronize the stream
+                        raise IOError(f"Blob of key {key} is shorter than {size} bytes")
+                    remaining -= len(piece)
+                    yield piece
+            finally:
+                await blob.close()
+
+    return StreamingResponse(_frames(), media_type=BATCH_MEDIA_TYPE)
+
+
+
+async def _store_fragment(username: str, key: str, file) -> str:
+    """
+    Stores an erasure coded fragment on this node. Fragments are placed by the coordinator,
+    not by the ring, so there is no ownership check.
+    """
+    digest = await save_file(file, key, username)
+    previous = ns.manager.get_value(key)
+    if previous and previous != (username, digest):
+        ns.blobs.release(previous[1], key, previous[0])
+    ns.manager.kv_storage.add(key, (username, digest))
+    await ns.commit(ns.blobs.path_for(digest))
+    return digest
+
+
+async def _put_fragment(node_id: str, username: str, key: str, fragment: bytes) -> bool:
+    try:
+        if node_id == ns.node_id:
+            await _store_fragment(username, key, UploadFile(file=io.BytesIO(fragment), filename=key))
+            return True
+        connection = ns.connector.get_connection(node_id)
+        if connection is None:
+            logger.error(f"No connection to node {node_id} for fragment {key}")
+            return False
+        reachable = False
+        try:
+            form = aiohttp.FormData()
+            form.add_field("username", username)
+            form.add_field("key", key)
+            form.add_field("file", fragment, filename=key, content_type="application/octet-stream")
+            async with connection.post("/ec/fragment", data=form) as response:
+                reachable = response.status < 500
+                return response.status == 200
+        finally:
+            ns.connector.record(node_id, reachable)
+    except Exception as e:
+        logger.error(f"Failed to store fragment {key} on node {node_id}: {e}")
+        return False
+
+
+async def _get_fragment(node_id: str, key: str) -> Optional[bytes]:
+    try:
+        if node_id == ns.node_id:
+            async with aiofiles.open(await get_valid_file_path(key), "rb") as f:
+                return await f.read()
+        connection = ns.connector.get_connection(node_id)
+        if connection is None:
+            return None
+        reachable = False
+        start = time.monotonic()
+        try:
+            async with connection.get(f"/fetch/{key}") as response:
+                reachable = response.status < 500
+                if response.status == 200:
+                    return await response.read()
+                return None
+        finally:
+            ns.connector.record(node_id, reachable, time.monotonic() - start)
+    except Exception as e:
+        logger.info(f"Fragment {key} unavailable on node {node_id}: {e}")
+        return None
+
+
+def _fragment_placement(key: str, fragments: int) -> List[str]:
+    """The node of each fragment of an erasure coded key: the fragments go round its preference list."""
+    targets = ns.manager.hash_ring.get_all_nodes(key, count=fragments)
+    return [targets[index % len(targets)] for index in range(fragments)] if targets else []
 
-@router.post("/invite_node")
+
+async def _gather_fragments(key: str, placements: Dict[int, List[str]], k: int) -> Dict[int, bytes]:
+    """
+    Fetches fragments in parallel and returns as soon as k of them arrived.
+
+    Args:
+        placements: fragment index -> candidate nodes, tried in order.
+    """
+    async def _fetch(index: int):
+        for node_id in placements[index]:
+            fragment = await _get_fragment(node_id, fragment_key(key, index))
+            if fragment is not None:
+                return index, fragment
+        return index, None
+
+    fragments: Dict[int, bytes] = {}
+    tasks = [asyncio.create_task(_fetch(index)) for index in placements]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, fragment = await next_done
+            if fragment is not None:
+                fragments[index] = fragment
+                if len(fragments) == k:
+                    break
+    finally:
+        for task in tasks:
+            task.cancel()
+    return fragments
+
+
+@router.post("/ec/fragment", dependencies=[Depends(require_cluster)])
+async def store_fragment(
+    username: str = Form(...),
+    key: str = Form(...),
+    file: UploadFile = File(...),
+):
+    """
+    Sent by an erasure coding coordinator to store one fragment of an object on this node.
+    """
+    await _store_fragment(username, key, file)
+    return {"message": "Fragment stored successfully", "key": key}
+
+
+@router.post("/ec/upload", dependencies=[Depends(require_cluster)])
+async def upload_erasure_coded(
+    username: str = Form(...),
+    key: str = Form(...),
+    file: UploadFile = File(...),
+    k: int = Form(EC_DATA_FRAGMENTS),
+    m: int = Form(EC_PARITY_FRAGMENTS),
+):
+    """
+    Endpoint to store an image with Reed-Solomon erasure coding instead of N-way replication.
+    This node acts as coordinator: it encodes the image into k + m fragments and places them on
+    distinct physical nodes taken from the key's preference list. The key itself then holds a
+    marker naming the code, on the key's usual replicas, so /fetch knows to gather and decode.
+    """
+    try:
+        codec = ReedSolomon(k, m)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    data = await file.read()
+    fragments = await asyncio.to_thread(codec.encode, data)
+    placement = _fragment_placement(key, k + m)
+    if len(set(placement)) < k + m:
+        logger.warning(f"Only {len(set(placement))} nodes for {k + m} fragments of key {key}; some nodes hold several")
+
+    results = await asyncio.gather(*(
+        _put_fragment(node_id, username, fragment_key(key, index), fragment)
+        for index, (node_id, fragment) in enumerate(zip(placement, fragments))
+    ))
+    stored = sum(results)
+    if stored < k:
+        raise HTTPException(status_code=500, detail=f"Only {stored}/{k + m} fragments stored for key {key}")
+    if stored < k + m:
+        logger.warning(f"Key {key} stored with {stored}/{k + m} fragments")
+    marker = build_marker(codec)
+    owners = ns.manager.hash_ring.get_all_nodes(key)
+    if not any(await asyncio.gather(*(_put_fragment(node_id, username, key, marker) for node_id in owners))):
+        raise HTTPException(status_code=500, detail=f"Erasure coding marker of key {key} not stored")
+
+    return {
+        "message": "File uploaded successfully",
+        "filename": file.filename,
+        "key": key,
+        "username": username,
+        "fragments_stored": stored,
+    }
+
+
+async def _read_erasure_coded(key: str, codec: ReedSolomon) -> bytes:
+    k, m = codec.k, codec.m
+    placement = _fragment_placement(key, k + m)
+    if not placement:
+        raise HTTPException(status_code=404, detail="Hash not found")
+    fragments = await _gather_fragments(key, {index: [node_id] for index, node_id in enumerate(placement)}, k)
+
+    if len(fragments) < k:
+        # Fragments may not have been moved yet since the ring changed: look for the missing ones on every node
+        all_nodes = list(ns.ring_nodes or {ns.node_id: None})
+        missing = {index: all_nodes for index in range(k + m) if index not in fragments}
+        fragments.update(await _gather_fragments(key, missing, k - len(fragments)))
+    if len(fragments) < k:
+        raise HTTPException(status_code=404, detail=f"Only {len(fragments)}/{k} fragments found for key {key}")
+
+    return await asyncio.to_thread(codec.decode, fragments)
+
+
+async def _erasure_code_of(file_path: str) -> Optional[ReedSolomon]:
+    """The code of an erasure coded image, given the blob stored under its key; None for plain images."""
+    if os.path.getsize(file_path) != MARKER_SIZE:
+        return None
+    async with aiofiles.open(file_path, "rb") as f:
+        return read_marker(await f.read())
+
+
+async def _fetch_erasure_coded(key: str, codec: ReedSolomon) -> bytes:
+    """Concurrent reads of the same key share one fragment gathering and decoding."""
+    data, _ = await ns.ec_reads.do((key, codec.k, codec.m), lambda: _read_erasure_coded(key, codec))
+    return data
+
+
+@router.get("/ec/fetch/{key}", dependencies=[Depends(require_cluster)])
+async def fetch_erasure_coded(key: str, k: int = EC_DATA_FRAGMENTS, m: int = EC_PARITY_FRAGMENTS):
+    """
+    Endpoint to fetch an erasure coded image. Fragments are fetched in parallel and the image
+    is rebuilt from the first k to arrive, so up to m unavailable fragments are tolerated.
+    Concurrent fetches of the same key share one fragment gathering and decoding.
+    """
+    try:
+        codec = ReedSolomon(k, m)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return Response(content=await _fetch_erasure_coded(key, codec), media_type="image/jpeg")
+
+
+@router.post("/invite_node", dependencies=[Depends(require_cluster)])
 async def invite_node(payload: dict = Body(...)):
     """
     Sent by control panel to an existing node, signaling it to add the new node to its ring.
@@ -84,24 +500,72 @@ async def invite_node(payload: dict = Body(...)):
 
         node_mapping_json["nodes"][node_id] = {"ip": ip, "port": port}
         
-        ring_metadata_json = {"physical_nodes": ns.manager.export_ring()["physical_nodes"]}
+        ring_metadata_json = ns.manager.export_ring()
         target_url = f"http://{ip}:{port}/join_ring"
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                target_url,
-                json={ "node_data": node_mapping_json, "ring_metadata": ring_metadata_json},
-            )
-        
-        if response.status_code != 200:
-            raise HTTPException( status_code=500, detail=f"Failed to send ring data to the new node. Response: {response.text}")
+
+        async with ns.http.client.post(
+            target_url,
+            json={ "node_data": node_mapping_json, "ring_metadata": ring_metadata_json},
+        ) as response:
+            if response.status != 200:
+                raise HTTPException( status_code=500, detail=f"Failed to send ring data to the new node. Response: {await response.text()}")
         return {"message": "Ring data successfully sent to the new node."}
-    
-    except httpx.RequestError as exc:
+
+    except aiohttp.ClientError as exc:
         raise HTTPException( status_code=500, detail=f"An error occurred while sending data to the node: {exc}")
 
 
-@router.post("/ring_transfer")
+async def _transfer_key(node_url: str, key: str) -> bool:
+    """Uploads a local key (and its blob) to another node. Returns True once that node stored it."""
+    username, digest = ns.manager.get_value(key)
+    file_path = await ns.blobs.open_for_read(digest)
+    if not os.path.exists(file_path):
+        return False
+    async with aiofiles.open(file_path, "rb") as file:
+        file_data = await file.read()
+    form = aiohttp.FormData()
+    form.add_field("key", key)
+    form.add_field("username", username)
+    form.add_field("file", file_data, filename=os.path.basename(file_path), content_type="image/jpeg")
+    async with ns.http.client.post(f"{node_url}/upload", data=form) as response:
+        return response.status == 200
+
+
+async def _move_fragments() -> Tuple[int, int]:
+    """
+    Sends the local erasure coded fragments to the node the current ring places them on (see
+    `_fragment_placement`), REBALANCE_PARALLELISM at a time, dropping each once it is stored there.
+    Returns how many fragments moved and how many could not be sent.
+    """
+    in_flight = asyncio.Semaphore(REBALANCE_PARALLELISM)
+
+    async def _move(key: str) -> Optional[bool]:
+        async with in_flight:
+            try:
+                username, digest = ns.manager.get_value(key)
+                async with aiofiles.open(await ns.blobs.open_for_read(digest), "rb") as f:
+                    fragment = await f.read()
+                header = ReedSolomon.read_header(fragment)
+                base, index = parse_fragment_key(key)
+                placement = _fragment_placement(base, header["k"] + header["m"])
+                if not placement or placement[index] == ns.node_id:
+                    return None
+                if not await _put_fragment(placement[index], username, key, fragment):
+                    return False
+            except Exception as e:
+                logger.error(f"Failed to move fragment {key}: {e}")
+                return False
+            release_file(key)
+            ns.manager.remove_key(key)
+            return True
+
+    results = await asyncio.gather(*[
+        _move(key) for key in ns.manager.list_local_keys() if is_fragment_key(key)
+    ])
+    return results.count(True), results.count(False)
+
+
+@router.post("/ring_transfer", dependencies=[Depends(require_cluster)])
 async def ring_transfer(payload: dict = Body(...)):
     """
     Sent by a new node instance, signalling everyone to add it to their ring.
@@ -112,30 +576,21 @@ async def ring_transfer(payload: dict = Body(...)):
     port = payload["port"]
     try:
         await ns.connector.add_node(node_id, ip, port)
+        ns.ring_nodes[node_id] = (ip, port)
 
-        # Get keys to transfer
-        transfer_keys = ns.manager.add_node(node_id)
+        # Get keys to transfer (erasure coded fragments are placed by index, not by their own hash)
+        transfer_keys = [key for key in ns.manager.add_node(node_id) if not is_fragment_key(key)]
+        ns.notify_ring_changed()
         logger.info(f"Transferring keys to node {node_id}: {len(transfer_keys)} keys")
 
-        async with AsyncClient() as client:
-            for key in transfer_keys:
-                username, file_path = ns.manager.get_value(key)
-                if not file_path:
-                    continue  # Skip if file not found
-                async with aiofiles.open(file_path, "rb") as file:
-                    file_data = await file.read()
-                    response = await client.post(
-                        f"http://{ip}:{port}/upload",
-                        data={"key": key, "username": username},
-                        files={
-                            "file": ( os.path.basename(file_path), file_data, "image/jpeg",)
-                        },
-                    )
-                    if response.status_code != 200:
-                        logger.error( f"Failed to transfer key {key} to node {node_id}")
-                    else:  # Remove the file if transfer was successful
-                        os.remove(file_path)
-                        ns.manager.remove_key(key)
+        for key in transfer_keys:
+            if not await _transfer_key(f"http://{ip}:{port}", key):
+                logger.error( f"Failed to transfer key {key} to node {node_id}")
+            else:  # Release the blob if transfer was successful
+                release_file(key)
+                ns.manager.remove_key(key)
+        moved, failed = await _move_fragments()
+        logger.info(f"Moved {moved} erasure coded fragments, {failed} failed")
 
         return {
             "status": "success",
@@ -159,9 +614,10 @@ class NodeMapping(BaseModel):
 
 class RingMetadata(BaseModel):
     physical_nodes: Dict[str, int]
+    version: int = 0
 
 
-@router.post("/join_ring")
+@router.post("/join_ring", dependencies=[Depends(require_cluster)])
 async def join_ring(node_data: NodeMapping, ring_metadata: RingMetadata):
     """
     Endpoint to join an existing ring.
@@ -171,11 +627,15 @@ async def join_ring(node_data: NodeMapping, ring_metadata: RingMetadata):
     logger.info(f"Received ring metadata: {ring_metadata.dict()}")
     # Update logic goes here (e.g., modify shared state, notify other nodes, etc.)
     # For now, just update the hash ring
-    ns.manager.reconstruct(ring_metadata.dict(), ns.node_id)
+    manager = ns.manager.reconstruct(ring_metadata.dict(), ns.node_id, journal=ns.journal)
+    manager.kv_storage = ns.manager.kv_storage  # Keep the keys already stored locally
+    manager.hash_ring.add_node(ns.node_id)  # The inviting node's ring does not include us yet
+    ns.manager = manager
+    ns.notify_ring_changed()
     node_dict = {
         node_id: (node.ip, node.port) for node_id, node in node_data.nodes.items()
     }
-    ns.initialize_connections(node_dict)
+    await ns.initialize_connections(node_dict)
     logger.info(f"Updated ring state with new node data: {ns.ring_nodes}")
 
     # call ring transfer for all nodes except myself. asyncrhonousely
@@ -185,26 +645,99 @@ async def join_ring(node_data: NodeMapping, ring_metadata: RingMetadata):
     my_node_id = ns.node_id
     my_ip, my_port = ns.ring_nodes[my_node_id]
 
-    async with httpx.AsyncClient() as client:
-        for node_id, (ip, port) in ns.ring_nodes.items():
-            if node_id == my_node_id:
-                continue  # Skip sending to self
+    async def _ring_transfer(url: str, payload: dict):
+        async with ns.http.client.post(url, json=payload) as response:
+            return response.status, await response.text()
+
+    node_ids = []
+    for node_id, (ip, port) in ns.ring_nodes.items():
+        if node_id == my_node_id:
+            continue  # Skip sending to self
+
+        url = f"http://{ip}:{port}/ring_transfer"
+        payload = { "node_id": my_node_id, "ip": my_ip, "port": my_port, }
+
+        node_ids.append(node_id)
+        tasks.append(_ring_transfer(url, payload))
+
+    responses = await asyncio.gather(*tasks, return_exceptions=True)
 
-            url = f"http://{ip}:{port}/ring_transfer"
-            payload = { "node_id": my_node_id, "ip": my_ip, "port": my_port, }
+    for node_id, response in zip(node_ids, responses):
+        if isinstance(response, Exception):
+            logger.info(f"Error contacting node {node_id}: {response}")
+        else:
+            status, text = response
+            logger.info(f"Response from node {node_id}: {status}")
+            # also log the message
+            logger.info(f"Response message from node {node_id}: {text}")
 
-            tasks.append(client.post(url, json=payload))
+    return {"status": "success", "message": "Joined the ring successfully."}
 
-        responses = await asyncio.gather(*tasks, return_exceptions=True)
 
-        for node_id, response in zip(ns.ring_nodes.keys(), responses):
-            if node_id == my_node_id:
-                continue  # Already skipped self
-            if isinstance(response, Exception):
-                logger.info(f"Error contacting node {node_id}: {response}")
-            else:
-                logger.info(f"Response from node {node_id}: {response.status_code}")
-                # also log the message
-                logger.info(f"Response message from node {node_id}: {response.text}")
+class RingInstall(BaseModel):
+    node_data: NodeMapping
+    ring_metadata: RingMetadata
+    new_nodes: List[str]
 
-        return {"status": "success", "message": "Joined the ring successfully."}
+
+@router.post("/ring/install", dependencies=[Depends(require_cluster)])
+async def install_ring(ring_install: RingInstall):
+    """
+    Phase 1 of a batch scale-out, sent by the control panel to every node, old and new.
+    Installs the final ring (the current ring plus all the new nodes) and connects to every node,
+    without moving any key yet. Returns the installed ring metadata, identical on every node.
+    """
+    manager = ns.manager.reconstruct(ring_install.ring_metadata.dict(), ns.node_id, journal=ns.journal)
+    manager.kv_storage = ns.manager.kv_storage  # Keep the keys already stored locally
+    for node_id in ring_install.new_nodes:
+        manager.hash_ring.add_node(node_id)
+    manager.nodes = list(set(manager.nodes) | set(ring_install.new_nodes))
+    ns.manager = manager
+    ns.notify_ring_changed()
+    await ns.initialize_connections({
+        node_id: (node.ip, node.port) for node_id, node in ring_install.node_data.nodes.items()
+    })
+    logger.info(f"Installed ring version {manager.hash_ring.version} with new nodes {ring_install.new_nodes}")
+    return manager.export_ring()
+
+
+@router.post("/ring/rebalance", dependencies=[Depends(require_cluster)])
+async def rebalance(previous_ring: RingMetadata = Body(..., embed=True)):
+    """
+    Phase 2 of a batch scale-out, sent by the control panel to every node that held keys before it.
+    Moves the local keys from the previous ring to the installed one following `plan_rebalance`
+    (each key sent once, REBALANCE_PARALLELISM transfers at a time), then drops the keys this node
+    is no longer responsible for, unless sending them failed. Erasure coded fragments follow the
+    placement of their object's key (see `_move_fragments`).
+    """
+    sends, drops = ns.manager.plan_rebalance(previous_ring.dict())
+    sends = {node_id: [key for key in keys if not is_fragment_key(key)] for node_id, keys in sends.items()}
+    in_flight = asyncio.Semaphore(REBALANCE_PARALLELISM)
+    failed = set()
+
+    async def _send(node_id: str, key: str) -> bool:
+        async with in_flight:
+            ip, port = ns.ring_nodes[node_id]
+            try:
+                if await _transfer_key(f"http://{ip}:{port}", key):
+                    return True
+            except Exception as e:
+                logger.error(f"Failed to transfer key {key} to node {node_id}: {e}")
+            failed.add(key)
+            return False
+
+    results = await asyncio.gather(*[_send(node_id, key) for node_id, keys in sends.items() for key in keys])
+    dropped = 0
+    for key in drops:
+        if key in failed or is_fragment_key(key):
+            continue
+        release_file(key)
+        ns.manager.remove_key(key)
+        dropped += 1
+    fragments_moved, fragments_failed = await _move_fragments()
+    logger.info(f"Rebalanced: {sum(results)} keys sent, {len(failed)} failed, {dropped} dropped, "
+                f"{fragments_moved} fragments moved, {fragments_failed} failed")
+    return {
+        "sent": sum(results), "failed": len(failed), "dropped": dropped,
+        "fragments_moved": fragments_moved, "fragments_failed": fragments_failed,
+    }
@@ -0,0 +1,26 @@
+import struct
+from typing import Iterator, Tuple
+
+# Batch reads (/fetch_batch) answer with a stream of frames, one per requested key: a header
+# (status, key length, body length), the key (UTF-8), then the body (empty unless FOUND).
+BATCH_MEDIA_TYPE = "application/x-dynamo-frames"
+FRAME_HEADER = struct.Struct(">BHQ")
+FOUND, NOT_FOUND = 0, 1
+
+
+def frame_header(key: str, status: int, size: int = 0) -> bytes:
+    """Header and key of a frame; `size` body bytes must follow it."""
+    encoded = key.encode()
+    return FRAME_HEADER.pack(status, len(encoded), size) + encoded
+
+
+def parse_frames(data: bytes) -> Iterator[Tuple[str, int, bytes]]:
+    """Splits a complete batch response into (key, status, body) frames."""
+    offset = 0
+    while offset < len(data):
+        status, key_length, size = FRAME_HEADER.unpack_from(data, offset)
+        offset += FRAME_HEADER.size
+        key = data[offset:offset + key_length].decode()
+        offset += key_length
+        yield key, status, data[offset:offset + size]
+        offset += size
@@ -0,0 +1,296 @@
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+import aiofiles
+from app.core.logger import logger
+
+CHUNK_SIZE = 1024 * 1024  # Uploads are hashed and written 1 MiB at a time
+COMPRESSION_PROBE_SIZE = 64 * 1024  # Blobs are only compressed in full if this much of them compresses
+
+
+class BlobStore:
+    """
+    Content-addressed blob storage with reference counting and optional hot/cold tiering.
+
+    - Each distinct content is stored once, in a file named after its SHA-256 digest. Images reach
+      the nodes encrypted by the backend with a random salt per upload, so the same picture
+      uploaded twice is two different blobs: what is shared is identical ciphertext, i.e. an
+      upload retried or sent again (re-puts, ring transfers).
+    - Every (key, username) mapping pointing at a blob holds one reference to it.
+    - A blob is garbage collected as soon as its last reference is released.
+    - With a cold directory, blobs can be demoted to it (zlib compressed, unless that does not
+      make them smaller, as for encrypted images); reading a cold blob transparently promotes
+      it back to the hot directory.
+    """
+
+    def __init__(self, store_dir: str, cold_dir: Optional[str] = None, compression_level: int = 6):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self.cold_dir = cold_dir
+        if cold_dir:
+            os.makedirs(cold_dir, exist_ok=True)
+        self.compression_level = compression_level
+        self.refs: Dict[str, Set[Tuple[str, str]]] = defaultdict(set)  # digest -> {(key, username)}
+        self.sizes: Dict[str, int] = {}  # digest -> blob size in bytes
+        self.cold: Set[str] = set()  # digests currently stored in the cold tier
+        self.cold_raw: Set[str] = set()  # cold digests stored uncompressed
+        self.last_access: Dict[str, float] = {}  # digest -> time of last write or read
+        self._promotions: Dict[str, asyncio.Future] = {}
+        self.stats = {
+            "hot_hits": 0, "cold_hits": 0,
+            "demotions": 0, "promotions": 0,
+            "migrated_bytes": 0, "migration_seconds": 0.0,
+        }
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.store_dir, digest)
+
+    def cold_path_for(self, digest: str, compressed: Optional[bool] = None) -> str:
+        """Path of the blob in the cold tier: `<digest>.z` if compressed, else `<digest>`."""
+        if compressed is None:
+            compressed = digest not in self.cold_raw
+        return os.path.join(self.cold_dir, f"{digest}.z" if compressed else digest)
+
+    async def put(self, file, key: str, username: str) -> str:
+        """
+        Stores an uploaded file (unless identical content is already stored) and
+        references it from (key, username).
+
+        Returns:
+            str: SHA-256 hex digest of the content.
+        """
+        digest_fn = hashlib.sha256()
+        size = 0
+        tmp_path = os.path.join(self.store_dir, f".tmp-{uuid.uuid4().hex}")
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                while chunk := await file.read(CHUNK_SIZE):
+                    digest_fn.update(chunk)
+                    size += len(chunk)
+                    await f.write(chunk)
+            digest = digest_fn.hexdigest()
+            if os.path.exists(self.path_for(digest)):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, self.path_for(digest))
+                if digest in self.cold:
+                    # Fresh upload of cold content: keep the hot copy only
+                    os.remove(self.cold_path_for(digest))
+                    self.cold.discard(digest)
+                    self.cold_raw.discard(digest)
+            self.sizes[digest] = size
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.last_access[digest] = time.time()
+        self.add_ref(digest, key, username)
+        return digest
+
+    def add_ref(self, digest: str, key: str, username: str):
+        self.refs[digest].add((key, username))
+
+    def release(self, digest: str, key: str, username: str) -> bool:
+        """
+        Drops the (key, username) reference to a blob.
+
+        Returns:
+            bool: True if this was the last reference and the blob was deleted.
+        """
+        refs = self.refs.get(digest)
+        if refs is None:
+            return False
+        refs.discard((key, username))
+        if refs:
+            return False
+        del self.refs[digest]
+        self.sizes.pop(digest, None)
+        self.last_access.pop(digest, None)
+        path = self.path_for(digest)
+        if digest in self.cold:
+            path = self.cold_path_for(digest)
+            self.cold.discard(digest)
+            self.cold_raw.discard(digest)
+        if os.path.exists(path):
+            os.remove(path)
+        logger.info(f"Garbage collected blob {digest}")
+        return True
+
+    async def open_for_read(self, digest: str) -> str:
+        """
+        Records a read of the blob and returns its hot path, promoting it from the cold tier first
+        if needed. Concurrent reads of the same cold blob share one promotion.
+        """
+        self.last_access[digest] = time.time()
+        if digest not in self.cold:
+            self.stats["hot_hits"] += 1
+            return self.path_for(digest)
+
+        self.stats["cold_hits"] += 1
+        promotion = self._promotions.get(digest)
+        if promotion is None:
+            promotion = self._promotions[digest] = asyncio.ensure_future(self._promote(digest))
+            promotion.add_done_callback(lambda _: self._promotions.pop(digest, None))
+        await asyncio.shield(promotion)
+        return self.path_for(digest)
+
+    async def _promote(self, digest: str):
+        start = time.perf_counter()
+        decompress = (lambda data: data) if digest in self.cold_raw else zlib.decompress
+        await asyncio.to_thread(self._move, self.cold_path_for(digest), self.path_for(digest), decompress)
+        self.cold.discard(digest)
+        self.cold_raw.discard(digest)
+        self._record_migration("promotions", digest, start)
+
+    async def demote(self, digest: str, accessed_at: float) -> bool:
+        """
+        Moves a hot blob to the cold tier, compressed if that makes it smaller (see `_compress`).
+        Skipped if the blob was accessed after `accessed_at` (it is in use again) or is already cold.
+
+        Returns:
+            bool: True if the blob was demoted.
+        """
+        if not self.cold_dir or digest in self.cold or digest not in self.sizes:
+            return False
+        start = time.perf_counter()
+        compressed = await asyncio.to_thread(self._write_cold, digest)
+        if self.last_access.get(digest, 0) > accessed_at or digest not in self.sizes:
+            # Read (or released) while being compressed: keep it hot
+            os.remove(self.cold_path_for(digest, compressed))
+            return False
+        if not compressed:
+            self.cold_raw.add(digest)
+        self.cold.add(digest)
+        os.remove(self.path_for(digest))
+        self._record_migration("demotions", digest, start)
+        return True
+
+    def _record_migration(self, kind: str, digest: str, start: float):
+        self.stats[kind] += 1
+        self.stats["migrated_bytes"] += self.sizes.get(digest, 0)
+        self.stats["migration_seconds"] += time.perf_counter() - start
+
+    def _compress(self, data: bytes) -> Optional[bytes]:
+        """
+        The zlib compressed blob, or None if compressing does not make it smaller. Encrypted images
+        do not compress, so a sample is tried first, not to spend CPU compressing them in full.
+        """
+        sample = data[:COMPRESSION_PROBE_SIZE]
+        if len(zlib.compress(sample, self.compression_level)) >= len(sample):
+            return None
+        compressed = zlib.compress(data, self.compression_level)
+        return compressed if len(compressed) < len(data) else None
+
+    def _write_cold(self, digest: str) -> bool:
+        """Writes the cold copy of a hot blob. Returns True if it was stored compressed."""
+        with open(self.path_for(digest), "rb") as f:
+            data = f.read()
+        compressed = self._compress(data)
+        if compressed is None:
+            self._write(self.cold_path_for(digest, compressed=False), data)
+            return False
+        self._write(self.cold_path_for(digest, compressed=True), compressed)
+        return True
+
+    @classmethod
+    def _copy(cls, src: str, dst: str, transform):
+        with open(src, "rb") as f:
+            cls._write(dst, transform(f.read()))
+
+    @staticmethod
+    def _write(dst: str, data: bytes):
+        tmp_path = f"{dst}.tmp-{uuid.uuid4().hex}"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, dst)
+
+    @classmethod
+    def _move(cls, src: str, dst: str, transform):
+        cls._copy(src, dst, transform)
+        os.remove(src)
+
+    def demotion_candidates(self, idle_seconds: float, hot_max_bytes: int) -> List[Tuple[str, float]]:
+        """
+        Picks hot blobs to demote, least recently used first: every blob idle for longer than
+        `idle_seconds`, plus as many as needed to bring the hot tier under `hot_max_bytes`.
+
+        Returns:
+            List[Tuple[str, float]]: (digest, last access time) pairs.
+        """
+        hot = sorted(
+            ((digest, self.last_access.get(digest, 0.0)) for digest in self.sizes if digest not in self.cold),
+            key=lambda item: item[1],
+        )
+        hot_bytes = self.hot_bytes()
+        idle_before = time.time() - idle_seconds
+        candidates = []
+        for digest, accessed_at in hot:
+            if accessed_at >= idle_before and hot_bytes <= hot_max_bytes:
+                break
+            candidates.append((digest, accessed_at))
+            hot_bytes -= self.sizes[digest]
+        return candidates
+
+    def hot_bytes(self) -> int:
+        return sum(size for digest, size in self.sizes.items() if digest not in self.cold)
+
+    def rebuild(self, store: Dict[str, Tuple[str, str]]):
+        """Restores references (and blob sizes and tiers) from a key index of key -> (username, digest)."""
+        for key, (username, digest) in store.items():
+            path = self.path_for(digest)
+            if not os.path.exists(path):
+                if self.cold_dir and os.path.exists(self.cold_path_for(digest, compressed=False)):
+                    self.cold_raw.add(digest)
+                if self.cold_dir and os.path.exists(self.cold_path_for(digest)):
+                    self.cold.add(digest)
+                    path = self.cold_path_for(digest)
+                else:
+                    logger.warning(f"Blob {digest} for key {key} is missing from {self.store_dir}")
+                    continue
+            if digest not in self.sizes:
+                with open(path, "rb") as f:
+                    data = f.read()
+                compressed = digest in self.cold and digest not in self.cold_raw
+                self.sizes[digest] = len(zlib.decompress(data)) if compressed else len(data)
+                self.last_access[digest] = os.path.getmtime(path)
+            self.add_ref(digest, key, username)
+
+    def report(self) -> dict:
+        """Summarizes how much disk deduplication of identical blobs (not identical pictures) saves."""
+        physical = sum(self.sizes.values())
+        logical = sum(self.sizes.get(digest, 0) * len(refs) for digest, refs in self.refs.items())
+        return {
+            "blobs": len(self.sizes),
+            "references": sum(len(refs) for refs in self.refs.values()),
+            "logical_bytes": logical,
+            "physical_bytes": physical,
+            "saved_bytes": logical - physical,
+            "dedup_ratio": logical / physical if physical else 1.0,
+        }
+
+    def tier_report(self) -> dict:
+        """Summarizes tier occupancy, hot tier hit rate and migration throughput."""
+        reads = self.stats["hot_hits"] + self.stats["cold_hits"]
+        cold_disk = sum(
+            os.path.getsize(self.cold_path_for(digest))
+            for digest in self.cold if os.path.exists(self.cold_path_for(digest))
+        )
+        seconds = self.stats["migration_seconds"]
+        return {
+            "tiering_enabled": bool(self.cold_dir),
+            "hot_blobs": len(self.sizes) - len(self.cold),
+            "hot_bytes": self.hot_bytes(),
+            "cold_blobs": len(self.cold),
+            "cold_bytes": sum(self.sizes[digest] for digest in self.cold if digest in self.sizes),
+            "cold_disk_bytes": cold_disk,
+            "hot_hit_rate": self.stats["hot_hits"] / reads if reads else 1.0,
+            **self.stats,
+            "migration_bytes_per_second": self.stats["migrated_bytes"] / seconds if seconds else 0.0,
+        }
@@ -10,5 +10,65 @@ VNODES = int(os.getenv("VNODES", "10"))
 N_REPLICAS = int(os.getenv("N_REPLICAS", "3"))
 STORE_DIR = os.getenv("STORE", "./store")          # Default to ./store
 
+# Tiered storage: idle blobs move from STORE_DIR (hot) to COLD_STORE_DIR, zlib compressed unless
+# that does not make them smaller: images arrive encrypted, so most are stored as they are.
+# Tiering is disabled when COLD_STORE is not set.
+COLD_STORE_DIR = os.getenv("COLD_STORE", "")
+HOT_TIER_MAX_BYTES = int(os.getenv("HOT_TIER_MAX_BYTES", str(10 * 1024 ** 3)))
+COLD_AFTER_SECONDS = float(os.getenv("COLD_AFTER_SECONDS", str(24 * 3600)))
+MIGRATION_INTERVAL_SECONDS = float(os.getenv("MIGRATION_INTERVAL_SECONDS", "60"))
+COLD_COMPRESSION_LEVEL = int(os.getenv("COLD_COMPRESSION_LEVEL", "6"))
+
+# Durable writes: fsync blobs and the key index before acknowledging an upload.
+# fsyncs of concurrent uploads are batched (group commit) within a small window.
+DURABLE_WRITES = os.getenv("DURABLE_WRITES", "false").lower() in ("1", "true", "yes")
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "2"))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "64"))
+INDEX_LOG = os.getenv("INDEX_LOG", os.path.join(STORE_DIR, "index.log"))
+# The index is snapshotted and the log truncated once it holds this many records (and twice the keys)
+INDEX_COMPACT_RECORDS = int(os.getenv("INDEX_COMPACT_RECORDS", "10000"))
+
+# Default erasure code for keys stored with the erasure coded policy (k data + m parity fragments)
+EC_DATA_FRAGMENTS = int(os.getenv("EC_DATA_FRAGMENTS", "4"))
+EC_PARITY_FRAGMENTS = int(os.getenv("EC_PARITY_FRAGMENTS", "2"))
+
+# Shared HTTP connection pool for inter-node calls
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))  # Connections in total
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "32"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))  # Idle connections kept open this long
+HTTP_DNS_TTL_SECONDS = int(os.getenv("HTTP_DNS_TTL_SECONDS", "300"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "1"))
+
+# Batch scale-out: each node sends at most this many keys to the new nodes at a time
+REBALANCE_PARALLELISM = int(os.getenv("REBALANCE_PARALLELISM", "8"))
+
+# Batch reads: most keys one /fetch_batch request may ask for; blobs are streamed in pieces of this size
+FETCH_BATCH_MAX_KEYS = int(os.getenv("FETCH_BATCH_MAX_KEYS", "256"))
+FETCH_BATCH_PIECE_SIZE = int(os.getenv("FETCH_BATCH_PIECE_SIZE", str(64 * 1024)))
+
+# Per-node circuit breakers: trip after BREAKER_FAILURE_THRESHOLD consecutive failures or when more
+# than BREAKER_ERROR_RATE of the last BREAKER_WINDOW requests failed (slower than SLOW_REQUEST_SECONDS
+# counts as failed), then refuse requests to the node for a cooldown that doubles while it stays down.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "5"))
+BREAKER_MAX_COOLDOWN_SECONDS = float(os.getenv("BREAKER_MAX_COOLDOWN_SECONDS", "60"))
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "2"))
+
+# Shared secret for verifying signed URLs issued by the control panel (direct client access to
+# /fetch and /upload). Empty: signed URLs are rejected.
+URL_SIGNING_SECRET = os.getenv("URL_SIGNING_SECRET", "")
+
+# Shared secret the control panel and the nodes send (in the X-Cluster-Secret header) with every
+# request between them. Data and membership endpoints reject requests that carry neither it nor a
+# valid signed URL. Must be the same on the control panel and every node; empty: only signed URLs
+# are accepted, so the cluster cannot work.
+CLUSTER_SECRET = os.getenv("CLUSTER_SECRET", "")
+
+# Longest a /get_ring long-poll request is held waiting for a ring change (seconds)
+RING_WATCH_MAX_SECONDS = float(os.getenv("RING_WATCH_MAX_SECONDS", "60"))
+
 # Add other configuration variables as needed
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
\ No newline at end of file
@@ -1,11 +1,76 @@
 import asyncio
+from typing import Dict, Optional
 import aiohttp
+from app.core.health import NodeHealth
 from app.core.logger import logger
 
+
+class HttpPool:
+    """
+    Process-wide HTTP connection pool shared by every inter-node call.
+
+    - A single TCPConnector (total and per-host connection limits, keep-alive, DNS cache),
+      created lazily inside the running event loop.
+    - Sessions handed out by the pool all share that connector, so requests reuse warm
+      connections instead of paying TCP setup each time.
+    - Every request carries `headers` (the cluster secret).
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 32, keepalive_timeout: float = 60,
+                 dns_ttl: int = 300, timeout: float = 30, connect_timeout: Optional[float] = None,
+                 headers: Optional[Dict[str, str]] = None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout  # Fail fast on unreachable hosts
+        self.headers = headers or {}
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._client: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def connector(self) -> aiohttp.TCPConnector:
+        if self._connector is None or self._connector.closed:
+            self._connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_ttl,
+            )
+        return self._connector
+
+    def session(self, base_url: Optional[str] = None) -> aiohttp.ClientSession:
+        """Creates a session on the shared connector; closing it leaves the pooled connections open."""
+        return aiohttp.ClientSession(
+            base_url=base_url,
+            connector=self.connector,
+            connector_owner=False,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout, sock_connect=self.connect_timeout),
+        )
+
+    @property
+    def client(self) -> aiohttp.ClientSession:
+        """Shared session for requests to absolute URLs."""
+        if self._client is None or self._client.closed:
+            self._client = self.session()
+        return self._client
+
+    async def close(self):
+        if self._client:
+            await self._client.close()
+        if self._connector:
+            await self._connector.close()
+        self._client = self._connector = None
+
+
 class NodeConnector:
-    def __init__(self, node_id, ring_nodes):
+    def __init__(self, node_id, ring_nodes, pool: HttpPool, health: Optional[NodeHealth] = None):
         self.connection_pool = {}
         self.node_id = node_id
+        self.pool = pool
+        self.health = health or NodeHealth()
         # Check if there's an existing event loop
         try:
             loop = asyncio.get_running_loop()
@@ -75,13 +140,24 @@ class NodeConnector:
 
     async def _create_node_connection(self, host: str, port: int):
         """
-        Create an aiohttp ClientSession for a node.
-        Ensure the session is properly managed.
+        Create an aiohttp ClientSession for a node, on the shared connection pool.
         """
-        return aiohttp.ClientSession(
-            base_url=f"http://{host}:{port}",
-            timeout=aiohttp.ClientTimeout(total=10)
-        )
+        return self.pool.session(base_url=f"http://{host}:{port}")
 
     def get_connection(self, node_id: str):
-        return self.connection_pool.get(node_id, None)
\ No newline at end of file
+        """
+        Returns the node's session, or None if there is none or the node's circuit breaker is open.
+        The outcome of a request made with it must be reported with `record`.
+        """
+        connection = self.connection_pool.get(node_id, None)
+        if connection is None or not self.health.allow(node_id):
+            return None
+        return connection
+
+    def record(self, node_id: str, success: bool, latency: Optional[float] = None):
+        self.health.record(node_id, success, latency)
+
+    async def close(self):
+        for connection in self.connection_pool.values():
+            await connection.close()
+        self.connection_pool.clear()
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from app.core.logger import logger
+
+
+class _CommitBatch:
+    """A set of paths waiting to be fsynced together, plus the waiters' future."""
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.paths = set()
+        self.waiters = 0
+        self.full = asyncio.Event()
+        self.done = loop.create_future()
+        self.task: Optional[asyncio.Task] = None
+
+
+class GroupCommitter:
+    """
+    Batches fsyncs of concurrent writes (group commit).
+
+    - The first writer to arrive opens a batch and schedules its commit.
+    - Writers arriving within `window_ms` (or until `max_batch` writers joined) add their
+      paths to the same batch.
+    - The commit fsyncs every path of the batch once, in a worker thread, then wakes all waiters.
+    - A disabled committer returns immediately, keeping the non-durable fast path unchanged.
+    """
+
+    def __init__(self, enabled: bool = True, window_ms: float = 2.0, max_batch: int = 64):
+        self.enabled = enabled
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._batch: Optional[_CommitBatch] = None
+        self.stats = {"batches": 0, "writes": 0, "fsyncs": 0, "fsync_seconds": 0.0}
+
+    async def sync(self, *paths: str):
+        """Waits until every given path (and its directory entry) is durable on disk."""
+        if not self.enabled:
+            return
+
+        batch = self._batch
+        if batch is None:
+            batch = self._batch = _CommitBatch(asyncio.get_running_loop())
+            # The flush runs as its own task so a cancelled writer cannot strand the batch
+            batch.task = asyncio.create_task(self._commit(batch))
+        batch.paths.update(paths)
+        batch.waiters += 1
+        if batch.waiters >= self.max_batch:
+            # Full batch: commit it now and let the next writer open a new one
+            self._batch = None
+            batch.full.set()
+
+        await asyncio.shield(batch.done)
+
+    async def _commit(self, batch: _CommitBatch):
+        try:
+            await asyncio.wait_for(batch.full.wait(), timeout=self.window)
+        except asyncio.TimeoutError:
+            pass
+        # Close the batch: later writers start the next one while this one is flushed
+        if self._batch is batch:
+            self._batch = None
+        try:
+            await asyncio.to_thread(self._fsync_all, batch.paths)
+            self.stats["batches"] += 1
+            self.stats["writes"] += batch.waiters
+            batch.done.set_result(None)
+        except Exception as e:
+            logger.error(f"Group commit failed for {len(batch.paths)} paths: {e}")
+            batch.done.set_exception(e)
+
+    def _fsync_all(self, paths: Set[str]):
+        start = time.perf_counter()
+        directories = set()
+        for path in paths:
+            try:
+                self._fsync_path(path)
+            except FileNotFoundError:
+                # Removed since it was written (e.g. a journal segment covered by a snapshot since)
+                pass
+            directories.add(os.path.dirname(os.path.abspath(path)))
+        # New files are only durable once their directory entry is
+        for directory in directories:
+            self._fsync_path(directory)
+        self.stats["fsyncs"] += len(directories) + len(paths)
+        self.stats["fsync_seconds"] += time.perf_counter() - start
+
+    @staticmethod
+    def _fsync_path(path: str):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def export_stats(self) -> dict:
+        batches = self.stats["batches"]
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window * 1000.0,
+            **self.stats,
+            "avg_batch_size": self.stats["writes"] / batches if batches else 0.0,
+        }
+
+
+class IndexJournal:
+    """
+    Append-only log of key index changes, one JSON record per line, plus a snapshot of the index.
+
+    Records are flushed to the OS on every append; durability comes from a GroupCommitter
+    fsyncing the active `segment` before the write is acknowledged. Replaying the snapshot then
+    every segment rebuilds the index. Once the log holds `compact_after` records, and at least
+    twice as many as there are keys, appends move on to a new segment while the index as of
+    then is snapshotted and the older segments deleted (see `seal` and `compact`).
+    """
+
+    def __init__(self, path: str, compact_after: int = 10000):
+        self.path = path
+        self.snapshot_path = f"{path}.snapshot"
+        self.compact_after = compact_after
+        self.records = 0  # Records in the log, i.e. since the last snapshot
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._segments = self._find_segments() or [path]
+        self._file = open(self.segment, "a", encoding="utf-8")
+        self._compaction: Optional[asyncio.Future] = None
+
+    @property
+    def segment(self) -> str:
+        """The segment records are appended to."""
+        return self._segments[-1]
+
+    def _find_segments(self) -> List[str]:
+        """The log segments on disk, oldest first: `path`, then `path.1`, `path.2`..."""
+        directory, name = os.path.split(os.path.abspath(self.path))
+        numbers = sorted(int(entry[len(name) + 1:]) for entry in os.listdir(directory)
+                         if entry.startswith(f"{name}.") and entry[len(name) + 1:].isdigit())
+        segments = [self.path] if os.path.exists(self.path) else []
+        return segments + [f"{self.path}.{number}" for number in numbers]
+
+    def _append(self, record: dict):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        self.records += 1
+
+    def record_put(self, key: str, value: Tuple[str, str]):
+        self._append({"op": "put", "key": key, "value": list(value)})
+
+    def record_remove(self, key: str):
+        self._append({"op": "del", "key": key})
+
+    def compaction_due(self, keys: int) -> bool:
+        compacting = self._compaction is not None and not self._compaction.done()
+        return not compacting and self.records >= max(self.compact_after, 2 * keys)
+
+    def seal(self, store: Dict[str, Tuple[str, str]]) -> Tuple[Dict[str, Tuple[str, str]], List[str]]:
+        """
+        Moves appends on to a new segment. Returns a copy of `store`, the index the sealed
+        segments describe, and those segments: the arguments of `compact`.
+        """
+        sealed = list(self._segments)
+        number = int(self.segment[len(self.path) + 1:] or 0) + 1
+        self._file.close()
+        self._segments.append(f"{self.path}.{number}")
+        self._file = open(self.segment, "a", encoding="utf-8")
+        self.records = 0
+        return dict(store), sealed
+
+    def compact(self, store: Dict[str, Tuple[str, str]], sealed: List[str]):
+        """
+        Replaces the `sealed` segments by a snapshot of `store`, the index they describe. The
+        snapshot is on disk before the segments are deleted; after a crash in between, replaying
+        them over the snapshot gives the same index again. Blocking: runs in a worker thread
+        while the node serves (see `compact_in_background`).
+        """
+        start = time.perf_counter()
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(store, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        GroupCommitter._fsync_path(os.path.dirname(os.path.abspath(self.snapshot_path)))
+        for segment in sealed:
+            os.remove(segment)
+        self._segments = [segment for segment in self._segments if segment not in sealed]
+        logger.info(f"Compacted index journal {self.path}: {len(sealed)} segments into a snapshot of "
+                    f"{len(store)} keys in {time.perf_counter() - start:.3f}s")
+
+    def compact_in_background(self, store: Dict[str, Tuple[str, str]]) -> asyncio.Future:
+        """Seals the log and snapshots a copy of `store` in a worker thread; appends go on meanwhile."""
+        self._compaction = asyncio.ensure_future(asyncio.to_thread(self.compact, *self.seal(store)))
+        self._compaction.add_done_callback(self._compaction_done)
+        return self._compaction
+
+    def _compaction_done(self, compaction: asyncio.Future):
+        if not compaction.cancelled() and compaction.exception() is not None:
+            # The sealed segments stay on disk, replayed as usual, and go with the next compaction
+            logger.error(f"Compaction of index journal {self.path} failed: {compaction.exception()}")
+
+    def replay(self) -> Dict[str, Tuple[str, str]]:
+        """Returns the index state described by the snapshot and log. A torn trailing record is ignored."""
+        store: Dict[str, Tuple[str, str]] = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                store = {key: tuple(value) for key, value in json.load(f).items()}
+        self.records = 0
+        for segment in self._segments:
+            with open(segment, "r", encoding="utf-8") as f:
+                for line in f:
+                    self.records += 1
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping torn record in index journal {segment}")
+                        continue
+                    if record["op"] == "put":
+                        store[record["key"]] = tuple(record["value"])
+                    elif record["op"] == "del":
+                        store.pop(record["key"], None)
+        return store
+
+    def close(self):
+        self._file.close()
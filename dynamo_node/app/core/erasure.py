@@ -0,0 +1,163 @@
+import struct
+from typing import Dict, List, Optional, Tuple
+
+# GF(2^8) arithmetic over the polynomial x^8 + x^4 + x^3 + x^2 + 1 (0x11d)
+_EXP = [0] * 512
+_LOG = [0] * 256
+_x = 1
+for _i in range(255):
+    _EXP[_i] = _x
+    _LOG[_x] = _i
+    _x <<= 1
+    if _x & 0x100:
+        _x ^= 0x11D
+for _i in range(255, 512):
+    _EXP[_i] = _EXP[_i - 255]
+
+
+def gf_mul(a: int, b: int) -> int:
+    if a == 0 or b == 0:
+        return 0
+    return _EXP[_LOG[a] + _LOG[b]]
+
+
+def gf_inv(a: int) -> int:
+    if a == 0:
+        raise ZeroDivisionError("0 has no inverse in GF(256)")
+    return _EXP[255 - _LOG[a]]
+
+
+# Multiplying a whole buffer by a constant c is a single bytes.translate(_MUL_TABLES[c])
+_MUL_TABLES = [bytes(gf_mul(c, x) for x in range(256)) for c in range(256)]
+
+FRAGMENT_MAGIC = b"DEC1"
+MAX_FRAGMENTS = 255  # k + m limit: the header stores k, m and indices in one byte each
+_HEADER = struct.Struct(">4sBBBQ")  # magic, k, m, fragment index, original object size
+
+# Stored under the object's own key in place of the object, so readers know to gather its fragments
+MARKER_MAGIC = b"DECM"
+_MARKER = struct.Struct(">4sBB")  # magic, k, m
+MARKER_SIZE = _MARKER.size
+
+
+def _xor(a: bytes, b: bytes) -> bytes:
+    return (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(len(a), "little")
+
+
+def _combine(coefficients: List[int], shards: List[bytes]) -> bytes:
+    """Computes sum(coefficient * shard) over GF(256), byte-wise."""
+    result = None
+    for c, shard in zip(coefficients, shards):
+        if c == 0:
+            continue
+        term = shard if c == 1 else shard.translate(_MUL_TABLES[c])
+        result = term if result is None else _xor(result, term)
+    return result if result is not None else bytes(len(shards[0]))
+
+
+def _invert(matrix: List[List[int]]) -> List[List[int]]:
+    """Inverts a square matrix over GF(256) by Gauss-Jordan elimination."""
+    n = len(matrix)
+    rows = [row[:] + [1 if i == j else 0 for j in range(n)] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = next(r for r in range(col, n) if rows[r][col])
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        scale = gf_inv(rows[col][col])
+        rows[col] = [gf_mul(scale, v) for v in rows[col]]
+        for r in range(n):
+            if r != col and rows[r][col]:
+                factor = rows[r][col]
+                rows[r] = [v ^ gf_mul(factor, p) for v, p in zip(rows[r], rows[col])]
+    return [row[n:] for row in rows]
+
+
+class ReedSolomon:
+    """
+    Systematic Reed-Solomon erasure code with k data fragments and m parity fragments.
+
+    - Fragments 0..k-1 are the object split in k equal parts; fragments k..k+m-1 are parity.
+    - Parity rows come from a Cauchy matrix, so any k of the k+m fragments rebuild the object.
+    - Fragments carry a small header (k, m, index, object size) and are self-describing.
+    """
+
+    def __init__(self, k: int = 4, m: int = 2):
+        if k < 1 or m < 1 or k + m > MAX_FRAGMENTS:
+            raise ValueError(f"Unsupported erasure code {k}+{m}")
+        self.k = k
+        self.m = m
+        # Cauchy matrix 1 / (x_i + y_j) with x_i = k + i and y_j = j (disjoint, so never singular)
+        self.parity = [[gf_inv((self.k + i) ^ j) for j in range(k)] for i in range(m)]
+
+    def _generator_row(self, index: int) -> List[int]:
+        if index < self.k:
+            return [1 if j == index else 0 for j in range(self.k)]
+        return self.parity[index - self.k]
+
+    def encode(self, data: bytes) -> List[bytes]:
+        """Splits data into k + m fragments (headers included)."""
+        shard_len = max(1, -(-len(data) // self.k))
+        padded = data.ljust(shard_len * self.k, b"\0")
+        shards = [padded[i * shard_len:(i + 1) * shard_len] for i in range(self.k)]
+        shards += [_combine(row, shards[:self.k]) for row in self.parity]
+        return [
+            _HEADER.pack(FRAGMENT_MAGIC, self.k, self.m, index, len(data)) + shard
+            for index, shard in enumerate(shards)
+        ]
+
+    def decode(self, fragments: Dict[int, bytes]) -> bytes:
+        """
+        Rebuilds the object from any k fragments, given as {fragment index: fragment}.
+        """
+        available = {}
+        size = None
+        for index, fragment in fragments.items():
+            magic, k, m, header_index, size = _HEADER.unpack_from(fragment)
+            if magic != FRAGMENT_MAGIC or (k, m, header_index) != (self.k, self.m, index):
+                raise ValueError(f"Fragment {index} does not belong to a {self.k}+{self.m} code")
+            available[index] = fragment[_HEADER.size:]
+        if len(available) < self.k:
+            raise ValueError(f"Need {self.k} fragments to decode, got {len(available)}")
+
+        missing = [j for j in range(self.k) if j not in available]
+        if missing:
+            # Solve with k available fragments, preferring data fragments (identity rows)
+            chosen = sorted(available)[:self.k]
+            inverse = _invert([self._generator_row(index) for index in chosen])
+            shards = [available[index] for index in chosen]
+            for j in missing:
+                available[j] = _combine(inverse[j], shards)
+        return b"".join(available[j] for j in range(self.k))[:size]
+
+    @staticmethod
+    def read_header(fragment: bytes) -> dict:
+        magic, k, m, index, size = _HEADER.unpack_from(fragment)
+        if magic != FRAGMENT_MAGIC:
+            raise ValueError("Not an erasure coded fragment")
+        return {"k": k, "m": m, "index": index, "size": size}
+
+
+def build_marker(codec: ReedSolomon) -> bytes:
+    return _MARKER.pack(MARKER_MAGIC, codec.k, codec.m)
+
+
+def read_marker(data: bytes) -> Optional[ReedSolomon]:
+    """The code of an erasure coded object, given what is stored under its key; None for plain objects."""
+    if len(data) != MARKER_SIZE:
+        return None
+    magic, k, m = _MARKER.unpack(data)
+    return ReedSolomon(k, m) if magic == MARKER_MAGIC else None
+
+
+def fragment_key(key: str, index: int) -> str:
+    return f"{key}.ec{index}"
+
+
+def is_fragment_key(key: str) -> bool:
+    base, _, suffix = key.rpartition(".ec")
+    return bool(base) and suffix.isdigit()
+
+
+def parse_fragment_key(key: str) -> Tuple[str, int]:
+    """The object key and fragment index of a fragment key."""
+    base, _, suffix = key.rpartition(".ec")
+    return base, int(suffix)
@@ -1,22 +1,24 @@
 import os
-import aiofiles
 from fastapi import HTTPException
-from app.core.config import STORE_DIR
 from app.core.state import ns
 
-os.makedirs(STORE_DIR, exist_ok=True)
+async def save_file(file, key: str, username: str) -> str:
+    """Stores the upload once per content digest and returns the digest."""
+    return await ns.blobs.put(file, key, username)
 
-async def save_file(file) -> str:
-    file_path = os.path.join(STORE_DIR, file.filename)
-    async with aiofiles.open(file_path, "wb") as f:
-        await f.write(await file.read())
-    return file_path
+def release_file(key: str):
+    """Drops the key's reference to its blob, deleting the blob if it was the last one."""
+    value = ns.manager.get_value(key)
+    if value:
+        username, digest = value
+        ns.blobs.release(digest, key, username)
 
-def get_valid_file_path(key: str) -> str:
+async def get_valid_file_path(key: str) -> str:
+    """Returns the path of the key's blob, promoting it to the hot tier if it is cold."""
     value = ns.manager.get_value(key)  # kv_storage should be pre-imported or globally available
     if not value:
         raise HTTPException(status_code=404, detail="Hash not found")
-    file_path = value[1]
+    file_path = await ns.blobs.open_for_read(value[1])
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Hash found but file not found")
-    return file_path
\ No newline at end of file
+    return file_path
@@ -1,17 +1,22 @@
 import asyncio
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from app.core.hashring import HashRing
+from app.core.durability import IndexJournal
 from app.core.config import NODE_ID, VNODES, N_REPLICAS
 import hashlib
 
 class KeyValueStorage:
-    """Handles key-value storage and retrieval."""
-    def __init__(self):
+    """Handles key-value storage and retrieval. Changes are logged to the journal, if any."""
+    def __init__(self, journal: Optional[IndexJournal] = None):
         self.store: Dict[str, Tuple[str,str]] = {}
+        self.journal = journal
 
     def add(self, key: str, value: Tuple[str,str]):
         self.store[key] = value
+        if self.journal:
+            self.journal.record_put(key, value)
+            self._compact_if_due()
 
     def get(self, key: str) -> Tuple[str,str]:
         return self.store.get(key)
@@ -19,9 +24,31 @@ class KeyValueStorage:
     def remove(self, key: str):
         if key in self.store:
             del self.store[key]
+            if self.journal:
+                self.journal.record_remove(key)
+                self._compact_if_due()
+
+    def _compact_if_due(self):
+        if not self.journal.compaction_due(len(self.store)):
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.journal.compact(*self.journal.seal(self.store))  # No event loop to keep serving
+        else:
+            self.journal.compact_in_background(self.store)
+
+    def load(self, store: Dict[str, Tuple[str,str]]):
+        """Restores entries replayed from the journal without logging them again."""
+        self.store.update(store)
     
     def clear(self):
+        if self.journal:
+            for key in self.store:
+                self.journal.record_remove(key)
         self.store.clear()
+        if self.journal:
+            self._compact_if_due()
 
     def list_keys(self) -> List[str]:
         return list(self.store.keys())
@@ -35,12 +62,14 @@ class DistributedKeyValueManager:
     - Handles addition of nodes, key transfer logic, and pending key transfers.
     """
 
-    def __init__(self, nodes: List[str], node_id: str, vnodes: int = VNODES, replicas: int = N_REPLICAS):
+    def __init__(self, nodes: List[str], node_id: str, vnodes: int = VNODES, replicas: int = N_REPLICAS,
+                 journal: Optional[IndexJournal] = None):
         self.node_id = node_id
         # self.nodes as the union of nodes and nodeid
         self.nodes = list(set(nodes + [node_id]))
         self.hash_ring = HashRing(nodes=self.nodes, hash_fn=self._custom_hash, vnodes=vnodes, replicas=replicas)
-        self.kv_storage = KeyValueStorage()  # Uses the KeyValueStorage class
+        self.journal = journal
+        self.kv_storage = KeyValueStorage(journal)  # Uses the KeyValueStorage class
         self.pending_transfers: Dict[str, List[str]] = defaultdict(list)  # Pending key transfers to other nodes
 
     @staticmethod
@@ -104,6 +133,38 @@ class DistributedKeyValueManager:
         # print(f"Node {self.node_id} transfers {len(transfer_keys)} keys to {new_node}.")
         return transfer_keys
 
+    def plan_rebalance(self, previous_metadata: dict) -> Tuple[Dict[str, List[str]], List[str]]:
+        """
+        Plans moving the local keys from a previous ring (given by its metadata) to the current ring,
+        however many nodes joined in between. A key is sent to each node that became responsible for it
+        by a single node, the first of its previous preference list, so every copy moves at most once.
+
+        Args:
+            previous_metadata (dict): Metadata of the ring before the membership change.
+
+        Returns:
+            Tuple[Dict[str, List[str]], List[str]]: Keys to send to each node, and keys this node is no
+            longer responsible for (to drop once sent).
+        """
+        previous_ring = HashRing.reconstruct_ring(
+            previous_metadata, vnodes=self.hash_ring.vnodes, replicas=self.hash_ring.replicas
+        )
+        previous_ring._hash = self._custom_hash
+        sends: Dict[str, List[str]] = defaultdict(list)
+        drops = []
+        for key in self.list_local_keys():
+            previous_nodes = previous_ring.get_all_nodes(key)
+            if self.node_id not in previous_nodes:
+                continue  # Stray copy: not ours to move
+            current_nodes = self.hash_ring.get_all_nodes(key)
+            if previous_nodes[0] == self.node_id:
+                for node in current_nodes:
+                    if node not in previous_nodes:
+                        sends[node].append(key)
+            if self.node_id not in current_nodes:
+                drops.append(key)
+        return dict(sends), drops
+
     def reset(self):
         """Resets the key-value storage and hash ring."""
         self.kv_storage.clear()
@@ -115,7 +176,8 @@ class DistributedKeyValueManager:
         return self.hash_ring.export_metadata()
 
     @classmethod
-    def reconstruct(cls, ring_metadata: dict, node_id: str, vnodes: int = VNODES, replicas: int = N_REPLICAS) -> "DistributedKeyValueManager":
+    def reconstruct(cls, ring_metadata: dict, node_id: str, vnodes: int = VNODES, replicas: int = N_REPLICAS,
+                    journal: Optional[IndexJournal] = None) -> "DistributedKeyValueManager":
         """
         Reconstructs a DistributedKeyValueManager instance from the exported hash ring metadata.
 
@@ -124,6 +186,7 @@ class DistributedKeyValueManager:
             node_id (str): ID of the current node.
             vnodes (int): Default number of virtual nodes for the hash ring.
             replicas (int): Default number of replicas for the hash ring.
+            journal (IndexJournal): (Optional) Journal that logs changes to the new local storage.
 
         Returns:
             DistributedKeyValueManager: A reconstructed DistributedKeyValueManager instance.
@@ -132,11 +195,12 @@ class DistributedKeyValueManager:
         hash_ring = HashRing.reconstruct_ring(ring_metadata, vnodes=vnodes, replicas=replicas)
 
         # Create a new manager instance with the reconstructed hash ring
-        manager = cls(nodes=list(ring_metadata["physical_nodes"].keys()), node_id=node_id)
+        manager = cls(nodes=list(ring_metadata["physical_nodes"].keys()), node_id=node_id, journal=journal)
+        hash_ring._hash = manager._custom_hash  # Keys are placed with the manager's hash, as in __init__
         manager.hash_ring = hash_ring  # Replace the default hash ring with the reconstructed one
 
         # Use default empty values for storage and pending transfers
-        manager.kv_storage = KeyValueStorage()
+        manager.kv_storage = KeyValueStorage(journal)
         manager.pending_transfers = {}
 
         return manager
\ No newline at end of file
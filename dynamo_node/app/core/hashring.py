@@ -26,6 +26,7 @@ class HashRing:
         self.physical_to_virtual = defaultdict(list)
         self.vnodes = vnodes
         self.replicas = replicas
+        self.version = 0  # Incremented on every membership change
         self._hash = self._hash_default
         if hash_fn:
             self._hash = hash_fn
@@ -47,6 +48,8 @@ class HashRing:
         """
         if num_virtual_nodes is None:
             num_virtual_nodes = self.vnodes
+        if physical_node_id not in self.physical_to_virtual:
+            self.version += 1
         for i in range(num_virtual_nodes):
             virtual_node_id = f"{physical_node_id}-vn{i}"
             virtual_hash = self._hash(virtual_node_id)
@@ -70,16 +73,19 @@ class HashRing:
             idx = 0
         return self.ring[list(self.ring.keys())[idx]]
 
-    def get_all_nodes(self, key: str) -> list[str]:
+    def get_all_nodes(self, key: str, count: Optional[int] = None) -> list[str]:
         """
         Retrieves all nodes (primary + replicas) for a given key.
 
         Args:
             key (str): The key to locate in the hash ring.
+            count (int): (Optional) Number of distinct physical nodes to return instead of the replica count.
 
         Returns:
             list[str]: List of physical node IDs responsible for the key.
         """
+        if count is None:
+            count = self.replicas
         key_hash = self._hash(key)
         idx = self.ring.bisect_right(key_hash)
         if idx == len(self.ring):  # Wrap around to the beginning of the ring
@@ -95,7 +101,7 @@ class HashRing:
             if physical_node not in seen_nodes:
                 nodes.append(physical_node)
                 seen_nodes.add(physical_node)
-                if len(nodes) == self.replicas:
+                if len(nodes) == count:
                     break
             idx = (idx + 1) % len(self.ring)
 
@@ -118,8 +124,8 @@ class HashRing:
 
     def export_metadata(self) -> dict:
         """
-        Exports the metadata of the hash ring, which includes physical nodes
-        and the number of virtual nodes for each physical node.
+        Exports the metadata of the hash ring, which includes physical nodes,
+        the number of virtual nodes for each physical node and the ring version.
 
         Returns:
             dict: Metadata dictionary containing the physical nodes and their virtual node count.
@@ -127,9 +133,23 @@ class HashRing:
         return {
             "physical_nodes": {
                 node: len(self.physical_to_virtual[node]) for node in self.physical_to_virtual
-            }
+            },
+            "version": self.version,
         }
-        
+
+    def export_tokens(self) -> dict:
+        """
+        Exports the token table of the hash ring: the sorted virtual node hashes (as 64-char hex)
+        and the physical node owning each of them, enough to route keys without rebuilding the ring.
+
+        Returns:
+            dict: Token table with parallel "tokens" and "owners" lists.
+        """
+        return {
+            "tokens": [f"{token:064x}" for token in self.ring.keys()],
+            "owners": list(self.ring.values()),
+        }
+
 
     @classmethod
     def reconstruct_ring(cls, metadata: dict, vnodes: int = 5, replicas: int = 3) -> "HashRing":
@@ -147,4 +167,5 @@ class HashRing:
         hash_ring = cls(vnodes=vnodes, replicas=replicas)
         for physical_node, num_virtual_nodes in metadata["physical_nodes"].items():
             hash_ring.add_node(physical_node, num_virtual_nodes)
+        hash_ring.version = metadata.get("version", hash_ring.version)
         return hash_ring
\ No newline at end of file
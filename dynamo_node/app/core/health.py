@@ -0,0 +1,117 @@
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one node, fed with the outcome (and latency) of every request to it.
+
+    - closed: requests flow. The breaker trips (opens) after `failure_threshold` consecutive
+      failures, or when more than `error_rate` of the last `window` requests failed (outlier
+      ejection). Responses slower than `slow_seconds` count as failures.
+    - open: requests are refused without touching the network for `cooldown` seconds.
+    - half-open: a single probe request is let through; its success closes the breaker, its
+      failure reopens it with the cooldown doubled (up to `max_cooldown`).
+    """
+
+    def __init__(self, failure_threshold: int = 5, error_rate: float = 0.5, window: int = 20,
+                 cooldown: float = 5.0, max_cooldown: float = 60.0, slow_seconds: float = 2.0):
+        self.failure_threshold = failure_threshold
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.slow_seconds = slow_seconds
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.current_cooldown = cooldown
+        self.opened_at = 0.0
+        self.probing = False
+        self.trips = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.current_cooldown:
+            self.state = HALF_OPEN
+            self.probing = False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, success: bool, latency: Optional[float] = None):
+        if success and latency is not None and latency > self.slow_seconds:
+            success = False
+        if self.state == HALF_OPEN:
+            if success:
+                self._close()
+            else:
+                self._open(backoff=True)
+            return
+        if self.state == OPEN:
+            return  # Late outcome of a request sent before the breaker tripped
+
+        self.outcomes.append(success)
+        self.consecutive_failures = 0 if success else self.consecutive_failures + 1
+        window_full = len(self.outcomes) == self.outcomes.maxlen
+        if self.consecutive_failures >= self.failure_threshold or (
+            window_full and self.outcomes.count(False) / len(self.outcomes) > self.error_rate
+        ):
+            self._open()
+
+    def _open(self, backoff: bool = False):
+        self.current_cooldown = min(self.current_cooldown * 2, self.max_cooldown) if backoff else self.cooldown
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
+        self.trips += 1
+
+    def _close(self):
+        self.state = CLOSED
+        self.current_cooldown = self.cooldown
+        self.consecutive_failures = 0
+        self.outcomes.clear()
+
+    def report(self) -> dict:
+        return {
+            "state": self.state,
+            "error_rate": self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+class NodeHealth:
+    """
+    Circuit breakers of all nodes, created on first use with the same settings.
+    """
+
+    def __init__(self, **breaker_options):
+        self._options = breaker_options
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, node_id: str) -> CircuitBreaker:
+        if node_id not in self.breakers:
+            self.breakers[node_id] = CircuitBreaker(**self._options)
+        return self.breakers[node_id]
+
+    def allow(self, node_id: str) -> bool:
+        return self.breaker(node_id).allow()
+
+    def record(self, node_id: str, success: bool, latency: Optional[float] = None):
+        self.breaker(node_id).record(success, latency)
+
+    def order(self, nodes: List[str]) -> List[str]:
+        """Orders nodes (e.g. a preference list) healthy first, keeping their relative order."""
+        return sorted(nodes, key=lambda node_id: self.breaker(node_id).state != CLOSED)
+
+    def report(self) -> dict:
+        return {node_id: breaker.report() for node_id, breaker in self.breakers.items()}
+
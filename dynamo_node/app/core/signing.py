@@ -0,0 +1,38 @@
+import hashlib
+import hmac
+import time
+from typing import Dict, Optional
+
+
+def signature(secret: str, method: str, path: str, expires: int, **params: str) -> str:
+    """
+    HMAC-SHA256 of a request: method, path, expiry time and the parameters it is restricted to.
+    """
+    canonical = "\n".join([method.upper(), path, str(expires)] + [f"{k}={params[k]}" for k in sorted(params)])
+    return hmac.new(secret.encode(), canonical.encode(), hashlib.sha256).hexdigest()
+
+
+def verify(secret: str, method: str, path: str, expires: Optional[int], sig: Optional[str], **params: str) -> bool:
+    """
+    Checks a signed URL: the signature must match and the URL must not have expired.
+    Always fails when no secret is configured.
+    """
+    if not secret or expires is None or sig is None or expires < time.time():
+        return False
+    return hmac.compare_digest(signature(secret, method, path, expires, **params), sig)
+
+
+# Requests between the control panel and the nodes carry the cluster's shared secret in this header
+CLUSTER_SECRET_HEADER = "X-Cluster-Secret"
+
+
+def cluster_headers(secret: str) -> Dict[str, str]:
+    """Headers proving a request comes from inside the cluster (none when no secret is configured)."""
+    return {CLUSTER_SECRET_HEADER: secret} if secret else {}
+
+
+def is_cluster_request(secret: str, presented: Optional[str]) -> bool:
+    """Whether a request presented the cluster's shared secret. Always fails when none is configured."""
+    if not secret or presented is None:
+        return False
+    return hmac.compare_digest(secret.encode(), presented.encode())
@@ -1,6 +1,20 @@
-from app.core.config import NODE_ID, VNODES, N_REPLICAS, STORE_DIR
-from app.core.connection import NodeConnector
+import asyncio
+from app.core.config import (
+    NODE_ID, VNODES, N_REPLICAS, STORE_DIR,
+    DURABLE_WRITES, GROUP_COMMIT_WINDOW_MS, GROUP_COMMIT_MAX_BATCH, INDEX_LOG, INDEX_COMPACT_RECORDS,
+    COLD_STORE_DIR, HOT_TIER_MAX_BYTES, COLD_AFTER_SECONDS, MIGRATION_INTERVAL_SECONDS, COLD_COMPRESSION_LEVEL,
+    HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_KEEPALIVE_SECONDS, HTTP_DNS_TTL_SECONDS, HTTP_TIMEOUT_SECONDS,
+    HTTP_CONNECT_TIMEOUT_SECONDS, BREAKER_FAILURE_THRESHOLD, BREAKER_ERROR_RATE, BREAKER_WINDOW,
+    BREAKER_COOLDOWN_SECONDS, BREAKER_MAX_COOLDOWN_SECONDS, SLOW_REQUEST_SECONDS, CLUSTER_SECRET,
+)
+from app.core.blobstore import BlobStore
+from app.core.connection import HttpPool, NodeConnector
+from app.core.signing import cluster_headers
+from app.core.durability import GroupCommitter, IndexJournal
 from app.core.hashmanager import DistributedKeyValueManager
+from app.core.health import NodeHealth
+from app.core.singleflight import SingleFlight
+from app.core.tiering import TierMigrator
 from pydantic import BaseModel, IPvAnyAddress, conint
 from typing import Dict, Tuple
 from app.core.logger import logger
@@ -12,12 +26,51 @@ class NodeState:
         self.n_replicas = N_REPLICAS
         self.store_dir = STORE_DIR
         self.connector = None
-        self.manager = DistributedKeyValueManager(nodes=[NODE_ID], node_id=NODE_ID, vnodes=VNODES, replicas=N_REPLICAS)
+        self.http = HttpPool(HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_KEEPALIVE_SECONDS,
+                             HTTP_DNS_TTL_SECONDS, HTTP_TIMEOUT_SECONDS, HTTP_CONNECT_TIMEOUT_SECONDS,
+                             cluster_headers(CLUSTER_SECRET))
+        # Circuit breakers of the other nodes, kept across ring re-joins
+        self.health = NodeHealth(
+            failure_threshold=BREAKER_FAILURE_THRESHOLD, error_rate=BREAKER_ERROR_RATE, window=BREAKER_WINDOW,
+            cooldown=BREAKER_COOLDOWN_SECONDS, max_cooldown=BREAKER_MAX_COOLDOWN_SECONDS,
+            slow_seconds=SLOW_REQUEST_SECONDS,
+        )
+        self.blobs = BlobStore(STORE_DIR, COLD_STORE_DIR or None, COLD_COMPRESSION_LEVEL)
+        self.migrator = TierMigrator(self.blobs, MIGRATION_INTERVAL_SECONDS, COLD_AFTER_SECONDS, HOT_TIER_MAX_BYTES)
+        # The index journal is only kept in durable mode, where it is replayed on startup
+        self.journal = IndexJournal(INDEX_LOG, INDEX_COMPACT_RECORDS) if DURABLE_WRITES else None
+        self.committer = GroupCommitter(DURABLE_WRITES, GROUP_COMMIT_WINDOW_MS, GROUP_COMMIT_MAX_BATCH)
+        self.manager = DistributedKeyValueManager(nodes=[NODE_ID], node_id=NODE_ID, vnodes=VNODES, replicas=N_REPLICAS,
+                                                  journal=self.journal)
+        if self.journal:
+            self.manager.kv_storage.load(self.journal.replay())
+            self.blobs.rebuild(self.manager.kv_storage.store)
         self.ring_nodes = None
-        
-    def initialize_connections(self, ring_nodes):
-        self.connector = NodeConnector(self.node_id, ring_nodes)
+        self.ec_reads = SingleFlight()  # Coalesces concurrent erasure coded reads of the same key
+        self.ring_changed = asyncio.Event()  # Set (and replaced) whenever the ring changes
+
+    async def commit(self, *paths: str):
+        """Makes the given blob files and the key index durable (no-op unless durable mode is on)."""
+        if self.journal:
+            paths += (self.journal.segment,)
+        await self.committer.sync(*paths)
+
+    def notify_ring_changed(self):
+        """Wakes up everyone waiting for a ring change (e.g. /get_ring long-polls)."""
+        self.ring_changed.set()
+        self.ring_changed = asyncio.Event()
+
+    async def initialize_connections(self, ring_nodes):
+        if self.connector:
+            await self.connector.close()
+        self.connector = NodeConnector(self.node_id, ring_nodes, self.http, self.health)
         self.ring_nodes = ring_nodes
 
+    async def close(self):
+        """Closes node connections and the shared HTTP pool (on shutdown)."""
+        if self.connector:
+            await self.connector.close()
+        await self.http.close()
+
 ns = NodeState()
 logger.info(f"Node state initialized with ID: {ns.node_id}")
\ No newline at end of file
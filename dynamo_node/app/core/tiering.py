@@ -0,0 +1,54 @@
+import asyncio
+from typing import Optional
+from app.core.blobstore import BlobStore
+from app.core.logger import logger
+
+
+class TierMigrator:
+    """
+    Background task that demotes idle blobs from the hot tier to the cold tier.
+
+    - Every `interval` seconds, blobs not accessed for `idle_seconds` are demoted.
+    - If the hot tier is larger than `hot_max_bytes`, least recently used blobs are demoted
+      until it fits, even if they are not idle yet.
+    - Promotion back to the hot tier happens on read, in BlobStore.open_for_read.
+    """
+
+    def __init__(self, blobs: BlobStore, interval: float, idle_seconds: float, hot_max_bytes: int):
+        self.blobs = blobs
+        self.interval = interval
+        self.idle_seconds = idle_seconds
+        self.hot_max_bytes = hot_max_bytes
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.blobs.cold_dir and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Tier migrator started (cold tier: {self.blobs.cold_dir})")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def migrate_once(self) -> int:
+        """Runs one migration pass and returns the number of demoted blobs."""
+        demoted = 0
+        for digest, accessed_at in self.blobs.demotion_candidates(self.idle_seconds, self.hot_max_bytes):
+            try:
+                if await self.blobs.demote(digest, accessed_at):
+                    demoted += 1
+            except OSError as e:
+                logger.error(f"Failed to demote blob {digest}: {e}")
+        if demoted:
+            logger.info(f"Demoted {demoted} blobs to the cold tier")
+        return demoted
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.migrate_once()
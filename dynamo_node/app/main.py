@@ -1,8 +1,19 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api import endpoints
+from app.core.state import ns
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start background tasks on startup, stop them on shutdown
+    ns.migrator.start()
+    yield
+    await ns.migrator.stop()
+    await ns.close()
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Include API routes
 app.include_router(endpoints.router)
\ No newline at end of file
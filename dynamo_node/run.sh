@@ -1,3 +1,5 @@
 #/bin/bash
 pip install -r requirements.txt
+# The control panel and the nodes must share this secret; set your own outside local development
+export CLUSTER_SECRET="${CLUSTER_SECRET:-local-development-only}"
 uvicorn app.main:app --reload --host 0.0.0.0 --port 9090
\ No newline at end of file
@@ -0,0 +1,8 @@
+import base64
+import os
+
+# The node reads its secrets from the environment when app.core.config is first imported
+os.environ.setdefault("CLUSTER_SECRET", "test-cluster-secret")
+os.environ.setdefault("URL_SIGNING_SECRET", "test-signing-secret")
+# The backend's encryption, loaded by the tests of what nodes store, reads its key the same way
+os.environ.setdefault("FERNET_KEY", base64.urlsafe_b64encode(os.urandom(32)).decode())
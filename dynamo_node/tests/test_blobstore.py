@@ -0,0 +1,94 @@
+import asyncio
+import importlib.util
+import io
+import os
+import pytest
+from fastapi import UploadFile
+from app.core.blobstore import BlobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Fixture to create a blob store in a temporary directory."""
+    return BlobStore(str(tmp_path))
+
+def put(store, data, key, username):
+    upload = UploadFile(file=io.BytesIO(data), filename="image.jpg")
+    return asyncio.run(store.put(upload, key, username))
+
+def test_identical_content_stored_once(store):
+    """Test that the same bytes uploaded under different keys and users share one blob."""
+    data = os.urandom(4096)
+    digest1 = put(store, data, "key1", "user1")
+    digest2 = put(store, data, "key2", "user2")
+    assert digest1 == digest2
+    assert [name for name in os.listdir(store.store_dir)] == [digest1]
+    assert len(store.refs[digest1]) == 2
+
+def load_backend_crypto():
+    """The backend's image encryption, which every image goes through before it reaches a node."""
+    pytest.importorskip("cryptography", reason="the backend's dependencies are not installed")
+    pytest.importorskip("dotenv", reason="the backend's dependencies are not installed")
+    path = os.path.join(os.path.dirname(__file__), "..", "..", "backend", "src", "crypto.py")
+    spec = importlib.util.spec_from_file_location("backend_crypto", path)
+    crypto = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(crypto)
+    return crypto
+
+def test_dedup_of_backend_encrypted_images(store):
+    """
+    Test what deduplication saves on images encrypted by the backend: the same ciphertext sent again
+    (a retry, or the same upload under another key) shares a blob, while the same picture uploaded
+    again is encrypted with a new salt and stored anew.
+    """
+    crypto = load_backend_crypto()
+    picture = os.urandom(100 * 1024)
+    sealed = crypto.encrypt_data(picture)
+    digest = put(store, sealed, "key1", "user1")
+    assert put(store, sealed, "key1", "user1") == digest  # Retried upload
+    assert put(store, sealed, "key2", "user1") == digest
+
+    resealed = crypto.encrypt_data(picture)
+    assert crypto.decrypt_data(resealed) == crypto.decrypt_data(sealed) == picture
+    assert put(store, resealed, "key3", "user2") != digest
+    report = store.report()
+    assert report["blobs"] == 2
+    assert report["saved_bytes"] == len(sealed)
+
+def test_release_garbage_collects_last_reference(store):
+    """Test that a blob is deleted only when its last reference is released."""
+    data = os.urandom(4096)
+    digest = put(store, data, "key1", "user1")
+    put(store, data, "key2", "user2")
+    assert store.release(digest, "key1", "user1") is False
+    assert os.path.exists(store.path_for(digest))
+    assert store.release(digest, "key2", "user2") is True
+    assert not os.path.exists(store.path_for(digest))
+
+def test_same_mapping_counted_once(store):
+    """Test that re-uploading under the same (key, username) does not add a reference."""
+    data = os.urandom(1024)
+    digest = put(store, data, "key1", "user1")
+    put(store, data, "key1", "user1")
+    assert len(store.refs[digest]) == 1
+
+def test_report(store):
+    """Test the disk savings report."""
+    data = os.urandom(1000)
+    for i in range(3):
+        put(store, data, f"key{i}", "user1")
+    put(store, os.urandom(500), "key3", "user1")
+    report = store.report()
+    assert report["blobs"] == 2
+    assert report["references"] == 4
+    assert report["physical_bytes"] == 1500
+    assert report["logical_bytes"] == 3500
+    assert report["saved_bytes"] == 2000
+
+def test_rebuild(store):
+    """Test restoring references from a replayed key index."""
+    digest = put(store, os.urandom(100), "key1", "user1")
+    rebuilt = BlobStore(store.store_dir)
+    rebuilt.rebuild({"key1": ("user1", digest), "key2": ("user2", digest)})
+    assert rebuilt.refs[digest] == {("key1", "user1"), ("key2", "user2")}
+    assert rebuilt.sizes[digest] == 100
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import pytest
+from app.core.durability import GroupCommitter, IndexJournal
+from app.core.hashmanager import KeyValueStorage
+
+
+@pytest.fixture
+def journal(tmp_path):
+    """Fixture to create an index journal in a temporary directory."""
+    journal = IndexJournal(str(tmp_path / "index.log"))
+    yield journal
+    journal.close()
+
+def test_journal_replay(journal):
+    """Test that replaying the journal rebuilds the key index."""
+    storage = KeyValueStorage(journal)
+    storage.add("key1", ("user1", "path1"))
+    storage.add("key2", ("user2", "path2"))
+    storage.remove("key1")
+    assert journal.replay() == {"key2": ("user2", "path2")}
+
+def test_journal_ignores_torn_record(journal):
+    """Test that a partially written trailing record is skipped on replay."""
+    journal.record_put("key1", ("user1", "path1"))
+    with open(journal.path, "a") as f:
+        f.write('{"op":"put","key":"ke')
+    assert journal.replay() == {"key1": ("user1", "path1")}
+
+def test_journal_replay_after_compaction(tmp_path):
+    """Test that the journal is compacted into a snapshot once long enough, and replays the same index."""
+    journal = IndexJournal(str(tmp_path / "index.log"), compact_after=10)
+    storage = KeyValueStorage(journal)
+    for i in range(25):
+        storage.add(f"key{i % 4}", (f"user{i}", f"path{i}"))
+    storage.remove("key3")
+    storage.add("key4", ("user4", "path4"))
+    journal.close()
+
+    assert os.path.exists(journal.snapshot_path)
+    assert not os.path.exists(journal.path)
+    with open(journal.segment) as f:
+        assert len(f.readlines()) < 10
+    reopened = IndexJournal(journal.path, compact_after=10)
+    assert reopened.replay() == storage.store
+    assert len(storage.store) == 4
+    reopened.close()
+
+def test_journal_replay_after_interrupted_compaction(journal):
+    """Test that a crash between writing the snapshot and deleting the sealed segments loses nothing."""
+    storage = KeyValueStorage(journal)
+    storage.add("key1", ("user1", "path1"))
+    storage.add("key2", ("user2", "path2"))
+    snapshot, sealed = journal.seal(storage.store)
+    journal.compact(snapshot, [])  # As if the sealed segments had not been deleted
+    storage.remove("key1")
+    assert os.path.exists(journal.path)
+    assert journal.replay() == {"key2": ("user2", "path2")}
+
+def test_journal_compacts_in_the_background(tmp_path):
+    """Test that writes go on to a new segment while the index is snapshotted, and all of them replay."""
+    journal = IndexJournal(str(tmp_path / "index.log"), compact_after=10)
+    storage = KeyValueStorage(journal)
+    committer = GroupCommitter(window_ms=1)
+
+    async def main():
+        for i in range(10):
+            storage.add(f"key{i % 3}", ("user", f"path{i}"))
+        compaction = journal._compaction
+        assert compaction is not None and not compaction.done()
+        storage.add("late", ("user", "late"))  # Lands in the new segment, not in the snapshot
+        storage.remove("key0")
+        await committer.sync(journal.path, journal.segment)  # The sealed segment may be gone by now
+        await compaction
+
+    asyncio.run(main())
+    journal.close()
+    assert not os.path.exists(journal.path)
+    reopened = IndexJournal(journal.path, compact_after=10)
+    assert reopened.segment == journal.segment
+    assert reopened.replay() == storage.store
+    assert "late" in storage.store and "key0" not in storage.store
+    reopened.close()
+
+def test_group_commit_batches_concurrent_writes(tmp_path):
+    """Test that concurrent syncs within one window share a single commit."""
+    committer = GroupCommitter(window_ms=50, max_batch=100)
+    paths = []
+    for i in range(10):
+        path = tmp_path / f"blob{i}"
+        path.write_bytes(os.urandom(16))
+        paths.append(str(path))
+
+    async def _sync_all():
+        await asyncio.gather(*(committer.sync(path) for path in paths))
+
+    asyncio.run(_sync_all())
+    stats = committer.export_stats()
+    assert stats["batches"] == 1
+    assert stats["writes"] == 10
+
+def test_group_commit_max_batch(tmp_path):
+    """Test that a full batch is committed without waiting for the window."""
+    committer = GroupCommitter(window_ms=10_000, max_batch=2)
+    path = tmp_path / "blob"
+    path.write_bytes(b"data")
+
+    async def _sync_pair():
+        await asyncio.wait_for(asyncio.gather(committer.sync(str(path)), committer.sync(str(path))), timeout=5)
+
+    asyncio.run(_sync_pair())
+    assert committer.export_stats()["batches"] == 1
+
+def test_group_commit_disabled():
+    """Test that a disabled committer returns without syncing anything."""
+    committer = GroupCommitter(enabled=False)
+    asyncio.run(committer.sync("does-not-exist"))
+    assert committer.export_stats()["batches"] == 0
@@ -0,0 +1,80 @@
+import itertools
+import os
+import pytest
+from app.core.erasure import MARKER_SIZE, ReedSolomon, build_marker, fragment_key, is_fragment_key, read_marker
+from app.core.hashring import HashRing
+
+
+@pytest.fixture
+def codec():
+    """Fixture to create a 4+2 Reed-Solomon codec."""
+    return ReedSolomon(k=4, m=2)
+
+def test_encode_fragment_count_and_overhead(codec):
+    """Test that an object is split into k + m fragments costing (k + m) / k of its size."""
+    data = os.urandom(4000)
+    fragments = codec.encode(data)
+    assert len(fragments) == 6
+    payload = sum(len(f) - 15 for f in fragments)  # 15-byte fragment header
+    assert payload == 6000
+
+@pytest.mark.parametrize("size", [0, 1, 1001, 4096])
+def test_decode_from_any_k_fragments(codec, size):
+    """Test that any 4 of the 6 fragments rebuild the object."""
+    data = os.urandom(size)
+    fragments = codec.encode(data)
+    for chosen in itertools.combinations(range(6), 4):
+        assert codec.decode({i: fragments[i] for i in chosen}) == data
+
+def test_decode_needs_k_fragments(codec):
+    """Test that decoding fails with fewer than k fragments."""
+    fragments = codec.encode(os.urandom(100))
+    with pytest.raises(ValueError):
+        codec.decode({0: fragments[0], 4: fragments[4], 5: fragments[5]})
+
+def test_decode_rejects_foreign_fragment(codec):
+    """Test that fragments of a different code are rejected."""
+    fragments = ReedSolomon(k=3, m=2).encode(os.urandom(100))
+    with pytest.raises(ValueError):
+        codec.decode({i: fragments[i] for i in range(4)})
+
+@pytest.mark.parametrize("k, m", [(0, 2), (4, 0), (256, 0), (200, 56)])
+def test_unsupported_codes_are_rejected(k, m):
+    """Test that codes without parity, or too large for the fragment header, are refused up front."""
+    with pytest.raises(ValueError):
+        ReedSolomon(k=k, m=m)
+
+def test_largest_code_round_trips():
+    """Test that a 254+1 code, the largest the header describes, encodes and decodes."""
+    codec = ReedSolomon(k=254, m=1)
+    data = os.urandom(1000)
+    fragments = codec.encode(data)
+    assert codec.decode({i: fragments[i] for i in range(1, 255)}) == data
+
+def test_read_header(codec):
+    """Test that fragments are self-describing."""
+    fragments = codec.encode(b"x" * 10)
+    assert ReedSolomon.read_header(fragments[5]) == {"k": 4, "m": 2, "index": 5, "size": 10}
+
+def test_marker(codec):
+    """Test that the marker stored under an erasure coded key names its code, and plain images have none."""
+    decoded = read_marker(build_marker(codec))
+    assert (decoded.k, decoded.m) == (4, 2)
+    assert read_marker(os.urandom(MARKER_SIZE + 1)) is None
+    assert read_marker(b"JPEG" + bytes(MARKER_SIZE - 4)) is None
+
+def test_fragment_keys():
+    """Test fragment key derivation and detection."""
+    assert fragment_key("abc", 3) == "abc.ec3"
+    assert is_fragment_key("abc.ec3")
+    assert not is_fragment_key("abc")
+    assert not is_fragment_key(".ec3")
+
+def test_fragment_placement_on_distinct_nodes():
+    """Test that the preference list provides k + m distinct physical nodes for the fragments."""
+    nodes = [f"node{i}" for i in range(8)]
+    ring = HashRing(nodes=nodes, vnodes=5, replicas=3)
+    targets = ring.get_all_nodes("some-key", count=6)
+    assert len(targets) == 6
+    assert len(set(targets)) == 6
+    assert targets[:3] == ring.get_all_nodes("some-key")
@@ -61,4 +61,41 @@ def test_add_node_transfer_keys(manager_a, manager_b):
         if key in transfer_keys_to_b:
             assert manager_b.get_value(key) == f"value{key[3:]}"
         elif key in transfer_keys_to_a:
-            assert manager_a.get_value(key) == f"value{key[3:]}"
\ No newline at end of file
+            assert manager_a.get_value(key) == f"value{key[3:]}"
+
+def test_plan_rebalance_moves_each_key_once():
+    """
+    Test planning a batch scale-out (3 nodes joining 3 at once) with 3 replicas.
+
+    - Every node newly responsible for a key receives it exactly once, from one old node.
+    - Nodes drop exactly the keys they are no longer responsible for.
+    """
+    old_nodes = ["nodeA", "nodeB", "nodeC"]
+    managers = {
+        node: DistributedKeyValueManager(nodes=old_nodes, node_id=node, vnodes=5, replicas=3) for node in old_nodes
+    }
+    previous_metadata = managers["nodeA"].export_ring()
+    keys = [f"key{i}" for i in range(200)]
+    for manager in managers.values():
+        for key in keys:
+            manager.add_key_value(key, ("user", key))
+        for new_node in ["nodeD", "nodeE", "nodeF"]:
+            manager.hash_ring.add_node(new_node)
+
+    received = {}
+    for node, manager in managers.items():
+        sends, drops = manager.plan_rebalance(previous_metadata)
+        for destination, sent_keys in sends.items():
+            for key in sent_keys:
+                assert (destination, key) not in received
+                received[(destination, key)] = node
+        current = manager.hash_ring
+        assert set(drops) == {key for key in keys if node not in current.get_all_nodes(key)}
+
+    ring = managers["nodeA"].hash_ring
+    expected = {
+        (destination, key)
+        for key in keys
+        for destination in ring.get_all_nodes(key) if destination not in old_nodes
+    }
+    assert set(received) == expected
@@ -101,5 +101,34 @@ def test_node_replicas_cap():
     assert len(all_nodes) == len(nodes)
     assert set(all_nodes) == set(nodes)
 
+def test_version_tracks_membership_changes():
+    ring = HashRing(nodes=["node1", "node2"], vnodes=5)
+    assert ring.version == 2
+
+    ring.add_node("node3")
+    assert ring.version == 3
+
+    ring.add_node("node3")  # Already a member
+    assert ring.version == 3
+
+
+def test_reconstruct_ring_keeps_version():
+    ring = HashRing(nodes=["node1", "node2", "node3"], vnodes=5)
+
+    new_ring = HashRing.reconstruct_ring(ring.export_metadata(), vnodes=5)
+
+    assert new_ring.version == ring.version
+
+
+def test_export_tokens_matches_ring():
+    ring = HashRing(nodes=["node1", "node2"], vnodes=5)
+
+    table = ring.export_tokens()
+
+    assert len(table["tokens"]) == len(table["owners"]) == 10
+    assert [int(token, 16) for token in table["tokens"]] == list(ring.ring.keys())
+    assert table["owners"] == list(ring.ring.values())
+
+
 if __name__ == "__main__":
     pytest.main()
\ No newline at end of file
@@ -0,0 +1,54 @@
+import time
+from app.core.health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, NodeHealth
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=60)
+    for _ in range(2):
+        breaker.record(False)
+    assert breaker.state == CLOSED
+
+    breaker.record(False)
+
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_ejects_outlier_by_error_rate():
+    """Test that a node failing too often trips the breaker even without consecutive failures."""
+    breaker = CircuitBreaker(failure_threshold=100, error_rate=0.5, window=10)
+    for i in range(10):
+        breaker.record(i % 3 != 0, latency=0.01)  # Fine, but every third request fails
+    assert breaker.state == CLOSED
+
+    for _ in range(3):
+        breaker.record(True, latency=5.0)  # Too slow: counted as failures
+
+    assert breaker.state == OPEN
+
+
+def test_breaker_half_open_probe():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.01)
+    breaker.record(False)
+    time.sleep(0.02)
+
+    assert breaker.allow()  # The probe
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # Only one probe at a time
+
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.current_cooldown == 0.02  # Backed off
+
+    time.sleep(0.03)
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+
+
+def test_order_puts_unhealthy_nodes_last():
+    health = NodeHealth(failure_threshold=1)
+    health.record("node1", False)
+
+    assert health.order(["node1", "node2", "node3"]) == ["node2", "node3", "node1"]
+
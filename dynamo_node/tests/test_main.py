@@ -2,7 +2,14 @@ import pytest
 from fastapi.testclient import TestClient
 from hashlib import sha256
 from app.main import app
+from app.api import endpoints
+from app.core.batch import BATCH_MEDIA_TYPE, FOUND, NOT_FOUND, parse_frames
+from app.core.config import CLUSTER_SECRET, URL_SIGNING_SECRET
+from app.core.signing import cluster_headers, signature
+from app.core.state import ns
+import asyncio
 import os
+import time
 
 from app.core.hashmanager import DistributedKeyValueManager
 
@@ -11,7 +18,8 @@ VNODES = 5
 N_REPLICAS = 3
 STORE_DIR = "./store"
 
-client = TestClient(app)
+client = TestClient(app, headers=cluster_headers(CLUSTER_SECRET))  # The control panel or another node
+outsider = TestClient(app)  # Anyone else, e.g. a client given a signed URL
 
 @pytest.fixture
 def manager():
@@ -79,3 +87,160 @@ def test_fetch_nonexistent_hash(manager):
     response = client.get("/fetch/nonexistenthash")
     assert response.status_code == 404
     assert response.json()["detail"] == "Hash not found"
+
+
+def test_get_ring_not_modified():
+    """Test that a ring poll with a matching ETag gets a 304."""
+    response = client.get("/get_ring")
+    assert response.status_code == 200
+    assert response.json()["tokens"]
+    etag = response.headers["etag"]
+
+    response = client.get("/get_ring", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    response = client.get("/get_ring", params={"wait": 0.05}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+def test_fetch_with_invalid_signature(manager):
+    """Test that a fetch through a badly signed URL is refused."""
+    response = outsider.get("/fetch/somekey", params={"expires": 9999999999, "sig": "0" * 64})
+    assert response.status_code == 403
+
+def test_unsigned_requests_from_outside_are_refused(manager):
+    """Test that requests with neither a signed URL nor the cluster secret are refused."""
+    data = os.urandom(1024)
+    hash_value = sha256(data).hexdigest()
+    upload = {"data": {"username": "testuser", "key": hash_value}, "files": {"file": ("a.jpg", data, "image/jpeg")}}
+    assert client.post("/upload", **upload).status_code == 200
+
+    assert outsider.post("/upload", **upload).status_code == 403
+    assert outsider.get(f"/fetch/{hash_value}").status_code == 403
+    assert outsider.delete(f"/delete/{hash_value}").status_code == 403
+    assert outsider.post("/fetch_batch", json={"keys": [hash_value]}).status_code == 403
+    assert outsider.get(f"/ec/fetch/{hash_value}").status_code == 403
+    wrong_secret = {"X-Cluster-Secret": "not-the-secret"}
+    assert outsider.get(f"/fetch/{hash_value}", headers=wrong_secret).status_code == 403
+    assert outsider.delete(f"/delete/{hash_value}", headers=wrong_secret).status_code == 403
+
+    assert client.get(f"/fetch/{hash_value}").content == data
+
+def test_signed_urls_are_bound_to_their_request(manager):
+    """Test that a signed URL works from outside, but not once tampered with."""
+    data = os.urandom(1024)
+    hash_value = sha256(data).hexdigest()
+    expires = int(time.time()) + 60
+    sig = signature(URL_SIGNING_SECRET, "POST", "/upload", expires, key=hash_value, username="testuser")
+    files = {"file": ("a.jpg", data, "image/jpeg")}
+
+    signed = {"expires": expires, "sig": sig}
+    response = outsider.post("/upload", params=signed, data={"username": "mallory", "key": hash_value}, files=files)
+    assert response.status_code == 403
+    response = outsider.post("/upload", params=signed, data={"username": "testuser", "key": hash_value}, files=files)
+    assert response.status_code == 200
+
+    sig = signature(URL_SIGNING_SECRET, "GET", f"/fetch/{hash_value}", expires)
+    assert outsider.get(f"/fetch/{hash_value}", params={"expires": expires, "sig": sig}).content == data
+    assert outsider.get(f"/fetch/{hash_value}", params={"expires": expires + 1, "sig": sig}).status_code == 403
+    assert outsider.get(f"/fetch/{'0' * 64}", params={"expires": expires, "sig": sig}).status_code == 403
+    assert outsider.get(f"/fetch/{hash_value}", params={"expires": expires}).status_code == 403
+
+def test_refused_upload_keeps_existing_copy(manager, monkeypatch):
+    """Test that an upload of a key the node is no longer responsible for leaves its stored copy intact."""
+    data = os.urandom(1024)
+    hash_value = sha256(data).hexdigest()
+    upload = {"data": {"username": "testuser", "key": hash_value}, "files": {"file": ("a.jpg", data, "image/jpeg")}}
+    assert client.post("/upload", **upload).status_code == 200
+
+    monkeypatch.setattr(ns.manager.hash_ring, "get_all_nodes", lambda key: ["some-other-node"])
+    assert client.post("/upload", **upload).status_code == 200
+    other = os.urandom(1024)
+    other_key = sha256(other).hexdigest()
+    assert client.post("/upload", data={"username": "testuser", "key": other_key},
+                       files={"file": ("b.jpg", other, "image/jpeg")}).status_code == 200
+    monkeypatch.undo()
+
+    assert client.get(f"/fetch/{hash_value}").content == data
+    assert client.get(f"/fetch/{other_key}").status_code == 404
+    assert ns.blobs.refs.get(other_key) is None
+
+def test_delete_image(manager):
+    """Test that a deleted key can no longer be fetched."""
+    data = os.urandom(1024)
+    hash_value = sha256(data).hexdigest()
+    client.post(
+        "/upload",
+        data={"username": "testuser", "key": hash_value},
+        files={"file": ("test_image.jpg", data, "image/jpeg")},
+    )
+
+    response = client.delete(f"/delete/{hash_value}")
+    assert response.status_code == 200
+    assert response.json()["keys_deleted"] == 1
+
+    assert client.get(f"/fetch/{hash_value}").status_code == 404
+    assert client.delete(f"/delete/{hash_value}").status_code == 404
+
+def test_fetch_batch(manager):
+    """Test fetching several images in one request, with a key the node does not hold."""
+    images = [os.urandom(1024), os.urandom(200 * 1024)]
+    keys = [sha256(image).hexdigest() for image in images]
+    for key, image in zip(keys, images):
+        response = client.post(
+            "/upload",
+            data={"username": "testuser", "key": key},
+            files={"file": ("test_image.jpg", image, "image/jpeg")},
+        )
+        assert response.status_code == 200
+
+    missing = "0" * 64
+    response = client.post("/fetch_batch", json={"keys": [keys[0], missing, keys[1]]})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == BATCH_MEDIA_TYPE
+    assert list(parse_frames(response.content)) == [
+        (keys[0], FOUND, images[0]),
+        (missing, NOT_FOUND, b""),
+        (keys[1], FOUND, images[1]),
+    ]
+
+def test_erasure_coded_image_is_read_by_its_key(manager):
+    """
+    Test that the key of an erasure coded image holds a marker naming its code, so /fetch and
+    /fetch_batch rebuild it without being told the code (e.g. after the bucket policy changed).
+    """
+    data = os.urandom(10 * 1024)
+    key = sha256(data).hexdigest()
+    response = client.post(
+        "/ec/upload",
+        data={"username": "testuser", "key": key, "k": "3", "m": "2"},
+        files={"file": ("test_image.jpg", data, "image/jpeg")},
+    )
+    assert response.status_code == 200
+    assert response.json()["fragments_stored"] == 5
+
+    assert client.get(f"/fetch/{key}").content == data
+    assert list(parse_frames(client.post("/fetch_batch", json={"keys": [key]}).content)) == [(key, FOUND, data)]
+    assert client.delete(f"/delete/{key}").json()["keys_deleted"] == 6
+
+def test_fragments_follow_their_key_on_rebalance(manager, monkeypatch):
+    """Test that fragments the ring now places on other nodes are sent there and dropped here."""
+    data = os.urandom(1024)
+    key = sha256(data).hexdigest()
+    client.post(
+        "/ec/upload",
+        data={"username": "testuser", "key": key, "k": "2", "m": "1"},
+        files={"file": ("test_image.jpg", data, "image/jpeg")},
+    )
+    nodes = [ns.node_id, "node2", "node3"]
+    monkeypatch.setattr(ns.manager.hash_ring, "get_all_nodes", lambda key, count=None: nodes[:count or N_REPLICAS])
+    sent = []
+
+    async def _put_fragment(node_id, username, fragment_key, fragment):
+        sent.append((node_id, fragment_key))
+        return node_id == "node2"
+
+    monkeypatch.setattr(endpoints, "_put_fragment", _put_fragment)
+    assert asyncio.run(endpoints._move_fragments()) == (1, 1)
+    assert sorted(sent) == [("node2", f"{key}.ec1"), ("node3", f"{key}.ec2")]
+    assert sorted(k for k in ns.manager.list_local_keys() if k.startswith(key)) == [key, f"{key}.ec0", f"{key}.ec2"]
+    client.delete(f"/delete/{key}")
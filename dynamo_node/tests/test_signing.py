@@ -0,0 +1,37 @@
+import time
+
+from app.core.signing import signature, verify
+
+SECRET = "test-secret"
+
+
+def test_valid_signature_verifies():
+    expires = int(time.time()) + 60
+    sig = signature(SECRET, "GET", "/fetch/abc", expires)
+
+    assert verify(SECRET, "GET", "/fetch/abc", expires, sig)
+
+
+def test_expired_signature_is_rejected():
+    expires = int(time.time()) - 1
+    sig = signature(SECRET, "GET", "/fetch/abc", expires)
+
+    assert not verify(SECRET, "GET", "/fetch/abc", expires, sig)
+
+
+def test_signature_is_bound_to_request():
+    expires = int(time.time()) + 60
+    sig = signature(SECRET, "POST", "/upload", expires, key="abc", username="alice")
+
+    assert verify(SECRET, "POST", "/upload", expires, sig, key="abc", username="alice")
+    assert not verify(SECRET, "POST", "/upload", expires, sig, key="abc", username="mallory")
+    assert not verify(SECRET, "POST", "/upload", expires + 1, sig, key="abc", username="alice")
+    assert not verify(SECRET, "GET", "/upload", expires, sig, key="abc", username="alice")
+    assert not verify("other-secret", "POST", "/upload", expires, sig, key="abc", username="alice")
+
+
+def test_nothing_verifies_without_a_secret():
+    expires = int(time.time()) + 60
+    sig = signature("", "GET", "/fetch/abc", expires)
+
+    assert not verify("", "GET", "/fetch/abc", expires, sig)
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from app.core.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    """Test that concurrent calls for one key run the function once and all get its result."""
+    flights = SingleFlight()
+    executions = 0
+
+    async def fetch():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.01)
+        return b"data"
+
+    async def main():
+        return await asyncio.gather(*(flights.do("key", fetch) for _ in range(10)))
+
+    results = asyncio.run(main())
+
+    assert executions == 1
+    assert [value for value, _ in results] == [b"data"] * 10
+    assert [joined for _, joined in results].count(False) == 1
+    assert flights.report()["coalescing_ratio"] == 0.9
+
+
+def test_distinct_keys_and_sequential_calls_are_not_coalesced():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0)
+        return 1
+
+    async def main():
+        await asyncio.gather(flights.do("a", fetch), flights.do("b", fetch))
+        await flights.do("a", fetch)
+
+    asyncio.run(main())
+
+    assert flights.executions == 3
+    assert flights.report()["in_flight"] == 0
+
+
+def test_exception_is_shared():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise KeyError("missing")
+
+    async def main():
+        return await asyncio.gather(*(flights.do("key", fetch) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(result, KeyError) for result in results)
+    assert flights.executions == 1
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def main():
+        first = asyncio.create_task(flights.do("key", fetch))
+        second = asyncio.create_task(flights.do("key", fetch))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == ("ok", True)
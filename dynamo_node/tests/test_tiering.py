@@ -0,0 +1,88 @@
+import asyncio
+import io
+import os
+import time
+import pytest
+from fastapi import UploadFile
+from app.core.blobstore import BlobStore
+from app.core.tiering import TierMigrator
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Fixture to create a tiered blob store in a temporary directory."""
+    return BlobStore(str(tmp_path / "hot"), str(tmp_path / "cold"))
+
+def put(store, data, key):
+    upload = UploadFile(file=io.BytesIO(data), filename="image.jpg")
+    return asyncio.run(store.put(upload, key, "user1"))
+
+def test_idle_blob_demoted_and_compressed(store):
+    """Test that an idle blob moves to the cold tier, compressed."""
+    data = b"compressible " * 1000
+    digest = put(store, data, "key1")
+    store.last_access[digest] = time.time() - 3600
+    migrator = TierMigrator(store, interval=60, idle_seconds=60, hot_max_bytes=10 ** 9)
+    assert asyncio.run(migrator.migrate_once()) == 1
+    assert not os.path.exists(store.path_for(digest))
+    assert os.path.getsize(store.cold_path_for(digest)) < len(data)
+    assert store.tier_report()["cold_blobs"] == 1
+
+def test_recent_blob_stays_hot(store):
+    """Test that recently accessed blobs are not demoted while the hot tier has room."""
+    put(store, os.urandom(100), "key1")
+    migrator = TierMigrator(store, interval=60, idle_seconds=60, hot_max_bytes=10 ** 9)
+    assert asyncio.run(migrator.migrate_once()) == 0
+
+def test_hot_tier_size_limit(store):
+    """Test that least recently used blobs are demoted to keep the hot tier under its limit."""
+    digests = [put(store, os.urandom(1000), f"key{i}") for i in range(4)]
+    for i, digest in enumerate(digests):
+        store.last_access[digest] = time.time() - 10 + i
+    migrator = TierMigrator(store, interval=60, idle_seconds=3600, hot_max_bytes=2500)
+    assert asyncio.run(migrator.migrate_once()) == 2
+    assert store.cold == set(digests[:2])
+    assert store.hot_bytes() == 2000
+
+def test_cold_read_promotes(store):
+    """Test that reading a cold blob transparently brings it back to the hot tier."""
+    data = os.urandom(2000)
+    digest = put(store, data, "key1")
+    asyncio.run(store.demote(digest, store.last_access[digest]))
+    path = asyncio.run(store.open_for_read(digest))
+    with open(path, "rb") as f:
+        assert f.read() == data
+    assert digest not in store.cold
+    assert not os.path.exists(store.cold_path_for(digest))
+    report = store.tier_report()
+    assert report["cold_hits"] == 1 and report["promotions"] == 1
+
+def test_demotion_skipped_if_accessed(store):
+    """Test that a blob read after it was selected for demotion stays hot."""
+    digest = put(store, os.urandom(100), "key1")
+    selected_at = store.last_access[digest] - 1
+    assert asyncio.run(store.demote(digest, selected_at)) is False
+    assert os.path.exists(store.path_for(digest))
+
+def test_release_cold_blob(store):
+    """Test that garbage collection removes blobs from the cold tier."""
+    digest = put(store, os.urandom(100), "key1")
+    asyncio.run(store.demote(digest, store.last_access[digest]))
+    assert store.release(digest, "key1", "user1") is True
+    assert not os.path.exists(store.cold_path_for(digest))
+
+def test_incompressible_blob_stored_raw(store):
+    """Test that a blob compression does not shrink (e.g. an encrypted image) is demoted uncompressed."""
+    data = os.urandom(200 * 1024)
+    digest = put(store, data, "key1")
+    assert asyncio.run(store.demote(digest, store.last_access[digest])) is True
+    assert store.cold_path_for(digest) == store.cold_path_for(digest, compressed=False)
+    assert not os.path.exists(store.cold_path_for(digest, compressed=True))
+    assert store.tier_report()["cold_disk_bytes"] == len(data)
+
+    restarted = BlobStore(store.store_dir, store.cold_dir)
+    restarted.rebuild({"key1": ("user1", digest)})
+    assert restarted.cold == {digest} and restarted.sizes[digest] == len(data)
+    with open(asyncio.run(restarted.open_for_read(digest)), "rb") as f:
+        assert f.read() == data
+    assert not os.path.exists(restarted.cold_path_for(digest, compressed=False))
@@ -20,6 +20,7 @@ function initializeUploadForm(uploadForm) {
         const fileInput = document.getElementById("image");
         const username = sessionStorage.getItem("loggedInUser"); // Retrieve the logged-in user
 
+        // The session cookie set at login identifies the user to the backend
         if (!username) {
             showNotification("Error", "You must be logged in to upload images.", "error");
             return;
@@ -30,8 +31,12 @@ function initializeUploadForm(uploadForm) {
             return;
         }
 
+        if (fileInput.files.length > 1) {
+            await uploadImages([...fileInput.files], uploadForm);
+            return;
+        }
+
         formData.append("image", fileInput.files[0]);
-        formData.append("username", username);
 
         try {
             const response = await fetch("/image/upload", {
@@ -43,6 +48,8 @@ function initializeUploadForm(uploadForm) {
                 const result = await response.json();
                 showNotification("Success", "Image uploaded successfully!", "success");
                 uploadForm.reset(); // Reset the form after successful upload
+            } else if (response.status === 401) {
+                handleSessionExpired();
             } else {
                 const error = await response.json();
                 showNotification("Error", error.detail || "Upload failed.", "error");
@@ -54,21 +61,84 @@ function initializeUploadForm(uploadForm) {
     });
 }
 
-async function loadGalleryImages(galleryElement) {
+const BULK_UPLOAD_FILES = 200; // Files per bulk upload request (the backend accepts up to 1000)
+
+// Several files go through the bulk upload endpoint, BULK_UPLOAD_FILES at a time
+async function uploadImages(files, uploadForm) {
+    let uploaded = 0;
+    try {
+        for (let start = 0; start < files.length; start += BULK_UPLOAD_FILES) {
+            const formData = new FormData();
+            files.slice(start, start + BULK_UPLOAD_FILES).forEach(file => formData.append("images", file));
+
+            const response = await fetch("/image/upload_batch", {
+                method: "POST",
+                body: formData,
+            });
+            if (response.status === 401) {
+                handleSessionExpired();
+                return;
+            }
+            if (!response.ok) {
+                const error = await response.json();
+                showNotification("Error", error.detail || "Upload failed.", "error");
+                return;
+            }
+            const { results } = await response.json();
+            uploaded += results.filter(result => result.status !== "failed").length;
+        }
+
+        const failed = files.length - uploaded;
+        if (failed) {
+            showNotification("Warning", `${uploaded} of ${files.length} images uploaded, ${failed} failed.`, "warning");
+        } else {
+            showNotification("Success", `${uploaded} images uploaded successfully!`, "success");
+        }
+        uploadForm.reset();
+    } catch (err) {
+        console.error("Error uploading images:", err);
+        showNotification("Error", "Error uploading images. Check console for details.", "error");
+    }
+}
+
+const GALLERY_PAGE_SIZE = 24;
+// Tiles show the small variant of each image; opening one shows the larger preview
+const GALLERY_TILE_SIZE = "thumb";
+const GALLERY_OPEN_SIZE = "preview";
+
+// Loads one page of the gallery; a "Load more" button fetches the next one from the returned cursor
+async function loadGalleryImages(galleryElement, cursor = null) {
+    const params = new URLSearchParams({ limit: GALLERY_PAGE_SIZE });
+    if (cursor) {
+        params.set("cursor", cursor);
+    }
+
     try {
-        const response = await fetch("/image/list"); // Adjust if your API endpoint differs
+        const response = await fetch(`/image/list?${params}`);
         if (response.ok) {
-            const images = await response.json();
-
-            if (images.length > 0) {
-                galleryElement.innerHTML = images.map(image => `
-                    <div class="image-block">
-                        <img src="/images/${image.key}" alt="Image">
-                    </div>
-                `).join("");
-            } else {
+            const page = await response.json();
+            document.getElementById("loadMore")?.remove();
+
+            if (!cursor && page.images.length === 0) {
                 galleryElement.innerHTML = "<p>No images found in the gallery.</p>";
+                return;
+            }
+            const blocks = new Map(page.images.map(key => [key, createImageBlock(key)]));
+            blocks.forEach(block => galleryElement.appendChild(block));
+            loadImageBatch(blocks);
+
+            if (page.next_cursor) {
+                const loadMore = document.createElement("button");
+                loadMore.id = "loadMore";
+                loadMore.textContent = "Load more";
+                loadMore.addEventListener("click", () => {
+                    loadMore.disabled = true;
+                    loadGalleryImages(galleryElement, page.next_cursor);
+                });
+                galleryElement.after(loadMore);
             }
+        } else if (response.status === 401) {
+            handleSessionExpired();
         } else {
             galleryElement.innerHTML = "<p>Failed to load images.</p>";
         }
@@ -78,6 +148,100 @@ async function loadGalleryImages(galleryElement) {
     }
 }
 
+function createImageBlock(key) {
+    const block = document.createElement("div");
+    block.className = "image-block";
+    const link = document.createElement("a");
+    link.href = `/image/${key}?size=${GALLERY_OPEN_SIZE}`;
+    link.target = "_blank";
+    const img = document.createElement("img");
+    img.alt = "Image";
+    link.appendChild(img);
+    block.appendChild(link);
+    return block;
+}
+
+// Fetches the images of a page in one request, showing each as soon as its frame arrives
+async function loadImageBatch(blocks) {
+    try {
+        const response = await fetch("/image/batch", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ keys: [...blocks.keys()], size: GALLERY_TILE_SIZE }),
+        });
+        if (!response.ok) {
+            throw new Error(`Batch request failed with status ${response.status}`);
+        }
+        for await (const frame of readFrames(response)) {
+            const img = blocks.get(frame.key)?.querySelector("img");
+            if (img && frame.found) {
+                img.src = URL.createObjectURL(new Blob([frame.body]));
+            }
+        }
+    } catch (err) {
+        console.error("Error loading gallery images:", err);
+    }
+}
+
+const FRAME_HEADER_SIZE = 11;
+
+// Reads a batch response frame by frame: status (1 byte), key length (2), body length (8), key, body
+async function* readFrames(response) {
+    const reader = response.body.getReader();
+    const chunks = [];
+    let buffered = 0;
+
+    // Waits until n bytes are buffered; false if the response ends first
+    async function fill(n) {
+        while (buffered < n) {
+            const { done, value } = await reader.read();
+            if (done) {
+                return false;
+            }
+            chunks.push(value);
+            buffered += value.length;
+        }
+        return true;
+    }
+
+    // Removes the first n buffered bytes and returns them
+    function take(n) {
+        const out = new Uint8Array(n);
+        let offset = 0;
+        while (offset < n) {
+            const chunk = chunks[0];
+            const count = Math.min(chunk.length, n - offset);
+            out.set(chunk.subarray(0, count), offset);
+            offset += count;
+            if (count === chunk.length) {
+                chunks.shift();
+            } else {
+                chunks[0] = chunk.subarray(count);
+            }
+        }
+        buffered -= n;
+        return out;
+    }
+
+    while (await fill(FRAME_HEADER_SIZE)) {
+        const header = new DataView(take(FRAME_HEADER_SIZE).buffer);
+        const keyLength = header.getUint16(1);
+        const size = Number(header.getBigUint64(3));
+        if (!(await fill(keyLength + size))) {
+            throw new Error("Batch response ended in the middle of an image");
+        }
+        const key = new TextDecoder().decode(take(keyLength));
+        yield { key, found: header.getUint8(0) === 0, body: take(size) };
+    }
+}
+
+// The session token expired or was revoked: forget the user and ask them to log in again
+function handleSessionExpired() {
+    sessionStorage.removeItem("loggedInUser");
+    showNotification("Error", "Your session has expired. Please log in again.", "error");
+    setTimeout(() => { window.location.href = "/login"; }, 800);
+}
+
 function showNotification(title, message, type) {
     const notificationContainer = document.getElementById("notificationContainer") || 
         (() => {